@@ -0,0 +1,211 @@
+from dagster import job, op, Field, Array
+import os
+import time
+import sqlite3
+import logging
+import argparse
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import pytz
+import http_client
+from dotenv import load_dotenv
+from storage import get_backend
+from weatherapi import decode_payload, history_url
+from rate_limiter import acquire, WEATHERAPI, BACKFILL
+from concurrency import pipeline_executor, WEATHERAPI_POOL
+
+# Load environment variables
+load_dotenv()
+api_key = os.getenv('api_key')
+
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_backend()
+
+local_tz = pytz.timezone("Europe/Amsterdam")
+
+# One row per location per day, unique on (location, date)
+HISTORY_TABLE = "daily_weather_history"
+HISTORY_KEY = "location,date"
+
+# Days already stored per backfill, so an interrupted backfill resumes where it stopped
+CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", "state/backfill.db")
+# Concurrent history requests (the shared rate limit still applies) and rows per write
+WORKERS = 4
+BATCH_SIZE = 200
+# Seconds between progress log lines
+PROGRESS_INTERVAL = 30
+
+# ------------------
+# Checkpoints
+# ------------------
+
+@contextmanager
+def connect(path=CHECKPOINT_PATH):
+    """Yields a connection to the checkpoint database that commits on success."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS completed_days "
+                "(backfill TEXT, location TEXT, date TEXT, PRIMARY KEY (backfill, location, date))"
+            )
+            yield connection
+    finally:
+        connection.close()
+
+def completed_days(backfill_name, path=CHECKPOINT_PATH):
+    """Returns the (location, date) pairs a backfill has already stored."""
+    with connect(path) as connection:
+        rows = connection.execute("SELECT location, date FROM completed_days WHERE backfill = ?", (backfill_name,))
+        return {(location, date) for location, date in rows}
+
+def mark_completed(backfill_name, days, path=CHECKPOINT_PATH):
+    with connect(path) as connection:
+        connection.executemany(
+            "INSERT OR IGNORE INTO completed_days (backfill, location, date) VALUES (?, ?, ?)",
+            [(backfill_name, location, date) for location, date in days]
+        )
+
+# ------------------
+# Backfill
+# ------------------
+
+def date_range(start_date, end_date):
+    """Lists the dates ("YYYY-MM-DD") from start_date through end_date."""
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    return [str(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+
+def default_backfill_name(locations, start_date, end_date):
+    return f"{','.join(sorted(locations))}:{start_date}:{end_date}"
+
+def fetch_history_day(location, date):
+    """Fetches one day of history for a location as a daily_weather_history row."""
+    acquire(WEATHERAPI, BACKFILL)
+    response = http_client.get(history_url(api_key, location, date))
+    response.raise_for_status()
+    day = decode_payload(response.content).forecast.forecastday[0]
+    return {
+        "location": location,
+        "date": day.date,
+        "precipitation": day.day.totalprecip_mm,
+        "avg_temperature": day.day.avgtemp_c,
+        "min_temperature": day.day.mintemp_c,
+        "max_temperature": day.day.maxtemp_c,
+        "avg_humidity": day.day.avghumidity,
+        "created_at": datetime.now(local_tz).isoformat(),
+    }
+
+def flush(backfill_name, rows, checkpoint_path):
+    """Writes fetched rows in one upsert, then checkpoints their days."""
+    if rows:
+        storage.upsert(HISTORY_TABLE, rows, on_conflict=HISTORY_KEY)
+        mark_completed(backfill_name, [(row["location"], row["date"]) for row in rows], checkpoint_path)
+
+def run_backfill(locations, start_date, end_date, backfill_name=None, workers=WORKERS,
+                 batch_size=BATCH_SIZE, checkpoint_path=CHECKPOINT_PATH):
+    """Fetches and stores every (location, day) not yet completed by this backfill.
+
+    Days are fetched concurrently and written in batches. A failed request stops the
+    backfill after the days fetched so far are stored, so a rerun with the same name
+    only fetches what is left. Returns the run's throughput figures.
+    """
+    backfill_name = backfill_name or default_backfill_name(locations, start_date, end_date)
+    done = completed_days(backfill_name, checkpoint_path)
+    pending = [
+        (location, date) for location in locations for date in date_range(start_date, end_date)
+        if (location, date) not in done
+    ]
+    logging.info(f"Backfill {backfill_name}: {len(done)} days already stored, {len(pending)} to fetch")
+
+    start = time.monotonic()
+    last_report = start
+    stored, batch = 0, []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch_history_day, location, date) for location, date in pending]
+        try:
+            for future in as_completed(futures):
+                batch.append(future.result())
+                if len(batch) >= batch_size:
+                    flush(backfill_name, batch, checkpoint_path)
+                    stored += len(batch)
+                    batch = []
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    fetched = stored + len(batch)
+                    logging.info(f"Backfill {backfill_name}: {fetched}/{len(pending)} days, {fetched / (now - start):.2f} days/s")
+                    last_report = now
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            # Whatever was fetched is kept, also when a request failed
+            flush(backfill_name, batch, checkpoint_path)
+            stored += len(batch)
+
+    seconds = time.monotonic() - start
+    return {
+        "backfill": backfill_name,
+        "skipped": len(done),
+        "stored": stored,
+        "seconds": round(seconds, 1),
+        "days_per_second": round(stored / seconds, 2) if seconds else 0.0,
+    }
+
+# ------------------
+# Operations
+# ------------------
+
+@op(pool=WEATHERAPI_POOL, config_schema={
+    "locations": Field(Array(str)),
+    "start_date": Field(str, description="First day, YYYY-MM-DD"),
+    "end_date": Field(str, is_required=False, description="Last day, YYYY-MM-DD (default: yesterday)"),
+    "name": Field(str, is_required=False, description="Checkpoint name (default: derived from locations and dates)"),
+    "workers": Field(int, default_value=WORKERS),
+    "batch_size": Field(int, default_value=BATCH_SIZE),
+})
+def backfill_history(context):
+    """Backfills daily weather history for the configured locations and date range."""
+    config = context.op_config
+    end_date = config.get("end_date") or str(datetime.now(local_tz).date() - timedelta(days=1))
+    result = run_backfill(
+        config["locations"], config["start_date"], end_date, config.get("name"),
+        config["workers"], config["batch_size"]
+    )
+    logging.info(
+        f"Backfill {result['backfill']} stored {result['stored']} days in {result['seconds']}s "
+        f"({result['days_per_second']} days/s), {result['skipped']} already stored"
+    )
+
+# ------------------
+# Jobs
+# ------------------
+
+@job(executor_def=pipeline_executor)
+def history_backfill_pipeline():
+    """Pipeline to backfill daily weather history for many locations."""
+    backfill_history()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill daily weather history; rerun with the same arguments to resume.")
+    parser.add_argument("locations", nargs="+", help="WeatherAPI locations, e.g. Eindhoven Riga")
+    parser.add_argument("--start", required=True, help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", default=str(datetime.now(local_tz).date() - timedelta(days=1)), help="Last day, YYYY-MM-DD (default: yesterday)")
+    parser.add_argument("--name", help="Checkpoint name (default: derived from locations and dates)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    result = run_backfill(args.locations, args.start, args.end, args.name, args.workers, args.batch_size)
+    print(
+        f"Stored {result['stored']} days in {result['seconds']}s ({result['days_per_second']} days/s); "
+        f"{result['skipped']} days were already stored"
+    )
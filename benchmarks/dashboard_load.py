@@ -0,0 +1,172 @@
+import os
+import gc
+import sys
+import time
+import random
+import resource
+import argparse
+import contextlib
+import tempfile
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import offline
+
+# Dashboards under test
+PAGES = {
+    "main": os.path.join(ROOT, "streamlit_app.py"),
+    "baltic": os.path.join(ROOT, "pages", "Baltic.py"),
+}
+# Jobs that fill the local database the dashboards read
+SEED_JOBS = [
+    "forecast_weather_pipeline", "today_weather_trends_pipeline", "tomorrow_weather_pipeline",
+    "historical_precipitation_pipeline", "tunnel_pipeline",
+    "riga_forecast_weather_pipeline", "riga_today_weather_trends_pipeline", "riga_tomorrow_weather_pipeline",
+    "riga_historical_precipitation_pipeline",
+]
+# Backend calls that become a Supabase request when STORAGE_BACKEND=supabase
+QUERY_METHODS = ("select", "read_frame", "max_value")
+# Seconds one rerun may take before AppTest gives up
+RERUN_TIMEOUT = 120
+
+# ------------------
+# Setup
+# ------------------
+
+def seed(workdir):
+    """Fills a fresh local database with today's data from the replayed fixtures."""
+    cassette_path = os.path.join(workdir, "cassettes")
+    offline.configure(workdir, cassette_path)
+    offline.seed_cassettes(cassette_path, today=date.today())
+    # process_weather_trends prints every hour it handles; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        failed = [name for name, success, _ in offline.run_jobs(SEED_JOBS) if not success]
+    if failed:
+        raise RuntimeError(f"Seeding the local database failed in {', '.join(failed)}")
+
+class QueryCounter:
+    """Counts backend reads made by any session, by wrapping the LocalBackend read methods."""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def install(self, backend_class):
+        for name in QUERY_METHODS:
+            setattr(backend_class, name, self.counted(getattr(backend_class, name)))
+
+    def counted(self, method):
+        def wrapper(*args, **kwargs):
+            with self.lock:
+                self.count += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+def rss_mb():
+    """Current resident memory of this process (peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# ------------------
+# Sessions
+# ------------------
+
+def run_session(page, interactions, seed_value):
+    """Loads a page as one viewer, then toggles random filter checkboxes (or reruns when there are none).
+
+    Returns the session, its (kind, seconds) reruns and the exceptions it showed.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed_value)
+    session = AppTest.from_file(PAGES[page], default_timeout=RERUN_TIMEOUT)
+    reruns = []
+
+    start = time.perf_counter()
+    session.run()
+    reruns.append(("load", time.perf_counter() - start))
+
+    for _ in range(interactions):
+        start = time.perf_counter()
+        if session.checkbox:
+            checkbox = session.checkbox[rng.randrange(len(session.checkbox))]
+            checkbox.set_value(not checkbox.value).run()
+        else:
+            session.run()
+        reruns.append(("interaction", time.perf_counter() - start))
+
+    return session, reruns, len(session.exception)
+
+def percentiles(values):
+    if not values:
+        return [float("nan")] * 3
+    return [float(p) for p in np.percentile(values, [50, 95, 99])]
+
+def load_test(page, sessions, interactions, counter):
+    """Runs `sessions` concurrent viewers of a page and summarises their reruns."""
+    gc.collect()
+    queries_before, rss_before = counter.count, rss_mb()
+
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(lambda i: run_session(page, interactions, i), range(sessions)))
+
+    # Sessions are still referenced, so their state counts towards the memory growth
+    rss_after = rss_mb()
+    reruns = [rerun for _, session_reruns, _ in results for rerun in session_reruns]
+    summary = {
+        "page": page,
+        "sessions": sessions,
+        "reruns": len(reruns),
+        "load": percentiles([seconds for kind, seconds in reruns if kind == "load"]),
+        "interaction": percentiles([seconds for kind, seconds in reruns if kind == "interaction"]),
+        "mb_per_session": (rss_after - rss_before) / sessions,
+        "queries_per_rerun": (counter.count - queries_before) / len(reruns),
+        "errors": sum(errors for _, _, errors in results),
+    }
+    del results
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit dashboards with concurrent headless viewers on local data.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 25], help="Concurrent viewers per round")
+    parser.add_argument("--interactions", type=int, default=5, help="Filter toggles (or reruns) per viewer after the page load")
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--workdir", help="Local database directory (default: a new temporary directory)")
+    args = parser.parse_args()
+
+    seed(args.workdir or tempfile.mkdtemp(prefix="dashboard-load-"))
+
+    from storage import LocalBackend
+    counter = QueryCounter()
+    counter.install(LocalBackend)
+
+    print(
+        f"{'page':<7} {'viewers':>7} {'reruns':>6}  {'load p50/p95/p99 (ms)':>24}  "
+        f"{'interaction p50/p95/p99 (ms)':>29}  {'MB/viewer':>9}  {'queries/rerun':>13}  {'errors':>6}"
+    )
+    for page in args.pages:
+        # A first viewer fills the shared caches; its cold load is reported on its own
+        cold = load_test(page, 1, 0, counter)
+        print(
+            f"{page:<7} {'cold':>7} {cold['reruns']:>6}  {cold['load'][0] * 1e3:>24.0f}  {'':>29}  "
+            f"{cold['mb_per_session']:>9.1f}  {cold['queries_per_rerun']:>13.1f}  {cold['errors']:>6}"
+        )
+        for sessions in args.sessions:
+            result = load_test(page, sessions, args.interactions, counter)
+            load = "/".join(f"{seconds * 1e3:.0f}" for seconds in result["load"])
+            interaction = "/".join(f"{seconds * 1e3:.0f}" for seconds in result["interaction"])
+            print(
+                f"{page:<7} {sessions:>7} {result['reruns']:>6}  {load:>24}  {interaction:>29}  "
+                f"{result['mb_per_session']:>9.1f}  {result['queries_per_rerun']:>13.2f}  {result['errors']:>6}"
+            )
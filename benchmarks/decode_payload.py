@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import copy
+import pickle
+import timeit
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from weatherapi import decode_payload
+
+# Sample forecast.json response (2 days) the payloads are scaled from
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "weather_data.json")
+
+def scaled_payload(days):
+    """Returns the sample response body with its forecast days repeated up to `days`."""
+    with open(SAMPLE_PATH) as f:
+        payload = json.load(f)
+    forecast_days = payload["forecast"]["forecastday"]
+    payload["forecast"]["forecastday"] = [copy.deepcopy(forecast_days[i % len(forecast_days)]) for i in range(days)]
+    return json.dumps(payload).encode()
+
+def decode_dicts(content):
+    return json.loads(content)
+
+def peak_memory(decode, content):
+    """Returns the peak allocation while decoding and the size of the decoded result."""
+    tracemalloc.start()
+    result = decode(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, len(pickle.dumps(result))
+
+def run(days_list, repeat):
+    decoders = {"json.loads (dicts)": decode_dicts, "msgspec (structs)": decode_payload}
+    print(f"{'days':>4}  {'payload':>9}  {'decoder':<20} {'decode':>10}  {'peak memory':>11}  {'pickled':>9}")
+    for days in days_list:
+        content = scaled_payload(days)
+        for name, decode in decoders.items():
+            seconds = min(timeit.repeat(lambda: decode(content), number=repeat, repeat=5)) / repeat
+            peak, pickled = peak_memory(decode, content)
+            print(
+                f"{days:>4}  {len(content) / 1024:>7.0f}kB  {name:<20} {seconds * 1e3:>8.3f}ms  "
+                f"{peak / 1024:>9.0f}kB  {pickled / 1024:>7.0f}kB"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare WeatherAPI payload decoding time and memory.")
+    parser.add_argument("--days", type=int, nargs="+", default=[2, 7, 14], help="Forecast days per payload")
+    parser.add_argument("--repeat", type=int, default=50, help="Decodes per timing")
+    args = parser.parse_args()
+    run(args.days, args.repeat)
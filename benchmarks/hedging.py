@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import offline
+
+LOCATION = "Eindhoven"
+TZ_ID = "Europe/Amsterdam"
+
+# ------------------
+# Stub servers
+# ------------------
+
+def stub_bodies():
+    """Today's forecast from weather_data.json as a WeatherAPI and an Open-Meteo response body."""
+    with open(offline.FORECAST_FIXTURE) as f:
+        forecast = json.load(f)
+    now = datetime.now(pytz.timezone(TZ_ID))
+    forecast = offline.shift_forecast(forecast, now.date())
+    forecast["location"].update(name=LOCATION, tz_id=TZ_ID, localtime=now.strftime("%Y-%m-%d %H:%M"))
+    return json.dumps(forecast).encode(), json.dumps(offline.open_meteo_forecast(forecast)).encode()
+
+class StubLatency:
+    """Delays per request: usually `base` seconds (+/- 50%), a `tail_share` of requests `tail` seconds."""
+
+    def __init__(self, base, tail, tail_share, seed):
+        self.base = base
+        self.tail = tail
+        self.tail_share = tail_share
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        with self.lock:
+            if self.random.random() < self.tail_share:
+                return self.tail * self.random.uniform(0.8, 1.2)
+            return self.base * self.random.uniform(0.5, 1.5)
+
+def start_stub(body, latency):
+    """Serves `body` for every GET after an injected delay; returns the server's base URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency.sample())
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1"
+
+def configure(workdir, base, tail, tail_share):
+    """Starts one stub per provider and points the providers at them; must run before they are imported."""
+    weatherapi_body, open_meteo_body = stub_bodies()
+    weatherapi_url = start_stub(weatherapi_body, StubLatency(base, tail, tail_share, seed=1))
+    open_meteo_url = start_stub(open_meteo_body, StubLatency(base, tail, tail_share, seed=2))
+    knmi_url = start_stub(open_meteo_body, StubLatency(base, tail, tail_share, seed=3))
+
+    os.environ.update({
+        "HTTP_MODE": "live",
+        "STORAGE_BACKEND": "local",
+        "REPLICA_PATH": os.path.join(workdir, "weather.db"),
+        "RATE_LIMIT_PATH": os.path.join(workdir, "rate_limits.db"),
+        "PROVIDER_STATS_PATH": os.path.join(workdir, "providers.db"),
+        "CIRCUIT_PATH": os.path.join(workdir, "circuits.db"),
+        "LAST_GOOD_PATH": os.path.join(workdir, "last_good"),
+        "TRACE_EXPORT": "off",
+        "WEATHERAPI_BASE_URL": weatherapi_url,
+        "OPEN_METEO_BASE_URL": open_meteo_url,
+        "KNMI_BASE_URL": knmi_url,
+        "WEATHERAPI_CALLS_PER_MINUTE": "1000000",
+        "WEATHERAPI_BURST": "1000",
+    })
+
+# ------------------
+# Measurements
+# ------------------
+
+def measure(call, runs):
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - start)
+    return np.percentile(seconds, [50, 90, 99]) * 1e3
+
+def run(fetches, pipeline_runs):
+    import providers
+    from database_data_pipeline import forecast_weather_pipeline
+
+    def pipeline():
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            assert forecast_weather_pipeline.execute_in_process(raise_on_error=False).success
+
+    print(f"{'providers':<31} {'measured':<26} {'runs':>5}  {'p50 ms':>8}  {'p90 ms':>8}  {'p99 ms':>8}")
+    # Unhedged first: its WeatherAPI latencies are the history the hedge delay is taken from
+    for names in (["weatherapi"], providers.WEATHER_PROVIDERS):
+        providers.WEATHER_PROVIDERS = names
+        label = " + ".join(names)
+        for measured, call, runs in (
+            ("fetch_forecast", lambda: providers.fetch_forecast(LOCATION, 2), fetches),
+            ("forecast_weather_pipeline", pipeline, pipeline_runs),
+        ):
+            p50, p90, p99 = measure(call, runs)
+            print(f"{label:<31} {measured:<26} {runs:>5}  {p50:>8.0f}  {p90:>8.0f}  {p99:>8.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare forecast latency with and without hedging against local stub providers with injected delays.")
+    parser.add_argument("--fetches", type=int, default=200, help="fetch_forecast calls per configuration")
+    parser.add_argument("--pipeline-runs", type=int, default=30, help="forecast_weather_pipeline runs per configuration")
+    parser.add_argument("--base", type=float, default=0.05, help="Usual stub delay (seconds)")
+    parser.add_argument("--tail", type=float, default=1.5, help="Slow stub delay (seconds)")
+    parser.add_argument("--tail-share", type=float, default=0.08, help="Share of slow requests per stub")
+    args = parser.parse_args()
+
+    configure(tempfile.mkdtemp(prefix="hedging-"), args.base, args.tail, args.tail_share)
+    run(args.fetches, args.pipeline_runs)
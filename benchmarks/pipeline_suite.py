@@ -0,0 +1,294 @@
+import os
+import sys
+import copy
+import json
+import time
+import socket
+import inspect
+import sqlite3
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Ops write to a throwaway local database and never reach an upstream
+import offline
+offline.configure(tempfile.mkdtemp(prefix="benchmark-"), os.path.join(ROOT, "cassettes"))
+
+import pytz
+import msgspec
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from weatherapi import decode_payload
+from weather_hourly import hourly_rows, HOURLY_TABLE
+from database_data_pipeline import (
+    process_weather_trends, process_forecast_data, process_tomorrow_weather, store_weather_data,
+    parse_nowcast_intensity, describe_precipitation
+)
+from email_pipeline import (
+    generate_today_weather_summary, generate_weather_trends_summary,
+    generate_forecasted_rainfall_summary, generate_tunnel_precipitation_summary
+)
+from dashboard_data import apply_schema, split_city_frames, latest_tunnel_snapshot, assign_tunnel_colors
+
+# Sample forecast.json response (2 days) the payloads are scaled from
+SAMPLE_PATH = os.path.join(ROOT, "weather_data.json")
+local_tz = pytz.timezone("Europe/Amsterdam")
+
+# Every run is appended here, so each result is compared with earlier runs on the same host
+RESULTS_PATH = os.getenv("BENCHMARK_RESULTS_PATH", os.path.join(ROOT, "state", "benchmarks.db"))
+# Earlier runs whose median is the baseline, and the slowdown reported as a regression
+BASELINE_RUNS = 5
+REGRESSION_THRESHOLD = 0.2
+
+# ------------------
+# Inputs
+# ------------------
+
+def synthetic_payload(days):
+    """Decodes the sample response extended to `days` consecutive forecast days."""
+    with open(SAMPLE_PATH) as f:
+        payload = json.load(f)
+    sample = payload["forecast"]["forecastday"]
+    first = datetime.strptime(sample[0]["date"], "%Y-%m-%d")
+
+    forecast_days = []
+    for i in range(days):
+        day = copy.deepcopy(sample[i % len(sample)])
+        shift = (i - i % len(sample)) * 86400
+        day["date"] = str((first + timedelta(days=i)).date())
+        for hour in day["hour"]:
+            hour["time_epoch"] += shift
+            hour["time"] = day["date"] + hour["time"][10:]
+        forecast_days.append(day)
+
+    payload["forecast"]["forecastday"] = forecast_days
+    return decode_payload(json.dumps(payload).encode())
+
+def build_inputs(locations, days):
+    """Builds every case's input for `locations` cities with `days` forecast days each.
+
+    Cities share the decoded forecast (only the location differs), and the raw frames
+    repeat references to the same strings, so 10k cities fit in memory.
+    """
+    payload = synthetic_payload(days)
+    names = [f"City {i}" for i in range(locations)]
+    payloads = [
+        msgspec.structs.replace(payload, location=msgspec.structs.replace(payload.location, name=name))
+        for name in names
+    ]
+
+    # weather_hourly as storage returns it: strings and numbers, not yet typed
+    city = pd.DataFrame(hourly_rows(payload, names[0]))
+    hourly = pd.DataFrame({column: np.tile(city[column].to_numpy(dtype=object), locations) for column in city})
+    hourly["location"] = np.repeat(np.array(names, dtype=object), len(city))
+
+    # One tunnel per location, as read for the tunnel map
+    nowcasts = [offline.nowcast(name) for name in names]
+    created_at = datetime.now(local_tz).isoformat()
+    tunnels = pd.DataFrame({
+        "location_name": names,
+        "latitude": np.linspace(51.40, 51.48, locations),
+        "longitude": np.linspace(5.40, 5.52, locations),
+        "precipitation_intensity": [parse_nowcast_intensity(text) for text in nowcasts],
+        "created_at": created_at,
+    })
+    tunnels["precipitation_description"] = tunnels["precipitation_intensity"].map(describe_precipitation)
+
+    forecast_rollup = [
+        {"date": day.date, "total_precipitation": day.day.totalprecip_mm} for day in payload.forecast.forecastday
+    ]
+    today = payload.forecast.forecastday[0]
+    today_rollup = {
+        "avg_temp": today.day.avgtemp_c, "avg_feels_like": today.day.avgtemp_c,
+        "peak_rainfall_time": today.hour[0].time, "total_rainfall": today.day.totalprecip_mm,
+        "weather_alert": None, "min_temperature": today.day.mintemp_c, "max_temperature": today.day.maxtemp_c,
+        "min_humidity": today.day.avghumidity, "max_humidity": today.day.avghumidity,
+    }
+
+    return {
+        "names": names, "payloads": payloads, "hourly": hourly, "nowcasts": nowcasts, "tunnels": tunnels,
+        "today_rollup": today_rollup, "forecast_rollup": forecast_rollup,
+    }
+
+# ------------------
+# Cases
+# ------------------
+
+def body(op_def):
+    """Returns the function an op runs, without Dagster's direct-invocation overhead or tracing."""
+    return inspect.unwrap(op_def.compute_fn.decorated_fn)
+
+def per_payload(op_def):
+    def case(inputs):
+        run = body(op_def)
+        # process_weather_trends prints every hour; that cost stays in, the output does not
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return sum(len(run(payload)) for payload in inputs["payloads"])
+    return case
+
+def store_weather_summaries(inputs):
+    run = body(store_weather_data)
+    for payload in inputs["payloads"]:
+        run(payload)
+    return len(inputs["payloads"])
+
+def parse_tunnel_nowcasts(inputs):
+    for text in inputs["nowcasts"]:
+        describe_precipitation(parse_nowcast_intensity(text))
+    return len(inputs["nowcasts"])
+
+def email_summaries(inputs):
+    for _ in inputs["names"]:
+        generate_today_weather_summary(inputs["today_rollup"])
+        generate_weather_trends_summary(inputs["today_rollup"])
+        generate_forecasted_rainfall_summary(inputs["forecast_rollup"])
+    generate_tunnel_precipitation_summary(inputs["tunnels"])
+    return len(inputs["names"])
+
+def city_frames(inputs):
+    rows = apply_schema(inputs["hourly"], HOURLY_TABLE)
+    split_city_frames(rows, inputs["names"])
+    return len(rows)
+
+def city_figures(inputs):
+    frames = split_city_frames(apply_schema(inputs["hourly"], HOURLY_TABLE), inputs["names"])
+    start = time.perf_counter()
+    chart = go.Figure()
+    for location, (hourly, _) in frames.items():
+        chart.add_trace(go.Scattergl(x=hourly["time"], y=hourly["temperature"], mode="lines", name=location))
+    chart.to_dict()
+    # Only the figure is timed; the frames have their own case
+    return len(frames), time.perf_counter() - start
+
+def tunnel_map(inputs):
+    tunnels = apply_schema(inputs["tunnels"], "tunnel_data")
+    snapshot = latest_tunnel_snapshot(tunnels, pd.Timestamp.now(tz=local_tz).date())
+    snapshot["color"] = assign_tunnel_colors(snapshot["precipitation_intensity"])
+    # The dashboard's scatter_mapbox; newer plotly releases only have its MapLibre successor
+    scatter = getattr(px, "scatter_mapbox", None) or px.scatter_map
+    scatter(
+        snapshot, lat="latitude", lon="longitude", hover_name="location_name",
+        hover_data=["precipitation_description", "precipitation_intensity"], color="color", zoom=10
+    ).to_dict()
+    return len(snapshot)
+
+# Case name -> function of the inputs returning the rows handled (and optionally the timed seconds)
+CASES = {
+    "process_weather_trends": per_payload(process_weather_trends),
+    "process_forecast_data": per_payload(process_forecast_data),
+    "process_tomorrow_weather": per_payload(process_tomorrow_weather),
+    "process_tunnel_data.parse": parse_tunnel_nowcasts,
+    "store_weather_data": store_weather_summaries,
+    "email_pipeline.summaries": email_summaries,
+    "dashboard.city_frames": city_frames,
+    "dashboard.city_figure": city_figures,
+    "dashboard.tunnel_map": tunnel_map,
+}
+
+def measure(case, inputs, repeat, budget):
+    """Returns the fastest of `repeat` runs (fewer once `budget` seconds are spent) and the rows handled."""
+    timings = []
+    while len(timings) < repeat and sum(timings) < budget:
+        start = time.perf_counter()
+        result = case(inputs)
+        rows, seconds = result if isinstance(result, tuple) else (result, time.perf_counter() - start)
+        timings.append(seconds)
+    return min(timings), rows
+
+# ------------------
+# Results
+# ------------------
+
+def connect(path=RESULTS_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS results (run_at TEXT, git_commit TEXT, host TEXT, python TEXT, "
+        "case_name TEXT, locations INTEGER, days INTEGER, seconds REAL, rows INTEGER)"
+    )
+    return connection
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def baseline(connection, case_name, locations, days, host=socket.gethostname()):
+    """Median seconds of the last BASELINE_RUNS results for this case and size on this host."""
+    rows = connection.execute(
+        "SELECT seconds FROM results WHERE case_name = ? AND locations = ? AND days = ? AND host = ? "
+        "ORDER BY run_at DESC LIMIT ?",
+        (case_name, locations, days, host, BASELINE_RUNS)
+    ).fetchall()
+    return statistics.median(seconds for seconds, in rows) if rows else None
+
+def print_history(connection, cases):
+    history = pd.read_sql_query(
+        "SELECT run_at, git_commit, case_name, locations, days, seconds FROM results WHERE host = ? ORDER BY run_at",
+        connection, params=(socket.gethostname(),)
+    )
+    history = history[history["case_name"].isin(cases)]
+    if history.empty:
+        print("No saved results on this host.")
+        return
+    history["run"] = history["run_at"].str[:16] + " " + history["git_commit"].fillna("")
+    table = history.pivot_table(index=["case_name", "locations", "days"], columns="run", values="seconds", aggfunc="min")
+    print((table * 1e3).round(2).to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingestion ops and dashboard data preparation on synthetic inputs.")
+    parser.add_argument("--locations", type=int, nargs="+", default=[1, 100, 1000, 10000], help="Cities per input")
+    parser.add_argument("--days", type=int, nargs="+", default=[2, 7, 14], help="Forecast days per city")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest counts")
+    parser.add_argument("--budget", type=float, default=10.0, help="Stop repeating a case after this many seconds")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown against the baseline reported as a regression")
+    parser.add_argument("--no-save", action="store_true", help="Do not add this run to the results")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero when a case regressed")
+    parser.add_argument("--history", action="store_true", help="Print the saved results (ms) and exit")
+    args = parser.parse_args()
+
+    connection = connect()
+    if args.history:
+        print_history(connection, args.cases)
+        sys.exit(0)
+
+    run_at = datetime.now().isoformat(timespec="seconds")
+    commit, host, python = git_commit(), socket.gethostname(), platform.python_version()
+    results, regressions = [], []
+
+    print(f"{'case':<28} {'cities':>6} {'days':>4} {'time':>11} {'rows/s':>11} {'vs baseline':>12}")
+    for days in args.days:
+        for locations in args.locations:
+            inputs = build_inputs(locations, days)
+            for case_name in args.cases:
+                seconds, rows = measure(CASES[case_name], inputs, args.repeat, args.budget)
+                previous = baseline(connection, case_name, locations, days)
+                change = f"{seconds / previous - 1:+11.0%}" if previous else f"{'new':>11}"
+                if previous and seconds > previous * (1 + args.threshold):
+                    regressions.append((case_name, locations, days))
+                    change += "!"
+                print(f"{case_name:<28} {locations:>6} {days:>4} {seconds * 1e3:>9.2f}ms {rows / seconds:>11.0f} {change:>12}")
+                results.append((run_at, commit, host, python, case_name, locations, days, seconds, rows))
+            del inputs
+
+    if not args.no_save:
+        with connection:
+            connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", results)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) more than {args.threshold:.0%} slower than the median of the last {BASELINE_RUNS} runs (marked !)")
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
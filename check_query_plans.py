@@ -0,0 +1,172 @@
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+import psycopg2
+from migrate import DATABASE_URL, migrate
+
+# The hot reads, written as the SQL PostgREST runs for them, with the indexes they
+# should use (from migrations/0004_hot_path_indexes.sql; forecast_weather's unique key
+# from 0002). A sequential scan of the table, or a plan that does not use one of those
+# indexes, is a regression.
+HOT_QUERIES = [
+    {
+        "name": "latest weather_data row for today",
+        "table": "weather_data",
+        "sql": "select * from weather_data where date = %(today)s order by created_at desc limit 1",
+        "indexes": ["weather_data_date_created_at_idx"],
+    },
+    {
+        "name": "today's hourly trend rows",
+        "table": "today_weather_trends",
+        "sql": "select * from today_weather_trends where time >= %(today)s order by id limit 1000",
+        "indexes": ["today_weather_trends_time_created_at_idx"],
+    },
+    {
+        "name": "forecast rows from today onwards",
+        "table": "forecast_weather",
+        "sql": "select * from forecast_weather where time >= %(today)s order by id limit 1000",
+        "indexes": ["forecast_weather_time_key"],
+    },
+    {
+        "name": "tomorrow's hourly rows",
+        "table": "tomorrow_weather",
+        "sql": "select * from tomorrow_weather where time >= %(today)s order by id limit 1000",
+        "indexes": ["tomorrow_weather_time_created_at_idx"],
+    },
+    {
+        "name": "last 7 days of precipitation trends",
+        "table": "precipitation_trends",
+        "sql": "select * from precipitation_trends where date >= %(week_start)s order by id limit 1000",
+        "indexes": ["precipitation_trends_date_created_at_idx"],
+    },
+    {
+        # One row per tunnel: reading it whole is the plan, as long as it stays that small
+        "name": "tunnel snapshot (latest row per tunnel)",
+        "table": "tunnel_latest",
+        "sql": "select location_name, latitude, longitude, precipitation_intensity, precipitation_description, created_at "
+               "from tunnel_latest order by location_name",
+        "indexes": [],
+        "max_rows": 1000,
+    },
+    {
+        "name": "today's wettest tunnels",
+        "table": "tunnel_data",
+        "sql": "select * from tunnel_data where precipitation_intensity > 0 and created_at >= %(today)s "
+               "order by precipitation_intensity desc limit 5",
+        "indexes": ["tunnel_data_created_at_idx"],
+    },
+]
+
+# Synthetic history shaped like the real tables: trends appended hourly (24 rows per
+# run), tunnels every 15 minutes, forecasts upserted per hour, one summary per run.
+SEED_SQL = """
+insert into weather_data (date, location, avg_temp, avg_feels_like, total_rainfall, peak_rainfall_time, suggestion, weather_alert, created_at)
+select run::date, 'Eindhoven', 10, 8, random() * 5, date_trunc('day', run) + interval '14 hours',
+       'No special clothing needed.', 'No alerts', run
+from generate_series(now() - interval '3 years', now(), interval '1 hour') as run;
+
+insert into today_weather_trends (time, temperature, feels_like, humidity, rainfall, created_at)
+select date_trunc('day', run) + hour * interval '1 hour', 10, 8, 80, random(), run
+from generate_series(now() - interval '90 days', now(), interval '1 hour') as run,
+     generate_series(0, 23) as hour;
+
+insert into forecast_weather (date, time, temperature, feels_like, precipitation, humidity, wind_speed, total_rainfall, created_at)
+select hour::date, hour, 10, 8, random(), 80, 12, 3, hour
+from generate_series(date_trunc('hour', now()) - interval '365 days', date_trunc('hour', now()) + interval '2 days', interval '1 hour') as hour
+on conflict (time) do nothing;
+
+insert into tomorrow_weather (time, temperature, feels_like, precipitation, humidity, wind_speed, created_at)
+select date_trunc('day', run) + interval '1 day' + hour * interval '1 hour', 10, 8, random(), 80, 12, run
+from generate_series(now() - interval '365 days', now(), interval '1 day') as run,
+     generate_series(0, 23) as hour;
+
+insert into precipitation_trends (date, precipitation, type, created_at)
+select (run - day * interval '1 day')::date, random() * 5, 'historical', run
+from generate_series(now() - interval '3 years', now(), interval '1 day') as run,
+     generate_series(0, 6) as day;
+
+insert into tunnel_data (location_name, year, latitude, longitude, precipitation_intensity, precipitation_description, created_at)
+select 'Tunnel ' || tunnel, 2000, 51.4 + tunnel / 1000.0, 5.4 + tunnel / 1000.0, random() * 3, 'Light rain', run
+from generate_series(now() - interval '30 days', now(), interval '15 minutes') as run,
+     generate_series(1, 71) as tunnel;
+
+insert into tunnel_latest (location_name, year, latitude, longitude, precipitation_intensity, precipitation_description, created_at)
+select 'Tunnel ' || tunnel, 2000, 51.4 + tunnel / 1000.0, 5.4 + tunnel / 1000.0, random() * 3, 'Light rain', now()
+from generate_series(1, 71) as tunnel
+on conflict (location_name) do update set created_at = excluded.created_at;
+"""
+
+# ------------------
+# Plans
+# ------------------
+
+def plan_nodes(plan):
+    """Yields every node of an EXPLAIN (FORMAT JSON) plan."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+def check_query(cursor, query, params):
+    """Returns the problems found in the plan of one hot query (empty when it uses its index).
+
+    A query without indexes reads a table that is small by design; it is only checked
+    not to scan more than its max_rows.
+    """
+    cursor.execute("explain (format json) " + query["sql"], params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes = list(plan_nodes(plan[0]["Plan"]))
+    # Bitmap index scans carry the index name but not the table, so indexes are matched by name
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+
+    problems = []
+    if not query["indexes"]:
+        scanned = sum(node["Plan Rows"] for node in nodes if node.get("Relation Name") == query["table"])
+        if scanned > query["max_rows"]:
+            problems.append(f"scans {scanned} rows of {query['table']}, more than {query['max_rows']}")
+        return problems
+    if any(node["Node Type"] == "Seq Scan" and node.get("Relation Name") == query["table"] for node in nodes):
+        problems.append(f"sequential scan on {query['table']}")
+    if not used & set(query["indexes"]):
+        problems.append(f"does not use {' or '.join(query['indexes'])} (uses: {', '.join(sorted(used)) or 'no index'})")
+    return problems
+
+def check_query_plans(database_url=DATABASE_URL, seed=False):
+    """Checks every hot query's plan; returns {query name: problems}."""
+    today = date.today()
+    params = {"today": str(today), "week_start": str(today - timedelta(days=8))}
+
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection, connection.cursor() as cursor:
+            if seed:
+                cursor.execute(SEED_SQL)
+            for table in {query["table"] for query in HOT_QUERIES}:
+                cursor.execute(f"analyze {table}")
+
+        with connection, connection.cursor() as cursor:
+            return {query["name"]: check_query(cursor, query, params) for query in HOT_QUERIES}
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the hot read queries use their indexes.")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="Postgres connection string (default: $DATABASE_URL)")
+    parser.add_argument("--migrate", action="store_true", help="Apply pending migrations first")
+    parser.add_argument("--seed", action="store_true", help="Fill the tables with synthetic history first (scratch databases only)")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("Set DATABASE_URL or pass --database-url")
+
+    if args.migrate:
+        migrate(args.database_url)
+
+    results = check_query_plans(args.database_url, seed=args.seed)
+    for name, problems in results.items():
+        print(f"{'FAIL' if problems else 'ok  '} {name}" + "".join(f"\n     {problem}" for problem in problems))
+
+    sys.exit(1 if any(results.values()) else 0)
@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from dagster import RetryPolicy, Backoff, Jitter
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Results of the items an op already finished, so a retry of the op only handles the rest
+CHECKPOINT_PATH = os.getenv("OP_CHECKPOINT_PATH", "state/op_checkpoints.db")
+# Checkpoints of runs that never finished are dropped after this many seconds
+CHECKPOINT_EXPIRY = 7 * 24 * 3600
+
+# Retries for ops that call an upstream: 2s, 4s, 8s (+/- jitter) between attempts.
+# Together with checkpoints a failure on the last item costs one item, not the whole op.
+UPSTREAM_RETRY_POLICY = RetryPolicy(
+    max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "3")),
+    delay=float(os.getenv("UPSTREAM_RETRY_DELAY", "2")),
+    backoff=Backoff.EXPONENTIAL,
+    jitter=Jitter.PLUS_MINUS,
+)
+
+@contextmanager
+def connect(path=CHECKPOINT_PATH):
+    """Yields a connection to the checkpoint database that commits on success."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS completed_items "
+                "(scope TEXT, item TEXT, value TEXT, completed_at REAL, PRIMARY KEY (scope, item))"
+            )
+            yield connection
+    finally:
+        connection.close()
+
+class Checkpoints:
+    """Completed items of one op in one run, with their JSON-serialisable results."""
+
+    def __init__(self, scope, path=CHECKPOINT_PATH):
+        self.scope = scope
+        self.path = path
+
+    def completed(self):
+        """Returns {item: result} for every item already finished in this scope."""
+        with connect(self.path) as connection:
+            rows = connection.execute("SELECT item, value FROM completed_items WHERE scope = ?", (self.scope,))
+            return {item: json.loads(value) for item, value in rows}
+
+    def save(self, item, value):
+        with connect(self.path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO completed_items (scope, item, value, completed_at) VALUES (?, ?, ?, ?)",
+                (self.scope, str(item), json.dumps(value), time.time())
+            )
+
+    def clear(self):
+        """Drops this scope once the op succeeded, and expired scopes of abandoned runs."""
+        with connect(self.path) as connection:
+            connection.execute("DELETE FROM completed_items WHERE scope = ?", (self.scope,))
+            connection.execute("DELETE FROM completed_items WHERE completed_at < ?", (time.time() - CHECKPOINT_EXPIRY,))
+
+def op_checkpoints(context, path=CHECKPOINT_PATH):
+    """Checkpoints of the op being executed.
+
+    They are shared by every attempt of the op in its run and by re-executions of the
+    run (which keep its root run id), so a retry resumes where the failed attempt stopped.
+    """
+    run_id = context.run.root_run_id or context.run_id
+    return Checkpoints(f"{run_id}:{context.job_name}:{context.op.name}", path)
@@ -0,0 +1,145 @@
+import os
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# SQLite file shared by every process that calls an upstream, so a circuit opened by one
+# run also protects the runs after it
+CIRCUIT_PATH = os.getenv("CIRCUIT_PATH", "state/circuits.db")
+
+# A circuit opens when, of the last WINDOW calls to an upstream (at least MIN_CALLS), at
+# least FAILURE_RATIO failed or took longer than SLOW_CALL seconds
+WINDOW = 20
+MIN_CALLS = 5
+FAILURE_RATIO = 0.5
+SLOW_CALL = float(os.getenv("CIRCUIT_SLOW_CALL", "10"))
+# Seconds an open circuit rejects calls before one probe call may test the upstream
+OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "60"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+# ------------------
+# Storage
+# ------------------
+
+@contextmanager
+def connect(path=CIRCUIT_PATH):
+    """Yields a connection inside an immediate (write-locked) transaction."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            ensure_schema(connection)
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.close()
+
+def ensure_schema(connection):
+    connection.execute("CREATE TABLE IF NOT EXISTS circuits (name TEXT PRIMARY KEY, state TEXT, changed_at REAL)")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS calls (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, failed INTEGER, seconds REAL, called_at REAL)"
+    )
+
+def circuit_state(connection, name):
+    row = connection.execute("SELECT state, changed_at FROM circuits WHERE name = ?", (name,)).fetchone()
+    return row if row is not None else (CLOSED, 0.0)
+
+def set_state(connection, name, state, now):
+    connection.execute(
+        "INSERT INTO circuits (name, state, changed_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET state = excluded.state, changed_at = excluded.changed_at",
+        (name, state, now)
+    )
+
+# ------------------
+# Breaker
+# ------------------
+
+def before_call(name, path=CIRCUIT_PATH):
+    """Raises CircuitOpen unless a call to the upstream `name` may go ahead.
+
+    Once OPEN_SECONDS have passed, an open circuit lets a single probe call through
+    (half open); other callers keep failing fast until the probe has been recorded.
+    """
+    now = time.time()
+    with connect(path) as connection:
+        state, changed_at = circuit_state(connection, name)
+        if state == CLOSED:
+            return
+        if now - changed_at < OPEN_SECONDS:
+            raise CircuitOpen(f"Circuit for {name} is {state.replace('_', ' ')}; not calling it for another {OPEN_SECONDS - (now - changed_at):.0f}s")
+        # The wait is over (or a probe never reported back): this caller probes
+        set_state(connection, name, HALF_OPEN, now)
+        logging.info(f"Circuit for {name} half open, probing")
+
+def record_call(name, failed, seconds, path=CIRCUIT_PATH):
+    """Records the outcome of a call and opens or closes the circuit accordingly."""
+    now = time.time()
+    failed = failed or seconds > SLOW_CALL
+    with connect(path) as connection:
+        state, _ = circuit_state(connection, name)
+        connection.execute(
+            "INSERT INTO calls (name, failed, seconds, called_at) VALUES (?, ?, ?, ?)", (name, int(failed), seconds, now)
+        )
+        if state == HALF_OPEN:
+            set_state(connection, name, OPEN if failed else CLOSED, now)
+            logging.warning(f"Circuit for {name} {'opened again' if failed else 'closed'} after a probe")
+            if not failed:
+                # A fresh window, so the failures that opened the circuit do not reopen it
+                connection.execute("DELETE FROM calls WHERE name = ? AND id < (SELECT MAX(id) FROM calls WHERE name = ?)", (name, name))
+            return
+        if state == OPEN or not failed:
+            return
+
+        recent = connection.execute(
+            "SELECT failed FROM calls WHERE name = ? ORDER BY id DESC LIMIT ?", (name, WINDOW)
+        ).fetchall()
+        failures = sum(failed for failed, in recent)
+        if len(recent) >= MIN_CALLS and failures / len(recent) >= FAILURE_RATIO:
+            set_state(connection, name, OPEN, now)
+            logging.warning(f"Circuit for {name} opened: {failures} of the last {len(recent)} calls failed or were slow")
+
+# ------------------
+# Metrics
+# ------------------
+
+def circuit_metrics(since=None, path=CIRCUIT_PATH):
+    """Returns the state of every circuit with its calls, failures and p95 latency since a Unix time (default: last 24 hours)."""
+    since = since if since is not None else time.time() - 24 * 3600
+    with connect(path) as connection:
+        states = pd.read_sql_query("SELECT name, state, changed_at FROM circuits", connection)
+        calls = pd.read_sql_query(
+            "SELECT name, failed, seconds FROM calls WHERE called_at >= ?", connection, params=(since,)
+        )
+    summary = calls.groupby("name", as_index=False).agg(
+        calls=("failed", "size"),
+        failed=("failed", "sum"),
+        latency_p95=("seconds", lambda s: s.quantile(0.95)),
+    )
+    return states.merge(summary, on="name", how="outer")
+
+def prune_calls(older_than, path=CIRCUIT_PATH):
+    """Deletes calls recorded before a Unix time."""
+    with connect(path) as connection:
+        connection.execute("DELETE FROM calls WHERE called_at < ?", (older_than,))
+
+if __name__ == "__main__":
+    print(circuit_metrics().to_string(index=False))
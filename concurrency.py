@@ -0,0 +1,39 @@
+import os
+import argparse
+from dagster import DagsterInstance, in_process_executor
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Op concurrency pools: at most `limit` ops of a pool run at once across all runs of the
+# instance, so overlapping jobs never exceed what an upstream tolerates.
+WEATHERAPI_POOL = "weatherapi"
+BUIENRADAR_POOL = "buienradar"
+EINDHOVEN_DATA_POOL = "eindhoven_open_data"
+SUPABASE_WRITE_POOL = "supabase_writes"
+
+POOL_LIMITS = {
+    WEATHERAPI_POOL: int(os.getenv("WEATHERAPI_POOL_LIMIT", "2")),
+    BUIENRADAR_POOL: int(os.getenv("BUIENRADAR_POOL_LIMIT", "2")),
+    EINDHOVEN_DATA_POOL: int(os.getenv("EINDHOVEN_DATA_POOL_LIMIT", "1")),
+    SUPABASE_WRITE_POOL: int(os.getenv("SUPABASE_WRITE_POOL_LIMIT", "4")),
+}
+
+# Every job runs its steps in the run's own process. A step process of the multiprocess
+# executor costs ~2.5s (even with a preloading forkserver) against 50-300ms per op here,
+# so jobs overlap as separate runs (see dagster.yaml) instead of within a run.
+pipeline_executor = in_process_executor
+
+def apply_pool_limits(instance=None, limits=POOL_LIMITS):
+    """Sets the slot count of every pool on the Dagster instance (default: $DAGSTER_HOME)."""
+    instance = instance or DagsterInstance.get()
+    for pool, limit in limits.items():
+        instance.event_log_storage.set_concurrency_slots(pool, limit)
+    return {pool: instance.event_log_storage.get_concurrency_info(pool).slot_count for pool in limits}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the op concurrency pool limits to the Dagster instance in $DAGSTER_HOME.")
+    parser.parse_args()
+    for pool, slots in apply_pool_limits().items():
+        print(f"{pool}: {slots} slots")
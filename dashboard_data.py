@@ -0,0 +1,253 @@
+import time
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from storage import get_backend
+from rollups import fetch_rollup
+from weather_hourly import HOURLY_TABLE, fetch_hourly
+from tunnel_latest import fetch_latest_tunnels
+
+# Seconds a loaded table is shared between reruns and sessions before it is refetched
+TABLE_CACHE_TTL = 300
+
+# Wall-clock columns marked CITY_TZ are in the table's own city timezone
+CITY_TZ = None
+CITY_TIMEZONES = {"": "Europe/Amsterdam", "_baltic": "Europe/Riga"}
+
+# Column types per table; the *_baltic tables share the schema of their Eindhoven twin.
+# "instants" carry a UTC offset, "wall_times" are local clock times without one.
+TABLE_SCHEMAS = {
+    "weather_data": {
+        "instants": ["created_at"],
+        "floats": ["avg_temp", "avg_feels_like", "total_rainfall"],
+        "categories": ["date", "location", "peak_rainfall_time", "suggestion", "weather_alert"],
+    },
+    "today_weather_trends": {
+        "instants": ["created_at"],
+        "wall_times": {"time": CITY_TZ},
+        "floats": ["temperature", "feels_like", "humidity", "rainfall"],
+    },
+    "forecast_weather": {
+        "instants": ["created_at"],
+        # process_forecast_data writes time as Amsterdam clock time
+        "wall_times": {"time": "Europe/Amsterdam"},
+        "floats": ["temperature", "feels_like", "precipitation", "humidity", "wind_speed", "total_rainfall"],
+        "categories": ["date"],
+    },
+    "tomorrow_weather": {
+        "instants": ["created_at"],
+        "wall_times": {"time": CITY_TZ},
+        "floats": ["temperature", "feels_like", "precipitation", "humidity", "wind_speed"],
+    },
+    "precipitation_trends": {
+        "instants": ["created_at"],
+        "dates": ["date"],
+        "floats": ["precipitation"],
+        "categories": ["type"],
+    },
+    "daily_weather_rollup": {
+        "instants": ["updated_at"],
+        "floats": [
+            "avg_temp", "avg_feels_like", "total_rainfall", "trend_rainfall",
+            "min_temperature", "max_temperature", "min_humidity", "max_humidity",
+        ],
+        "categories": ["location"],
+    },
+    "daily_forecast_rollup": {
+        "instants": ["updated_at"],
+        "floats": ["total_precipitation", "min_temperature", "max_temperature", "min_humidity", "max_humidity"],
+        "categories": ["location"],
+    },
+    "weather_hourly": {
+        "instants": ["time", "updated_at"],
+        "dates": ["date"],
+        "floats": ["temperature", "feels_like", "humidity", "precipitation", "wind_speed"],
+        "categories": ["location"],
+    },
+    "tunnel_data": {
+        "instants": ["created_at"],
+        "floats": ["precipitation_intensity"],
+        "categories": ["location_name", "precipitation_description"],
+    },
+}
+
+# Map colors per rain band (intensity thresholds in mm)
+HEAVY_RAIN_COLOR = "red"
+MODERATE_RAIN_COLOR = "orange"
+LIGHT_RAIN_COLOR = "bec404"
+NO_RAIN_COLOR = "#044ec4"
+
+# ------------------
+# Typed frames
+# ------------------
+
+def split_table_name(table_name):
+    """Splits a table name into its schema name and city suffix."""
+    for suffix in CITY_TIMEZONES:
+        if suffix and table_name.endswith(suffix):
+            return table_name[: -len(suffix)], suffix
+    return table_name, ""
+
+def apply_schema(frame, table_name):
+    """Parses timestamps once (tz-aware) and narrows dtypes following TABLE_SCHEMAS.
+
+    Numerics become float32 and repeated strings categoricals. An empty result still
+    gets every schema column, so filters on it simply match nothing.
+    """
+    schema_name, suffix = split_table_name(table_name)
+    schema = TABLE_SCHEMAS.get(schema_name, {})
+    city_tz = CITY_TIMEZONES[suffix]
+    columns = {}
+
+    if frame.empty:
+        schema_columns = [
+            column for kind in ("instants", "wall_times", "dates", "floats", "categories")
+            for column in schema.get(kind, [])
+        ]
+        frame = pd.DataFrame(columns=list(dict.fromkeys([*frame.columns, *schema_columns])))
+
+    for column in schema.get("instants", []):
+        if column in frame:
+            columns[column] = pd.to_datetime(frame[column], errors="coerce", utc=True).dt.tz_convert(city_tz)
+    for column, tz in schema.get("wall_times", {}).items():
+        if column in frame:
+            columns[column] = pd.to_datetime(frame[column], errors="coerce").dt.tz_localize(
+                tz or city_tz, ambiguous="NaT", nonexistent="shift_forward"
+            )
+    for column in schema.get("dates", []):
+        if column in frame:
+            columns[column] = pd.to_datetime(frame[column], errors="coerce")
+    for column in schema.get("floats", []):
+        if column in frame:
+            columns[column] = pd.to_numeric(frame[column], errors="coerce").astype("float32")
+    for column in schema.get("categories", []):
+        if column in frame:
+            columns[column] = frame[column].astype("category")
+
+    return frame.assign(**columns)
+
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    """Returns the storage backend shared by all sessions (see storage.STORAGE_BACKEND)."""
+    return get_backend()
+
+@st.cache_resource(ttl=TABLE_CACHE_TTL, show_spinner=False)
+def load_table_frame(_storage, table_name, filters=()):
+    """Loads the rows of a table matching `filters` as a typed frame shared by all sessions.
+
+    Filters are (operator, column, value) tuples evaluated by the backend, as PostgREST
+    filters on Supabase or as SQL on the local replica. The returned frame is cached as a
+    single object, so callers must treat it as read-only and derive new frames (filters,
+    `assign`) instead of writing columns.
+    """
+    return apply_schema(_storage.read_frame(table_name, filters=filters), table_name)
+
+@st.cache_resource(ttl=TABLE_CACHE_TTL, show_spinner=False)
+def load_rollup_frame(_storage, table_name, location, start_date):
+    """Loads the daily rollup rows of one location from `start_date` onwards as a typed frame."""
+    rows = fetch_rollup(_storage, table_name, location, start_date)
+    return apply_schema(pd.DataFrame(rows), table_name)
+
+# ------------------
+# City comparison
+# ------------------
+
+@st.cache_resource(show_spinner=False)
+def city_cache():
+    """Per-city hourly rows and daily aggregates shared by all sessions.
+
+    Maps (location, start_date) to (loaded_at, hourly, daily). Sessions run on their own
+    threads: read and change it only while holding city_cache_lock.
+    """
+    return {}
+
+city_cache_lock = threading.Lock()
+
+def daily_city_aggregates(hourly, by=()):
+    """Aggregates hourly rows per local date (per `by` columns and date when given)."""
+    return hourly.groupby([*by, "date"], as_index=False, observed=True).agg(
+        min_temperature=("temperature", "min"),
+        avg_temperature=("temperature", "mean"),
+        max_temperature=("temperature", "max"),
+        avg_humidity=("humidity", "mean"),
+        total_precipitation=("precipitation", "sum"),
+    )
+
+def split_city_frames(rows, locations):
+    """Splits typed weather_hourly rows into {location: (hourly, daily)}, time-sorted.
+
+    Rows are grouped in one pass; a location without rows gets empty frames.
+    """
+    rows = rows.astype({"location": object}).sort_values("time")
+    hourly = dict(tuple(rows.groupby("location", sort=False)))
+    daily = dict(tuple(daily_city_aggregates(rows, by=["location"]).groupby("location", sort=False)))
+    empty = daily_city_aggregates(rows.iloc[:0])
+    return {
+        location: (
+            hourly.get(location, rows.iloc[:0]),
+            daily[location].drop(columns="location").reset_index(drop=True) if location in daily else empty,
+        )
+        for location in locations
+    }
+
+def load_city_frames(_storage, locations, start_date):
+    """Returns {location: (hourly, daily)} for every location from its local midnight of `start_date` onwards.
+
+    Cities loaded less than TABLE_CACHE_TTL seconds ago are served from the cache; all
+    other cities are fetched together in a single query, however many there are. The
+    result is built from the frames found or fetched during this call, so an entry that
+    expires or is replaced by another session meanwhile does not affect it.
+    """
+    cache = city_cache()
+    now = time.monotonic()
+    with city_cache_lock:
+        for key in [key for key, (loaded_at, _, _) in cache.items() if now - loaded_at > TABLE_CACHE_TTL]:
+            del cache[key]
+        frames = {location: cache[(location, start_date)][1:] for location in locations if (location, start_date) in cache}
+    missing = [location for location in locations if location not in frames]
+
+    if missing:
+        rows = apply_schema(fetch_hourly(_storage, missing, start_date), HOURLY_TABLE)
+        fetched = split_city_frames(rows, missing)
+        with city_cache_lock:
+            for location, (hourly, daily) in fetched.items():
+                cache[(location, start_date)] = (now, hourly, daily)
+        frames.update(fetched)
+
+    return {location: frames[location] for location in locations}
+
+# ------------------
+# Tunnel map
+# ------------------
+
+@st.cache_resource(ttl=TABLE_CACHE_TTL, show_spinner=False)
+def fetch_latest_tunnel_rows(_storage):
+    """Fetches the latest row of every tunnel from tunnel_latest, with only the map columns."""
+    return apply_schema(pd.DataFrame(fetch_latest_tunnels(_storage)), "tunnel_data")
+
+def latest_tunnel_snapshot(tunnel_data, today):
+    """Reduces tunnel rows to the latest row per tunnel.
+
+    Tunnels whose latest row is not from `today` are shown without precipitation,
+    matching the map's previous behaviour of merging today's rows onto all tunnels.
+    """
+    snapshot = (
+        tunnel_data.sort_values("created_at")
+        .drop_duplicates(subset=["latitude", "longitude", "location_name"], keep="last")
+        .reset_index(drop=True)
+    )
+
+    is_today = snapshot["created_at"].dt.date == today
+    return snapshot.assign(
+        precipitation_intensity=snapshot["precipitation_intensity"].where(is_today, 0).fillna(0),
+        precipitation_description=snapshot["precipitation_description"].astype(object).where(is_today, "No precipitation"),
+    )
+
+def assign_tunnel_colors(precipitation_intensity):
+    """Bins precipitation intensities into the map colors in one vectorised pass."""
+    return np.select(
+        [precipitation_intensity > 10, precipitation_intensity > 5, precipitation_intensity > 1],
+        [HEAVY_RAIN_COLOR, MODERATE_RAIN_COLOR, LIGHT_RAIN_COLOR],
+        default=NO_RAIN_COLOR,
+    )
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Points sent to the browser per trace, however long the selected range is
+MAX_POINTS = 2000
+
+def lttb_indices(x, y, threshold=MAX_POINTS):
+    """Returns the indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    `x` must be sorted and numeric (use int64 nanoseconds for timestamps). The first and
+    last points are always kept; from every bucket in between the point forming the
+    largest triangle with the previously kept point and the next bucket's average wins.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = a = 0
+
+    for i in range(threshold - 2):
+        next_start = int(np.floor((i + 1) * every)) + 1
+        next_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    indices[-1] = n - 1
+    return indices
+
+def minmax_indices(y, threshold=MAX_POINTS):
+    """Returns the indices of the minimum and maximum of each of threshold / 2 buckets.
+
+    Unlike LTTB this keeps every peak, which suits spiky series such as rainfall.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    bounds = np.linspace(0, n, threshold // 2 + 1).astype(np.int64)
+    indices = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end > start:
+            bucket = y[start:end]
+            indices.extend(sorted({start + int(np.argmin(bucket)), start + int(np.argmax(bucket))}))
+    return np.asarray(indices, dtype=np.int64)
+
+def downsample(frame, x_column, y_column, method="lttb", threshold=MAX_POINTS):
+    """Downsamples a frame sorted on a datetime `x_column` to at most `threshold` rows."""
+    frame = frame.dropna(subset=[x_column, y_column])
+    if method == "minmax":
+        indices = minmax_indices(frame[y_column].to_numpy(), threshold)
+    else:
+        x = frame[x_column]
+        if x.dt.tz is not None:
+            x = x.dt.tz_convert("UTC").dt.tz_localize(None)
+        x = x.to_numpy().astype("datetime64[ns]").astype(np.int64)
+        indices = lttb_indices(x, frame[y_column].to_numpy(), threshold)
+    return frame.iloc[indices]
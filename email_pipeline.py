@@ -1,76 +1,52 @@
 from dotenv import load_dotenv
-import os
-from supabase import create_client
-from dagster import op, job
-import yagmail
+from dagster import job
 import pandas as pd
 from datetime import date
+from storage import get_backend
+from mailer import send_email
+from tracing import traced_op
+from concurrency import pipeline_executor
+from rollups import fetch_rollup, WEATHER_ROLLUP_TABLE, FORECAST_ROLLUP_TABLE
 
 
 # Load environment variables
 load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-# Initialize Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-def fetch_table_data(table_name):
-    """Fetches data from the specified Supabase table."""
-    response = supabase.table(table_name).select("*").execute()
-    if hasattr(response, 'error'):
-        raise Exception(f"Error fetching data from {table_name}: {response.error.message}")
-    return pd.DataFrame(response.data)
-
-def generate_today_weather_summary(weather_data):
-    """Generates a summary of today's weather."""
-    today_date = str(date.today())
-    today_data = weather_data[weather_data["date"] == today_date]
-
-    if not today_data.empty:
-        today_data = today_data.sort_values(by="created_at", ascending=False).iloc[0]
+
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_backend()
+
+location = "Eindhoven"
+
+def generate_today_weather_summary(today_rollup):
+    """Generates a summary of today's weather from its daily rollup row."""
+    if today_rollup and today_rollup.get("avg_temp") is not None:
         return f"""
         Today's Weather:
-        - Average Temperature: {today_data['avg_temp']:.2f}°C
-        - Average Feels Like Temperature: {today_data['avg_feels_like']:.2f}°C
-        - Peak Rainfall Time: {today_data['peak_rainfall_time']}
-        - Total Rainfall: {today_data['total_rainfall']:.2f} mm
-        - Official Alert: {today_data.get('weather_alert', 'No alerts')}
+        - Average Temperature: {today_rollup['avg_temp']:.2f}°C
+        - Average Feels Like Temperature: {today_rollup['avg_feels_like']:.2f}°C
+        - Peak Rainfall Time: {today_rollup['peak_rainfall_time']}
+        - Total Rainfall: {today_rollup['total_rainfall']:.2f} mm
+        - Official Alert: {today_rollup.get('weather_alert') or 'No alerts'}
         """
     return "No weather data available for today."
 
-def generate_weather_trends_summary(today_weather_trends):
-    """Generates a summary of today's weather trends."""
-    today_weather_trends["time"] = pd.to_datetime(today_weather_trends["time"])
-    today_date = date.today()
-    today_trend = today_weather_trends[today_weather_trends["time"].dt.date == today_date]
-
-    if not today_trend.empty:
-        today_trend = today_trend.sort_values(by="time").drop_duplicates(subset=["time"], keep="last")
-        temperatures = today_trend["temperature"]
-        humidity = today_trend["humidity"]
-
+def generate_weather_trends_summary(today_rollup):
+    """Generates a summary of today's weather trends from its daily rollup row."""
+    if today_rollup and today_rollup.get("max_temperature") is not None:
         return f"""
         Weather Trends:
-        - Highest Temperature: {temperatures.max():.2f}°C
-        - Lowest Temperature: {temperatures.min():.2f}°C
-        - Highest Humidity: {humidity.max():.2f}%
-        - Lowest Humidity: {humidity.min():.2f}%
+        - Highest Temperature: {today_rollup['max_temperature']:.2f}°C
+        - Lowest Temperature: {today_rollup['min_temperature']:.2f}°C
+        - Highest Humidity: {today_rollup['max_humidity']:.2f}%
+        - Lowest Humidity: {today_rollup['min_humidity']:.2f}%
         """
     return "No weather trend data available for today."
 
-def generate_forecasted_rainfall_summary(forecast_weather):
-    """Generates a summary of upcoming forecasted rainfall."""
-    forecast_weather["time"] = pd.to_datetime(forecast_weather["time"])
-    today_date = date.today()
-    upcoming_forecast = forecast_weather[forecast_weather["time"].dt.date >= today_date]
-
-    if not upcoming_forecast.empty:
-        upcoming_forecast["date"] = upcoming_forecast["time"].dt.date
-        forecasted_rainfall = upcoming_forecast.groupby("date")["precipitation"].sum().reset_index()
-
+def generate_forecasted_rainfall_summary(forecast_rollup):
+    """Generates a summary of upcoming forecasted rainfall from the daily forecast rollup."""
+    if forecast_rollup:
         return "\n".join(
-            [f"- {row['date']}: {row['precipitation']:.2f} mm" for _, row in forecasted_rainfall.iterrows()]
+            [f"- {row['date']}: {row['total_precipitation']:.2f} mm" for row in forecast_rollup]
         )
     return "No forecasted weather data available."
 
@@ -89,29 +65,32 @@ def generate_tunnel_precipitation_summary(tunnel_data):
     return "No data available for tunnel precipitation."
 
 # Email Operation
-@op
+@traced_op
 def send_email_with_yagmail():
     """Fetches data, generates summaries, and sends an email using Yagmail."""
-    sender_email = os.getenv("sender_email")
-    app_password = os.getenv("app_password")
-    receiver_email = os.getenv("receiver_email")
-
-    # Fetch necessary data
-    weather_data = fetch_table_data("weather_data")
-    forecast_weather = fetch_table_data("forecast_weather")
-    today_weather_trends = fetch_table_data("today_weather_trends")
-    tunnel_data = fetch_table_data("tunnel_data")
+    # Fetch necessary data (daily rollups are maintained by the ingestion jobs)
+    today_date = date.today()
+    weather_rollup = fetch_rollup(storage, WEATHER_ROLLUP_TABLE, location, today_date, today_date)
+    forecast_rollup = fetch_rollup(storage, FORECAST_ROLLUP_TABLE, location, today_date)
+    tunnel_data = pd.DataFrame(storage.select(
+        "tunnel_data",
+        filters=[("gt", "precipitation_intensity", 0), ("gte", "created_at", str(today_date))],
+        order_by="precipitation_intensity",
+        desc=True,
+        limit=5,
+    ))
+    today_rollup = weather_rollup[0] if weather_rollup else None
 
     # Generate summaries
     summary = f"""
     Eindhoven Daily Summary:
 
-    {generate_today_weather_summary(weather_data)}
+    {generate_today_weather_summary(today_rollup)}
 
-    {generate_weather_trends_summary(today_weather_trends)}
+    {generate_weather_trends_summary(today_rollup)}
 
     Forecasted Rainfall Trends:
-    {generate_forecasted_rainfall_summary(forecast_weather)}
+    {generate_forecasted_rainfall_summary(forecast_rollup)}
 
     Tunnel Precipitation (Top 5):
     {generate_tunnel_precipitation_summary(tunnel_data)}
@@ -120,15 +99,14 @@ def send_email_with_yagmail():
     subject = "Eindhoven Daily Summary"
 
     try:
-        # Initialize Yagmail SMTP client
-        yag = yagmail.SMTP(user=sender_email, password=app_password)
-        yag.send(to=receiver_email, subject=subject, contents=summary)
+        # Sent with yagmail (or written to the outbox, see mailer.MAIL_MODE)
+        send_email(subject, summary)
         print("Email sent successfully!")
     except Exception as e:
         raise Exception(f"Failed to send email: {e}")
 
 # Job
-@job
+@job(executor_def=pipeline_executor)
 def email_pipeline():
     """Pipeline to send emails."""
     send_email_with_yagmail()
@@ -0,0 +1,95 @@
+from dagster import job, op, Field, Array
+import os
+import logging
+from datetime import datetime
+import ijson
+import pytz
+import http_client
+from dotenv import load_dotenv
+from storage import get_backend
+from weatherapi import convert_day, forecast_url, FORECAST_DAYS
+from rate_limiter import acquire, WEATHERAPI, LIVE
+from concurrency import pipeline_executor, WEATHERAPI_POOL
+from weather_hourly import day_rows, upsert_hourly
+from rollups import daily_forecast_rollup, upsert_rollup, FORECAST_ROLLUP_TABLE
+
+# Load environment variables
+load_dotenv()
+api_key = os.getenv('api_key')
+
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_backend()
+
+local_tz = pytz.timezone("Europe/Amsterdam")
+
+# Locations ingested by default, and the hourly rows written per storage call
+STREAM_LOCATIONS = ["Eindhoven", "Riga"]
+BATCH_SIZE = 500
+# Bytes read from the response per parser step
+CHUNK_SIZE = 64 * 1024
+
+# ------------------
+# Streaming ingestion
+# ------------------
+
+def stream_forecast_days(stream):
+    """Yields the forecast days of a forecast.json body one at a time as ForecastDay structs.
+
+    Only the day being parsed is held in memory, so memory does not grow with the
+    number of forecast days.
+    """
+    for day in ijson.items(stream, "forecast.forecastday.item", use_float=True, buf_size=CHUNK_SIZE):
+        yield convert_day(day)
+
+def ingest_forecast(location, days=FORECAST_DAYS, batch_size=BATCH_SIZE):
+    """Streams a location's forecast into weather_hourly and the daily forecast rollup.
+
+    Hourly rows are written in batches of `batch_size` while the response is still being
+    read; each day's rollup row is written as soon as the day is complete. Returns the
+    number of hourly rows written.
+    """
+    updated_at = datetime.now(local_tz).isoformat()
+    written, batch = 0, []
+
+    acquire(WEATHERAPI, LIVE)
+    with http_client.get(forecast_url(api_key, location, days), stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+
+        for day in stream_forecast_days(response.raw):
+            rows = day_rows(day, location, updated_at)
+            upsert_rollup(storage, FORECAST_ROLLUP_TABLE, daily_forecast_rollup(rows, location))
+
+            batch.extend(rows)
+            if len(batch) >= batch_size:
+                upsert_hourly(storage, batch)
+                written += len(batch)
+                batch = []
+
+    upsert_hourly(storage, batch)
+    return written + len(batch)
+
+# ------------------
+# Operations
+# ------------------
+
+@op(pool=WEATHERAPI_POOL, config_schema={
+    "locations": Field(Array(str), default_value=STREAM_LOCATIONS),
+    "days": Field(int, default_value=FORECAST_DAYS),
+    "batch_size": Field(int, default_value=BATCH_SIZE),
+})
+def stream_forecasts(context):
+    """Streams the forecast of every configured location into storage, one location at a time."""
+    config = context.op_config
+    for location in config["locations"]:
+        written = ingest_forecast(location, config["days"], config["batch_size"])
+        logging.info(f"Streamed {written} forecast hours ({config['days']} days) for {location}")
+
+# ------------------
+# Jobs
+# ------------------
+
+@job(executor_def=pipeline_executor)
+def extended_forecast_pipeline():
+    """Pipeline to stream long-horizon forecasts for many locations into weather_hourly."""
+    stream_forecasts()
@@ -0,0 +1,211 @@
+from dagster import job, op, ScheduleDefinition
+import logging
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import pandas as pd
+import pytz
+from storage import get_backend
+from concurrency import pipeline_executor, SUPABASE_WRITE_POOL
+from forecast_versions import ISSUANCE_TABLE, DELTA_TABLE
+
+local_tz = pytz.timezone("Europe/Amsterdam")
+
+# Observed daily precipitation per verified location
+OBSERVED_TABLES = {"Eindhoven": "precipitation_trends", "Riga": "precipitation_trends_baltic"}
+# Timezone of each location's observed days; forecast_delta.time is Amsterdam clock time
+LOCATION_TIMEZONES = {"Eindhoven": local_tz, "Riga": pytz.timezone("Europe/Riga")}
+# Longest lead time considered; bounds how far back issuances are read
+MAX_LEAD_DAYS = 14
+# Completed days re-scored on every run: fetch_historical_precipitation refetches the
+# last 7 days, so their observations (and any late issuances) can still change
+RESCORE_DAYS = 7
+# Error of each (location, provider, target date, lead time) forecast, unique on those columns
+SCORES_TABLE = "forecast_verification_scores"
+# Bias and MAE per (location, provider, lead time), recomputed from the scores
+SUMMARY_TABLE = "forecast_verification"
+
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_backend()
+
+# ------------------
+# Verification
+# ------------------
+
+def local_hours(day, tz=local_tz):
+    """Distinct clock hours of a day in `tz`: 23 when DST starts, otherwise 24.
+
+    Times are stored as Amsterdam clock times, so the hour repeated when DST ends shares
+    its time with the first one (in Riga too, which changes at the same instant).
+    """
+    start = tz.localize(datetime.combine(day, time.min))
+    end = tz.localize(datetime.combine(day + timedelta(days=1), time.min))
+    return len(pd.date_range(start, end, freq="h", inclusive="left").strftime("%H").unique())
+
+def forecast_daily_totals(issuances, deltas, tz=local_tz):
+    """Computes each issuance's forecast daily precipitation per target date, in days of `tz`.
+
+    Deltas only hold changed values, so the precipitation an issuance forecast for an
+    hour is the latest precipitation delta of its provider for that hour issued no later
+    than it: an as-of join per provider and hour on issued_at. Each issuance is only
+    joined with the hours of its own window that deltas were read for. Only target days
+    covered by all of their local hours are kept. Target and issue dates are the
+    location's own days, the days its observations are stored by.
+    """
+    precipitation = (
+        deltas.loc[deltas["precipitation"].notna(), ["provider", "time", "issued_at", "precipitation"]]
+        .assign(time=lambda d: pd.to_datetime(d["time"], format="ISO8601"),
+                issued_at=lambda d: pd.to_datetime(d["issued_at"], utc=True))
+        .sort_values("issued_at")
+    )
+    issuances = issuances.assign(issued_at=pd.to_datetime(issuances["issued_at"], utc=True))
+
+    # Every (issuance, hour) inside the issuance's window, clipped to the hours read
+    first_times = pd.to_datetime(issuances["first_time"], format="ISO8601").clip(lower=precipitation["time"].min())
+    last_times = pd.to_datetime(issuances["last_time"], format="ISO8601").clip(upper=precipitation["time"].max())
+    grid = (
+        issuances[["issuance_id", "provider", "issued_at"]]
+        .assign(time=[pd.date_range(first, last, freq="h") for first, last in zip(first_times, last_times)])
+        .explode("time")
+        .dropna(subset=["time"])
+        .astype({"time": "datetime64[ns]"})
+        .sort_values("issued_at")
+    )
+
+    hourly = pd.merge_asof(
+        grid, precipitation.astype({"time": "datetime64[ns]"}),
+        on="issued_at", by=["provider", "time"], direction="backward"
+    ).dropna(subset=["precipitation"])
+
+    # The repeated hour when DST ends was stored once; take it as the first (summer time) one
+    times = hourly["time"].dt.tz_localize(local_tz, ambiguous=np.ones(len(hourly), dtype=bool))
+    hourly["target_date"] = times.dt.tz_convert(tz).dt.date
+    daily = hourly.groupby(["issuance_id", "provider", "issued_at", "target_date"], as_index=False).agg(
+        forecast=("precipitation", "sum"), hours=("precipitation", "size")
+    )
+    daily = daily[daily["hours"] == daily["target_date"].map(lambda day: local_hours(day, tz))]
+
+    issue_date = daily["issued_at"].dt.tz_convert(tz).dt.date
+    daily["lead_days"] = (pd.to_datetime(daily["target_date"]) - pd.to_datetime(issue_date)).dt.days
+    return daily[(daily["lead_days"] >= 0) & (daily["lead_days"] <= MAX_LEAD_DAYS)]
+
+def observed_daily_totals(observed):
+    """Keeps the most recently stored observation per date."""
+    return (
+        observed.sort_values("created_at")
+        .drop_duplicates(subset=["date"], keep="last")
+        .assign(target_date=lambda d: pd.to_datetime(d["date"]).dt.date)[["target_date", "precipitation"]]
+        .rename(columns={"precipitation": "observed"})
+    )
+
+def score_forecasts(daily_forecasts, observed):
+    """Pairs each provider's last issuance per (target date, lead time) with the observation of that day."""
+    latest = daily_forecasts.sort_values("issued_at").drop_duplicates(
+        subset=["provider", "target_date", "lead_days"], keep="last"
+    )
+    scores = latest.set_index("target_date").join(observed.set_index("target_date"), how="inner").reset_index()
+    scores["error"] = scores["forecast"] - scores["observed"]
+    return scores
+
+def verify_location(location, today=None):
+    """Scores newly verifiable days of one location per provider and refreshes its bias/MAE summary.
+
+    Days after the last scored one and the last RESCORE_DAYS completed days are scored;
+    today is never scored, its observation is not complete yet.
+    """
+    tz = LOCATION_TIMEZONES[location]
+    today = today or datetime.now(tz).date()
+    done = storage.select(SCORES_TABLE, "target_date", filters=[("eq", "location", location)],
+                          order_by="target_date", desc=True, limit=1)
+    verified_through = done[0]["target_date"] if done else None
+
+    # Only complete days: the ones after the last verified one, and the recent ones again
+    observed_filters = [("lt", "date", str(today))]
+    if verified_through:
+        first_unverified = date.fromisoformat(str(verified_through)[:10]) + timedelta(days=1)
+        observed_filters.append(("gte", "date", str(min(first_unverified, today - timedelta(days=RESCORE_DAYS)))))
+    observed = storage.read_frame(OBSERVED_TABLES[location], filters=observed_filters)
+    if observed.empty:
+        return 0
+
+    observed = observed_daily_totals(observed)
+    first_day, last_day = min(observed["target_date"]), max(observed["target_date"])
+
+    issuances = pd.DataFrame(storage.select(ISSUANCE_TABLE, filters=[
+        ("eq", "location", location),
+        ("gte", "issued_at", (datetime.combine(first_day, datetime.min.time()) - timedelta(days=MAX_LEAD_DAYS + 1)).isoformat()),
+    ]))
+    # Amsterdam clock times: a day either side covers the location's own days
+    deltas = storage.read_frame(DELTA_TABLE, filters=[
+        ("eq", "location", location),
+        ("gte", "time", str(first_day - timedelta(days=1))),
+        ("lt", "time", str(last_day + timedelta(days=2))),
+    ])
+    if issuances.empty or deltas.empty:
+        return 0
+
+    scores = score_forecasts(forecast_daily_totals(issuances, deltas, tz), observed)
+    storage.upsert(SCORES_TABLE, [
+        {
+            "location": location,
+            "provider": row.provider,
+            "target_date": str(row.target_date),
+            "lead_days": int(row.lead_days),
+            "issuance_id": row.issuance_id,
+            "forecast": float(row.forecast),
+            "observed": float(row.observed),
+            "error": float(row.error),
+        }
+        for row in scores.itertuples()
+    ], on_conflict="location,provider,target_date,lead_days")
+
+    refresh_summary(location)
+    return len(scores)
+
+def refresh_summary(location):
+    """Recomputes bias and MAE per provider and lead time from all scores of a location."""
+    scores = storage.read_frame(SCORES_TABLE, filters=[("eq", "location", location)])
+    if scores.empty:
+        return
+
+    summary = scores.assign(abs_error=scores["error"].abs()).groupby(["provider", "lead_days"], as_index=False).agg(
+        samples=("error", "size"), bias=("error", "mean"), mae=("abs_error", "mean")
+    )
+    updated_at = datetime.now(local_tz).isoformat()
+    storage.upsert(SUMMARY_TABLE, [
+        {
+            "location": location,
+            "provider": row.provider,
+            "lead_days": int(row.lead_days),
+            "samples": int(row.samples),
+            "bias": float(row.bias),
+            "mae": float(row.mae),
+            "updated_at": updated_at,
+        }
+        for row in summary.itertuples()
+    ], on_conflict="location,provider,lead_days")
+
+# ------------------
+# Operations
+# ------------------
+
+@op(pool=SUPABASE_WRITE_POOL)
+def verify_forecasts():
+    """Verifies stored forecasts against observed precipitation for every location."""
+    for location in OBSERVED_TABLES:
+        scored = verify_location(location)
+        logging.info(f"Scored {scored} new or re-scored forecast days for {location}")
+
+# ------------------
+# Jobs
+# ------------------
+
+@job(executor_def=pipeline_executor)
+def forecast_verification_pipeline():
+    """Pipeline to compute forecast bias and MAE per provider and lead time."""
+    verify_forecasts()
+
+forecast_verification_schedule = ScheduleDefinition(
+    job=forecast_verification_pipeline,
+    cron_schedule="30 6 * * *",
+    execution_timezone="Europe/Amsterdam",
+)
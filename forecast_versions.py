@@ -0,0 +1,119 @@
+import uuid
+from datetime import datetime
+import pandas as pd
+import pytz
+
+# One row per forecast_weather_pipeline run (issuance_id, location, provider, issued_at,
+# first_time, last_time, hours)
+ISSUANCE_TABLE = "forecast_issuance"
+# Sparse rows (issuance_id, location, provider, issued_at, time, <fields>): only the hours
+# that changed compared with the provider's previous issuance, with NULL for every field
+# that kept its value
+DELTA_TABLE = "forecast_delta"
+
+# Fields of a process_forecast_data row that are versioned
+VERSIONED_FIELDS = ["date", "temperature", "feels_like", "precipitation", "humidity", "wind_speed", "total_rainfall"]
+
+# ------------------
+# Delta encoding
+# ------------------
+
+def diff_forecast(current, forecast, fields=VERSIONED_FIELDS):
+    """Returns the sparse delta rows of `forecast` against the current values per hour.
+
+    `current` maps each hour's time (as a Timestamp) to its latest known row. Hours that
+    are new get all their fields, known hours only the fields whose value changed.
+    """
+    deltas = []
+    for row in forecast:
+        previous = current.get(pd.Timestamp(row["time"]))
+        changed = {
+            field: row[field] for field in fields
+            if previous is None or previous.get(field) != row[field]
+        }
+        if changed:
+            deltas.append({"time": row["time"], **changed})
+    return deltas
+
+def store_forecast_issuance(storage, location, latest_table, forecast):
+    """Records a forecast issuance as deltas and refreshes the latest forecast table.
+
+    The rows carry the provider that issued them and when it was fetched (see
+    process_forecast_data). Deltas are taken against the same provider's previous
+    issuance, so switching providers does not turn every hour into a change, and the
+    issuance is dated by its fetch time, which for a last known good forecast is when
+    it was first fetched. `latest_table` (forecast_weather or its _baltic twin) holds
+    one row per hour with the latest values of any provider. Returns the issuance row.
+    """
+    if not forecast:
+        return None
+
+    provider = forecast[0]["provider"]
+    issued_at = forecast[0]["fetched_at"] or datetime.now(pytz.utc).isoformat()
+    times = sorted(row["time"] for row in forecast)
+    issuance = {
+        "issuance_id": str(uuid.uuid4()),
+        "location": location,
+        "provider": provider,
+        "issued_at": issued_at,
+        "first_time": times[0],
+        "last_time": times[-1],
+        "hours": len(forecast),
+    }
+
+    previous = latest_issuance(storage, location, provider)
+    issued = reconstruct_forecast(storage, previous) if previous is not None else pd.DataFrame(columns=["time"])
+    # Keyed on parsed times: a timestamp column reads back as "YYYY-MM-DDTHH:MM:SS"
+    deltas = diff_forecast({pd.Timestamp(row["time"]): row for row in issued.to_dict("records")}, forecast)
+
+    storage.insert(ISSUANCE_TABLE, issuance)
+    if deltas:
+        storage.insert(DELTA_TABLE, [
+            {"issuance_id": issuance["issuance_id"], "location": location, "provider": provider, "issued_at": issued_at, **delta}
+            for delta in deltas
+        ])
+
+    # Only hours whose latest values or provider changed need rewriting in the latest table
+    known = storage.select(latest_table, filters=[("gte", "time", times[0]), ("lte", "time", times[-1])])
+    changed = diff_forecast({pd.Timestamp(row["time"]): row for row in known}, forecast, [*VERSIONED_FIELDS, "provider"])
+    if changed:
+        changed_times = {row["time"] for row in changed}
+        storage.upsert(latest_table, [row for row in forecast if row["time"] in changed_times], on_conflict="time")
+
+    return issuance
+
+# ------------------
+# Reconstruction
+# ------------------
+
+def list_issuances(storage, location, start=None):
+    """Lists the issuances of a location (optionally from an ISO timestamp), oldest first."""
+    filters = [("eq", "location", location)]
+    if start is not None:
+        filters.append(("gte", "issued_at", start))
+    return storage.select(ISSUANCE_TABLE, filters=filters, order_by="issued_at")
+
+def latest_issuance(storage, location, provider):
+    """Returns the most recent issuance of a location by one provider, or None."""
+    rows = storage.select(ISSUANCE_TABLE, filters=[("eq", "location", location), ("eq", "provider", provider)],
+                          order_by="issued_at", desc=True, limit=1)
+    return rows[0] if rows else None
+
+def reconstruct_forecast(storage, issuance):
+    """Rebuilds the hourly forecast exactly as it was issued.
+
+    Only deltas of the issuance's provider inside its time window and issued no later
+    than it are read; per hour and field the most recent non-NULL value wins.
+    """
+    deltas = storage.read_frame(DELTA_TABLE, filters=[
+        ("eq", "location", issuance["location"]),
+        ("eq", "provider", issuance["provider"]),
+        ("gte", "time", issuance["first_time"]),
+        ("lte", "time", issuance["last_time"]),
+        ("lte", "issued_at", issuance["issued_at"]),
+    ])
+    if deltas.empty:
+        return pd.DataFrame(columns=["time", *VERSIONED_FIELDS])
+
+    forecast = deltas.sort_values("issued_at").groupby("time", as_index=False)[VERSIONED_FIELDS].last()
+    return forecast.assign(issuance_id=issuance["issuance_id"], issued_at=issuance["issued_at"])
@@ -0,0 +1,274 @@
+import os
+import io
+import json
+import time
+import base64
+import random
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+from dotenv import load_dotenv
+from tracing import span, mark_stale
+from circuit_breaker import before_call, record_call, CircuitOpen
+
+# Load environment variables
+load_dotenv()
+
+# "live" calls the upstreams, "record" calls them and saves every response,
+# "replay" serves saved responses only and never touches the network
+HTTP_MODE = os.getenv("HTTP_MODE", "live")
+# Recorded responses, one JSON file per request under <host>/
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes")
+# Replay only: added delay per request (seconds), share of requests that fail, and the
+# seed that makes those failures repeat identically between runs
+REPLAY_LATENCY = float(os.getenv("REPLAY_LATENCY", "0"))
+REPLAY_ERROR_RATE = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+REPLAY_SEED = int(os.getenv("REPLAY_SEED", "0"))
+
+# Seconds to connect and to wait for data, for calls that do not pass their own timeout
+TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")), float(os.getenv("HTTP_READ_TIMEOUT", "30")))
+# Last successful response per URL, for calls made with fallback (same layout as the cassettes)
+LAST_GOOD_PATH = os.getenv("LAST_GOOD_PATH", "state/last_good")
+# Header set on a last known good response served in place of a failed call (its saved time)
+STALE_HEADER = "X-Last-Known-Good"
+# Seconds a last known good response may stand in for a failed call; older ones are not
+# served and the failure is raised instead
+LAST_GOOD_MAX_AGE = float(os.getenv("LAST_GOOD_MAX_AGE", str(6 * 3600)))
+
+# Query parameters never written to disk
+SECRET_PARAMS = {"key"}
+# Query parameters that may differ between recording and replay (dates, horizon); a
+# request without an exact recording replays one that only differs in these
+LOOSE_PARAMS = {"dt", "end_dt", "days", "forecast_days"}
+
+# Headers describing the wire encoding, which no longer applies to the saved body
+WIRE_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+
+class CassetteMissing(requests.ConnectionError):
+    """Raised in replay mode for a request that was never recorded."""
+
+# ------------------
+# Cassettes
+# ------------------
+
+def normalize_url(url, drop=()):
+    """Returns the URL without secret parameters (and `drop`), with sorted parameters."""
+    parts = urlsplit(url)
+    params = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in SECRET_PARAMS and name not in drop
+    )
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(params), ""))
+
+def cassette_key(method, url, drop=()):
+    return hashlib.sha1(f"{method} {normalize_url(url, drop)}".encode()).hexdigest()[:16]
+
+def cassette_file(method, url, path=CASSETTE_PATH):
+    return os.path.join(path, urlsplit(url).netloc, f"{cassette_key(method, url)}.json")
+
+def save_cassette(method, url, status, headers, body, path=CASSETTE_PATH):
+    """Writes one response to disk; the body is stored as text when it is UTF-8."""
+    try:
+        encoded, encoding = body.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        encoded, encoding = base64.b64encode(body).decode("ascii"), "base64"
+
+    file = cassette_file(method, url, path)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    with open(file, "w") as f:
+        json.dump({
+            "method": method,
+            "url": normalize_url(url),
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in WIRE_HEADERS},
+            "encoding": encoding,
+            "body": encoded,
+        }, f, indent=1)
+    return file
+
+def cassette_body(cassette):
+    if cassette["encoding"] == "base64":
+        return base64.b64decode(cassette["body"])
+    return cassette["body"].encode("utf-8")
+
+# ------------------
+# Transport
+# ------------------
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport that records responses to, or replays them from, the cassette directory."""
+
+    def __init__(self, mode, path=CASSETTE_PATH, latency=REPLAY_LATENCY, error_rate=REPLAY_ERROR_RATE, seed=REPLAY_SEED):
+        super().__init__()
+        self.mode = mode
+        self.path = path
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.loose_index = {}
+
+    def send(self, request, **kwargs):
+        if self.mode == "record":
+            kwargs["stream"] = False
+            response = super().send(request, **kwargs)
+            file = save_cassette(request.method, request.url, response.status_code, response.headers, response.content, self.path)
+            # Served from the saved copy, so recording and replay return identical responses
+            with open(file) as f:
+                return self.cassette_response(request, json.load(f))
+
+        with self.lock:
+            fail = self.random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise requests.ConnectionError(f"Injected replay error for {normalize_url(request.url)}")
+        return self.cassette_response(request, self.find_cassette(request.method, request.url))
+
+    def find_cassette(self, method, url):
+        """Returns the exact recording of a request, or one differing only in LOOSE_PARAMS."""
+        file = cassette_file(method, url, self.path)
+        if os.path.exists(file):
+            with open(file) as f:
+                return json.load(f)
+
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.loose_index:
+                self.loose_index[host] = self.index_host(host)
+            cassette = self.loose_index[host].get(cassette_key(method, url, LOOSE_PARAMS))
+        if cassette is None:
+            raise CassetteMissing(f"No recording for {method} {normalize_url(url)}; run once with HTTP_MODE=record")
+        return cassette
+
+    def index_host(self, host):
+        index = {}
+        directory = os.path.join(self.path, host)
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            with open(os.path.join(directory, name)) as f:
+                cassette = json.load(f)
+            index[cassette_key(cassette["method"], cassette["url"], LOOSE_PARAMS)] = cassette
+        return index
+
+    def cassette_response(self, request, cassette):
+        raw = HTTPResponse(
+            body=io.BytesIO(cassette_body(cassette)),
+            headers=cassette["headers"],
+            status=cassette["status"],
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
+
+# ------------------
+# Session
+# ------------------
+
+def get_session(mode=HTTP_MODE):
+    """Returns a requests session for HTTP_MODE ("live", "record" or "replay")."""
+    session = requests.Session()
+    if mode in ("record", "replay"):
+        adapter = CassetteAdapter(mode)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    return session
+
+# Shared by every upstream call in the pipelines
+session = get_session()
+
+def is_failure(response):
+    """Responses that count against the upstream's circuit: server errors and rate limiting."""
+    return response.status_code >= 500 or response.status_code == 429
+
+def call(url, **kwargs):
+    """One GET behind the circuit breaker of the URL's host."""
+    host = urlsplit(url).netloc
+    before_call(host)
+    start = time.monotonic()
+    with span("http.get", phase="http", url=normalize_url(url), host=host) as record:
+        try:
+            response = session.get(url, **kwargs)
+        except CassetteMissing:
+            # A gap in the recordings, not an upstream failure
+            raise
+        except requests.RequestException:
+            record_call(host, True, time.monotonic() - start)
+            raise
+        record_call(host, is_failure(response), time.monotonic() - start)
+        # A streamed body is still unread; its size is only known from the headers
+        size = response.headers.get("Content-Length") if kwargs.get("stream") else len(response.content)
+        record.set(status=response.status_code, bytes=int(size) if size is not None else None)
+        return response
+
+def remember(url, response, path=LAST_GOOD_PATH):
+    """Keeps a successful response as the URL's last known good one."""
+    save_cassette("GET", url, response.status_code, response.headers, response.content, path)
+
+def last_known_good(url, path=LAST_GOOD_PATH, max_age=LAST_GOOD_MAX_AGE):
+    """Returns the URL's last known good response marked stale (see is_stale), or None.
+
+    A response saved more than `max_age` seconds ago counts as none.
+    """
+    file = cassette_file("GET", url, path)
+    try:
+        with open(file) as f:
+            cassette = json.load(f)
+        saved = os.path.getmtime(file)
+    except FileNotFoundError:
+        return None
+    saved_at = datetime.fromtimestamp(saved, timezone.utc).isoformat()
+    if time.time() - saved > max_age:
+        logging.warning(f"The last known good response for {normalize_url(url)} is from {saved_at}, too old to serve")
+        return None
+    response = requests.Response()
+    response.status_code = cassette["status"]
+    response.headers.update(cassette["headers"])
+    response.headers[STALE_HEADER] = saved_at
+    response._content = cassette_body(cassette)
+    response.url = url
+    mark_stale()
+    return response
+
+def is_stale(response):
+    return STALE_HEADER in response.headers
+
+def fetched_at(response):
+    """When the response's data was fetched: its saved time when stale, otherwise now (ISO, UTC)."""
+    return response.headers.get(STALE_HEADER) or datetime.now(timezone.utc).isoformat()
+
+def get(url, fallback=False, **kwargs):
+    """GET through the shared session; same arguments and result as requests.get.
+
+    Calls time out after TIMEOUT unless given a timeout, and fail fast with CircuitOpen
+    while the host's circuit is open. With `fallback`, successful responses are kept
+    and a failed call (error, 5xx/429 or open circuit) returns the last known good
+    response instead, marked stale; without one, or when it is older than
+    LAST_GOOD_MAX_AGE, the failure is raised as usual.
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    try:
+        response = call(url, **kwargs)
+        failure = f"status {response.status_code}" if is_failure(response) else None
+    except (CircuitOpen, requests.RequestException) as e:
+        if not fallback:
+            raise
+        response, failure = None, e
+
+    if not fallback:
+        return response
+    if failure is None:
+        if response.ok:
+            remember(url, response)
+        return response
+    stale = last_known_good(url)
+    if stale is None:
+        if response is None:
+            raise failure
+        return response
+    logging.warning(f"Serving the last known good response (from {stale.headers[STALE_HEADER]}) for {normalize_url(url)}: {failure}")
+    return stale
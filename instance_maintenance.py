@@ -0,0 +1,246 @@
+from dagster import job, op, Field, ScheduleDefinition, DagsterInstance, DagsterRunStatus, RunsFilter
+import os
+import re
+import json
+import shutil
+import sqlite3
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from concurrency import pipeline_executor
+from circuit_breaker import prune_calls
+from providers import prune_latencies
+from rate_limiter import prune_metrics
+from tracing import rotate_traces
+
+# Load environment variables
+load_dotenv()
+
+# Finished runs are kept this many days, with their event logs, outputs and compute logs
+RUN_RETENTION_DAYS = int(os.getenv("RUN_RETENTION_DAYS", "30"))
+# Schedule and sensor ticks are kept this many days (the sensor ticks every 30 seconds)
+TICK_RETENTION_DAYS = int(os.getenv("TICK_RETENTION_DAYS", "7"))
+# Upstream call history, provider latencies and rate limiter waits in the shared state databases are kept this many days
+STATE_RETENTION_DAYS = int(os.getenv("STATE_RETENTION_DAYS", "7"))
+# Runs deleted per query, so a first cleanup of months of runs does not load them all
+DELETE_BATCH = 100
+
+FINISHED_STATUSES = [DagsterRunStatus.SUCCESS, DagsterRunStatus.FAILURE, DagsterRunStatus.CANCELED]
+# Directories and per-run event log files are named after their run id
+RUN_ID = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+# ------------------
+# Instances
+# ------------------
+
+def legacy_config(home):
+    """Storage config for instance directories laid out as storage/{runs,event_logs,schedules}/."""
+    storage = os.path.join(home, "storage")
+    return {
+        "run_storage": {"module": "dagster._core.storage.runs", "class": "SqliteRunStorage",
+                        "config": {"base_dir": os.path.join(storage, "runs")}},
+        "event_log_storage": {"module": "dagster._core.storage.event_log", "class": "SqliteEventLogStorage",
+                              "config": {"base_dir": os.path.join(storage, "event_logs")}},
+        "schedule_storage": {"module": "dagster._core.storage.schedules", "class": "SqliteScheduleStorage",
+                             "config": {"base_dir": os.path.join(storage, "schedules")}},
+    }
+
+def open_instance(home=None):
+    """The instance in `home` (default: $DAGSTER_HOME), whichever SQLite layout it uses.
+
+    A legacy directory without a dagster.yaml is first given one describing its layout
+    (JSON is valid YAML), so it opens like any other instance.
+    """
+    if home is None:
+        return DagsterInstance.get()
+    home = os.path.abspath(home)
+    config = os.path.join(home, "dagster.yaml")
+    if not os.path.exists(config) and os.path.exists(os.path.join(home, "storage", "runs", "runs.db")):
+        with open(config, "w") as f:
+            json.dump(legacy_config(home), f, indent=2)
+
+    previous = os.environ.get("DAGSTER_HOME")
+    os.environ["DAGSTER_HOME"] = home
+    try:
+        return DagsterInstance.get()
+    finally:
+        if previous is None:
+            del os.environ["DAGSTER_HOME"]
+        else:
+            os.environ["DAGSTER_HOME"] = previous
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path) for name in names
+        if os.path.isfile(os.path.join(directory, name))
+    )
+
+# ------------------
+# Maintenance
+# ------------------
+
+def prune_runs(instance, before):
+    """Deletes finished runs created before a datetime, with their event logs; returns how many."""
+    deleted = 0
+    while True:
+        records = instance.get_run_records(
+            filters=RunsFilter(statuses=FINISHED_STATUSES, created_before=before), limit=DELETE_BATCH
+        )
+        for record in records:
+            instance.delete_run(record.dagster_run.run_id)
+        deleted += len(records)
+        if len(records) < DELETE_BATCH:
+            return deleted
+
+def purge_ticks(instance, before):
+    """Deletes the schedule and sensor ticks older than a datetime; returns the instigators purged."""
+    if instance.schedule_storage is None:
+        # Ephemeral instances (execute_in_process) keep no ticks
+        return 0
+    states = instance.all_instigator_state()
+    for state in states:
+        instance.purge_ticks(state.instigator_origin_id, state.selector_id, before.timestamp())
+    return len(states)
+
+def collect_orphans(instance, root):
+    """Removes outputs, compute logs and event log files of runs the instance no longer has.
+
+    Returns the paths removed. Anything not named after a run id is left alone.
+    """
+    removed = []
+    for directory, subdirectories, names in os.walk(root):
+        for name in list(subdirectories):
+            if RUN_ID.match(name) and not instance.has_run(name):
+                shutil.rmtree(os.path.join(directory, name))
+                subdirectories.remove(name)
+                removed.append(os.path.join(directory, name))
+        for name in names:
+            stem, extension = os.path.splitext(name)
+            if extension == ".db" and RUN_ID.match(stem) and not instance.has_run(stem):
+                os.remove(os.path.join(directory, name))
+                removed.append(os.path.join(directory, name))
+    return removed
+
+def vacuum(instance, root):
+    """Rewrites the SQLite databases under root to drop the pages freed by deletes.
+
+    The event log database of a run that has not finished is skipped. The shared run,
+    event and schedule databases are rewritten too, so this is only run from the command
+    line, best with the daemon stopped.
+    """
+    vacuumed = []
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            stem, extension = os.path.splitext(name)
+            if extension != ".db":
+                continue
+            if RUN_ID.match(stem):
+                run = instance.get_run_by_id(stem)
+                if run is not None and run.status not in FINISHED_STATUSES:
+                    continue
+            path = os.path.join(directory, name)
+            connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+            try:
+                connection.execute("VACUUM")
+                vacuumed.append(path)
+            except sqlite3.DatabaseError as e:
+                # Busy (the daemon is writing) or not a database; the next run tries again
+                logging.warning(f"Could not vacuum {path}: {e}")
+            finally:
+                connection.close()
+    return vacuumed
+
+def maintain(instance, run_retention_days=RUN_RETENTION_DAYS, tick_retention_days=TICK_RETENTION_DAYS,
+             vacuum_databases=False):
+    """Prunes old runs and ticks, removes orphaned run files and optionally vacuums the instance's databases.
+
+    Returns what was done and the space reclaimed in bytes.
+    """
+    root = instance.root_directory
+    now = datetime.now(timezone.utc)
+    size_before = directory_size(root)
+
+    runs = prune_runs(instance, now - timedelta(days=run_retention_days))
+    instigators = purge_ticks(instance, now - timedelta(days=tick_retention_days))
+    orphans = collect_orphans(instance, root)
+    databases = vacuum(instance, root) if vacuum_databases else []
+
+    size_after = directory_size(root)
+    return {
+        "root": root,
+        "runs_deleted": runs,
+        "instigators_purged": instigators,
+        "orphans_removed": len(orphans),
+        "databases_vacuumed": len(databases),
+        "bytes_before": size_before,
+        "bytes_after": size_after,
+        "bytes_reclaimed": size_before - size_after,
+    }
+
+def prune_state(state_retention_days=STATE_RETENTION_DAYS):
+    """Deletes upstream state older than the retention from the shared state databases and rotates the trace file."""
+    before = datetime.now(timezone.utc) - timedelta(days=state_retention_days)
+    prune_calls(before.timestamp())
+    prune_latencies(before.timestamp())
+    prune_metrics(before.timestamp())
+    rotate_traces()
+
+# ------------------
+# Operations
+# ------------------
+
+@op(config_schema={
+    "run_retention_days": Field(int, default_value=RUN_RETENTION_DAYS),
+    "tick_retention_days": Field(int, default_value=TICK_RETENTION_DAYS),
+    "state_retention_days": Field(int, default_value=STATE_RETENTION_DAYS),
+})
+def maintain_instance(context):
+    """Applies the retention policy to the Dagster instance this job runs on and to the upstream state."""
+    config = context.op_config
+    prune_state(config["state_retention_days"])
+    report = maintain(context.instance, config["run_retention_days"], config["tick_retention_days"])
+    logging.info(
+        f"Deleted {report['runs_deleted']} runs and {report['orphans_removed']} orphaned run files, "
+        f"reclaimed {report['bytes_reclaimed'] / 2**20:.1f} MB "
+        f"({report['bytes_after'] / 2**20:.1f} MB left)"
+    )
+    return report
+
+# ------------------
+# Jobs
+# ------------------
+
+@job(executor_def=pipeline_executor)
+def instance_maintenance_pipeline():
+    """Pipeline to prune old runs, ticks and run files from the Dagster instance, and old upstream state.
+
+    It does not vacuum: the daemon and this run hold the instance's databases open.
+    """
+    maintain_instance()
+
+instance_maintenance_schedule = ScheduleDefinition(
+    job=instance_maintenance_pipeline,
+    cron_schedule="30 4 * * 0",
+    execution_timezone="Europe/Amsterdam",
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the retention policy to Dagster instance directories and report the space reclaimed.")
+    parser.add_argument("homes", nargs="*", help="Instance directories (default: $DAGSTER_HOME)")
+    parser.add_argument("--days", type=int, default=RUN_RETENTION_DAYS, help="Keep finished runs this many days")
+    parser.add_argument("--tick-days", type=int, default=TICK_RETENTION_DAYS, help="Keep schedule and sensor ticks this many days")
+    parser.add_argument("--no-vacuum", action="store_true", help="Do not vacuum the SQLite databases (best done with the daemon stopped)")
+    parser.add_argument("--state-days", type=int, default=STATE_RETENTION_DAYS, help="Keep upstream call history, provider latencies and rate limiter waits this many days")
+    args = parser.parse_args()
+
+    prune_state(args.state_days)
+
+    print(f"{'instance':<50} {'runs':>6} {'orphans':>8} {'dbs':>4} {'before':>10} {'after':>10} {'reclaimed':>10}")
+    for home in args.homes or [None]:
+        report = maintain(open_instance(home), args.days, args.tick_days, vacuum_databases=not args.no_vacuum)
+        print(
+            f"{report['root']:<50} {report['runs_deleted']:>6} {report['orphans_removed']:>8} {report['databases_vacuumed']:>4} "
+            f"{report['bytes_before'] / 1024:>8.0f}kB {report['bytes_after'] / 1024:>8.0f}kB {report['bytes_reclaimed'] / 1024:>8.0f}kB"
+        )
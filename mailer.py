@@ -0,0 +1,29 @@
+import os
+import json
+import yagmail
+from datetime import datetime
+from dotenv import load_dotenv
+from tracing import span
+
+# Load environment variables
+load_dotenv()
+
+# "smtp" sends through Gmail (yagmail), "outbox" writes each e-mail to OUTBOX_PATH instead
+MAIL_MODE = os.getenv("MAIL_MODE", "smtp")
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "state/outbox")
+
+def send_email(subject, contents):
+    """Sends an e-mail from sender_email to receiver_email (see MAIL_MODE)."""
+    receiver_email = os.getenv("receiver_email")
+
+    with span("email.send", phase="email", mode=MAIL_MODE, bytes=len(contents.encode())):
+        if MAIL_MODE == "outbox":
+            os.makedirs(OUTBOX_PATH, exist_ok=True)
+            sent_at = datetime.now()
+            file = os.path.join(OUTBOX_PATH, f"{sent_at:%Y%m%d-%H%M%S-%f}.json")
+            with open(file, "w") as f:
+                json.dump({"to": receiver_email, "subject": subject, "contents": contents, "sent_at": sent_at.isoformat()}, f, indent=1)
+            return file
+
+        yag = yagmail.SMTP(user=os.getenv("sender_email"), password=os.getenv("app_password"))
+        yag.send(to=receiver_email, subject=subject, contents=contents)
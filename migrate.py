@@ -0,0 +1,75 @@
+import os
+import glob
+import argparse
+from dotenv import load_dotenv
+import psycopg2
+
+# Load environment variables
+load_dotenv()
+# Postgres connection string of the Supabase database (or a local Postgres)
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# <version>_<name>.sql files, applied in version order
+MIGRATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Versions applied so far
+MIGRATIONS_TABLE = "schema_migrations"
+
+# ------------------
+# Migrations
+# ------------------
+
+def list_migrations(path=MIGRATIONS_PATH):
+    """Returns (version, path) of every migration file, oldest first."""
+    files = sorted(glob.glob(os.path.join(path, "*.sql")))
+    return [(os.path.basename(file).split("_", 1)[0], file) for file in files]
+
+def applied_versions(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"create table if not exists {MIGRATIONS_TABLE} "
+            "(version text primary key, name text not null, applied_at timestamptz not null default now())"
+        )
+        cursor.execute(f"select version from {MIGRATIONS_TABLE}")
+        return {row[0] for row in cursor.fetchall()}
+
+def migrate(database_url=DATABASE_URL, path=MIGRATIONS_PATH, dry_run=False):
+    """Applies every pending migration, each in its own transaction. Returns the applied versions."""
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection:
+            done = applied_versions(connection)
+
+        applied = []
+        for version, file in list_migrations(path):
+            if version in done:
+                continue
+            print(f"{'Pending' if dry_run else 'Applying'} {os.path.basename(file)}")
+            if dry_run:
+                continue
+
+            with open(file) as f:
+                sql = f.read()
+            with connection, connection.cursor() as cursor:
+                cursor.execute(sql)
+                cursor.execute(
+                    f"insert into {MIGRATIONS_TABLE} (version, name) values (%s, %s)",
+                    (version, os.path.basename(file))
+                )
+            applied.append(version)
+
+        return applied
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending database migrations.")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="Postgres connection string (default: $DATABASE_URL)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list pending migrations")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("Set DATABASE_URL or pass --database-url")
+
+    applied = migrate(args.database_url, dry_run=args.dry_run)
+    if not args.dry_run:
+        print(f"Applied {len(applied)} migrations")
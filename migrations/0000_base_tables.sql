@@ -0,0 +1,82 @@
+-- Tables written by the original store_* ops, as they were created in Supabase: every
+-- time and date is text. Lets a fresh (local) database reach the current schema by
+-- applying all migrations in order; on Supabase it changes nothing.
+
+do $$
+declare
+    suffix text;
+begin
+    foreach suffix in array array['', '_baltic'] loop
+        execute format($sql$
+            create table if not exists %I (
+                id bigint generated by default as identity primary key,
+                date text,
+                location text,
+                avg_temp real,
+                avg_feels_like real,
+                total_rainfall real,
+                peak_rainfall_time text,
+                suggestion text,
+                weather_alert text,
+                created_at text
+            )$sql$, 'weather_data' || suffix);
+
+        execute format($sql$
+            create table if not exists %I (
+                id bigint generated by default as identity primary key,
+                time text,
+                temperature real,
+                feels_like real,
+                humidity real,
+                rainfall real,
+                created_at text
+            )$sql$, 'today_weather_trends' || suffix);
+
+        execute format($sql$
+            create table if not exists %I (
+                id bigint generated by default as identity primary key,
+                date text,
+                time text,
+                temperature real,
+                feels_like real,
+                precipitation real,
+                humidity real,
+                wind_speed real,
+                total_rainfall real,
+                created_at text
+            )$sql$, 'forecast_weather' || suffix);
+
+        execute format($sql$
+            create table if not exists %I (
+                id bigint generated by default as identity primary key,
+                time text,
+                temperature real,
+                feels_like real,
+                precipitation real,
+                humidity real,
+                wind_speed real,
+                created_at text
+            )$sql$, 'tomorrow_weather' || suffix);
+
+        execute format($sql$
+            create table if not exists %I (
+                id bigint generated by default as identity primary key,
+                date text,
+                precipitation real,
+                type text,
+                created_at text
+            )$sql$, 'precipitation_trends' || suffix);
+    end loop;
+end
+$$;
+
+create table if not exists tunnel_data (
+    id bigint generated by default as identity primary key,
+    location_name text,
+    year integer,
+    latitude double precision,
+    longitude double precision,
+    precipitation_intensity real,
+    precipitation_description text,
+    created_at text
+);
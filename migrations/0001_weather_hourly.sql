@@ -0,0 +1,96 @@
+-- Unified long-format hourly weather for every city, keyed by (location, time).
+-- Replaces one-query-per-city-table reads (today_weather_trends, forecast_weather,
+-- tomorrow_weather and their *_baltic twins) for cross-city comparisons.
+
+create table if not exists weather_hourly (
+    id bigint generated by default as identity primary key,
+    location text not null,
+    time timestamptz not null,
+    date date not null,
+    temperature real,
+    feels_like real,
+    humidity real,
+    precipitation real,
+    wind_speed real,
+    updated_at timestamptz not null default now()
+);
+
+-- Upsert target and the index behind "these cities over this period" reads
+create unique index if not exists weather_hourly_location_time_key on weather_hourly (location, time);
+-- Incremental replica sync reads by updated_at
+create index if not exists weather_hourly_updated_at_idx on weather_hourly (updated_at);
+
+-- When process_forecast_data started writing real Amsterdam clock times for a location:
+-- the first issuance whose first hour is the city's midnight (00:00 Amsterdam for
+-- Eindhoven, 23:00 for Riga). Shifted issuances start at 01:00 or 02:00. 'infinity'
+-- while there is none. 0009 uses it to correct the stored rows and then drops it.
+create or replace function forecast_time_fixed_at(location_name text) returns timestamptz
+language plpgsql stable as $$
+declare
+    fixed_at timestamptz;
+begin
+    if to_regclass('forecast_issuance') is null then
+        return 'infinity';
+    end if;
+    execute 'select min(issued_at::timestamptz) from forecast_issuance
+             where location = $1 and extract(hour from first_time::timestamp) not in (1, 2)'
+        into fixed_at using location_name;
+    return coalesce(fixed_at, 'infinity');
+end
+$$;
+
+-- Backfill from the per-city tables. Of all copies of an hour, the most recently
+-- written one wins.
+--   today_weather_trends / tomorrow_weather: time is the city's local clock time,
+--     created_at carries a UTC offset.
+--   forecast_weather: until it switched to time_epoch, process_forecast_data read
+--     WeatherAPI's local clock time as UTC and wrote it as Amsterdam clock time, so for
+--     rows created before forecast_time_fixed_at the local clock time is recovered
+--     first. Later rows hold real Amsterdam clock time. created_at is Amsterdam clock
+--     time in both.
+insert into weather_hourly (location, time, date, temperature, feels_like, humidity, precipitation, wind_speed, updated_at)
+select distinct on (location, time)
+    location, time, (time at time zone city_tz)::date, temperature, feels_like, humidity, precipitation, wind_speed, updated_at
+from (
+    select 'Eindhoven' as location, 'Europe/Amsterdam' as city_tz,
+           time::timestamp at time zone 'Europe/Amsterdam' as time,
+           temperature::real, feels_like::real, humidity::real, rainfall::real as precipitation, null::real as wind_speed,
+           created_at::timestamptz as updated_at
+    from today_weather_trends
+    union all
+    select 'Eindhoven', 'Europe/Amsterdam',
+           time::timestamp at time zone 'Europe/Amsterdam',
+           temperature::real, feels_like::real, humidity::real, precipitation::real, wind_speed::real,
+           created_at::timestamptz
+    from tomorrow_weather
+    union all
+    select 'Eindhoven', 'Europe/Amsterdam',
+           case when created_at::timestamp at time zone 'Europe/Amsterdam' < forecast_time_fixed_at('Eindhoven')
+                then ((time::timestamp at time zone 'Europe/Amsterdam') at time zone 'UTC') at time zone 'Europe/Amsterdam'
+                else time::timestamp at time zone 'Europe/Amsterdam' end,
+           temperature::real, feels_like::real, humidity::real, precipitation::real, wind_speed::real,
+           created_at::timestamp at time zone 'Europe/Amsterdam'
+    from forecast_weather
+    union all
+    select 'Riga', 'Europe/Riga',
+           time::timestamp at time zone 'Europe/Riga',
+           temperature::real, feels_like::real, humidity::real, rainfall::real, null::real,
+           created_at::timestamptz
+    from today_weather_trends_baltic
+    union all
+    select 'Riga', 'Europe/Riga',
+           time::timestamp at time zone 'Europe/Riga',
+           temperature::real, feels_like::real, humidity::real, precipitation::real, wind_speed::real,
+           created_at::timestamptz
+    from tomorrow_weather_baltic
+    union all
+    select 'Riga', 'Europe/Riga',
+           case when created_at::timestamp at time zone 'Europe/Amsterdam' < forecast_time_fixed_at('Riga')
+                then ((time::timestamp at time zone 'Europe/Amsterdam') at time zone 'UTC') at time zone 'Europe/Riga'
+                else time::timestamp at time zone 'Europe/Amsterdam' end,
+           temperature::real, feels_like::real, humidity::real, precipitation::real, wind_speed::real,
+           created_at::timestamp at time zone 'Europe/Amsterdam'
+    from forecast_weather_baltic
+) as hours
+order by location, time, updated_at desc
+on conflict (location, time) do nothing;
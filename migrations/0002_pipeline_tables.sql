@@ -0,0 +1,144 @@
+-- Tables written by the rollup, forecast versioning, verification and retention jobs,
+-- created with proper types, and the unique keys their upserts rely on.
+
+-- rollups.py
+create table if not exists daily_weather_rollup (
+    id bigint generated by default as identity primary key,
+    location text not null,
+    date date not null,
+    avg_temp real,
+    avg_feels_like real,
+    total_rainfall real,
+    peak_rainfall_time timestamp,
+    suggestion text,
+    weather_alert text,
+    trend_rainfall real,
+    min_temperature real,
+    max_temperature real,
+    min_humidity real,
+    max_humidity real,
+    updated_at timestamptz not null default now(),
+    unique (location, date)
+);
+
+create table if not exists daily_forecast_rollup (
+    id bigint generated by default as identity primary key,
+    location text not null,
+    date date not null,
+    total_precipitation real,
+    min_temperature real,
+    max_temperature real,
+    min_humidity real,
+    max_humidity real,
+    updated_at timestamptz not null default now(),
+    unique (location, date)
+);
+
+-- forecast_versions.py upserts the changed hours of each issuance into forecast_weather on
+-- time; drop the duplicate hours left from when every run appended a full copy (keeping
+-- the latest) so the unique key can be built
+delete from forecast_weather a using forecast_weather b where a.time = b.time and a.id < b.id;
+delete from forecast_weather_baltic a using forecast_weather_baltic b where a.time = b.time and a.id < b.id;
+create unique index if not exists forecast_weather_time_key on forecast_weather (time);
+create unique index if not exists forecast_weather_baltic_time_key on forecast_weather_baltic (time);
+
+-- first_time, last_time and time are local clock times like forecast_weather.time
+create table if not exists forecast_issuance (
+    id bigint generated by default as identity primary key,
+    issuance_id uuid not null unique,
+    location text not null,
+    issued_at timestamptz not null,
+    first_time timestamp not null,
+    last_time timestamp not null,
+    hours integer not null
+);
+
+create table if not exists forecast_delta (
+    id bigint generated by default as identity primary key,
+    issuance_id uuid not null references forecast_issuance (issuance_id),
+    location text not null,
+    issued_at timestamptz not null,
+    time timestamp not null,
+    date date,
+    temperature real,
+    feels_like real,
+    precipitation real,
+    humidity real,
+    wind_speed real,
+    total_rainfall real
+);
+
+-- forecast_verification.py
+create table if not exists forecast_verification_scores (
+    id bigint generated by default as identity primary key,
+    location text not null,
+    target_date date not null,
+    lead_days integer not null,
+    issuance_id uuid,
+    forecast real,
+    observed real,
+    error real,
+    unique (location, target_date, lead_days)
+);
+
+create table if not exists forecast_verification (
+    id bigint generated by default as identity primary key,
+    location text not null,
+    lead_days integer not null,
+    samples integer,
+    bias real,
+    mae real,
+    updated_at timestamptz not null default now(),
+    unique (location, lead_days)
+);
+
+-- retention.py: daily aggregates of compacted hourly rows, one table per hot table
+do $$
+declare
+    suffix text;
+begin
+    foreach suffix in array array['', '_baltic'] loop
+        execute format($sql$
+            create table if not exists %I (
+                id bigint generated by default as identity primary key,
+                location text not null,
+                date date not null,
+                total_rainfall real,
+                avg_temperature real, min_temperature real, max_temperature real,
+                avg_feels_like real, min_feels_like real, max_feels_like real,
+                avg_humidity real, min_humidity real, max_humidity real,
+                samples integer,
+                unique (location, date)
+            )$sql$, 'today_weather_trends' || suffix || '_daily');
+
+        execute format($sql$
+            create table if not exists %I (
+                id bigint generated by default as identity primary key,
+                location text not null,
+                date date not null,
+                total_precipitation real,
+                avg_temperature real, min_temperature real, max_temperature real,
+                avg_feels_like real, min_feels_like real, max_feels_like real,
+                avg_humidity real, min_humidity real, max_humidity real,
+                avg_wind_speed real, min_wind_speed real, max_wind_speed real,
+                samples integer,
+                unique (location, date)
+            )$sql$, 'forecast_weather' || suffix || '_daily');
+
+        execute format('create table if not exists %I (like %I including all)',
+                       'tomorrow_weather' || suffix || '_daily', 'forecast_weather' || suffix || '_daily');
+    end loop;
+end
+$$;
+
+create table if not exists tunnel_data_daily (
+    id bigint generated by default as identity primary key,
+    location text not null,
+    date date not null,
+    location_name text not null,
+    avg_precipitation_intensity real,
+    min_precipitation_intensity real,
+    max_precipitation_intensity real,
+    samples integer,
+    unique (location, date, location_name)
+);
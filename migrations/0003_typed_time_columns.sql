@@ -0,0 +1,51 @@
+-- Store times and dates as proper types instead of text.
+--   created_at / updated_at carry a UTC offset and become timestamptz.
+--   time and peak_rainfall_time are the city's local clock time ("%Y-%m-%d %H:%M"),
+--     which the ops write and the dashboards filter on, so they become timestamp.
+--   forecast_weather.created_at was written as Amsterdam clock time without offset;
+--     it is converted as such (the ops now write it with an offset).
+-- Tested only on scratch databases seeded by tests/test_migrations.py (Postgres 16), not
+-- yet on a copy of the production data: run it against one before applying it to Supabase.
+
+do $$
+declare
+    suffix text;
+begin
+    foreach suffix in array array['', '_baltic'] loop
+        execute format($sql$
+            alter table %I
+                alter column date type date using date::date,
+                alter column peak_rainfall_time type timestamp using peak_rainfall_time::timestamp,
+                alter column created_at type timestamptz using created_at::timestamptz
+            $sql$, 'weather_data' || suffix);
+
+        execute format($sql$
+            alter table %I
+                alter column time type timestamp using time::timestamp,
+                alter column created_at type timestamptz using created_at::timestamptz
+            $sql$, 'today_weather_trends' || suffix);
+
+        execute format($sql$
+            alter table %I
+                alter column date type date using date::date,
+                alter column time type timestamp using time::timestamp,
+                alter column created_at type timestamptz using created_at::timestamp at time zone 'Europe/Amsterdam'
+            $sql$, 'forecast_weather' || suffix);
+
+        execute format($sql$
+            alter table %I
+                alter column time type timestamp using time::timestamp,
+                alter column created_at type timestamptz using created_at::timestamptz
+            $sql$, 'tomorrow_weather' || suffix);
+
+        execute format($sql$
+            alter table %I
+                alter column date type date using date::date,
+                alter column created_at type timestamptz using created_at::timestamptz
+            $sql$, 'precipitation_trends' || suffix);
+    end loop;
+end
+$$;
+
+alter table tunnel_data
+    alter column created_at type timestamptz using created_at::timestamptz;
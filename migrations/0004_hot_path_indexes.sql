@@ -0,0 +1,32 @@
+-- Indexes for the reads the dashboards, e-mail and alert jobs run on every refresh.
+-- check_query_plans.py verifies that each of these reads uses its index.
+
+do $$
+declare
+    suffix text;
+begin
+    foreach suffix in array array['', '_baltic'] loop
+        -- Latest weather_data row for today
+        execute format('create index if not exists %I on %I (date, created_at desc)',
+                       'weather_data' || suffix || '_date_created_at_idx', 'weather_data' || suffix);
+        -- Today's hourly trend rows (time >= today), and retention's time < cutoff
+        execute format('create index if not exists %I on %I (time, created_at)',
+                       'today_weather_trends' || suffix || '_time_created_at_idx', 'today_weather_trends' || suffix);
+        -- Forecast rows from today onwards use forecast_weather_time_key (0002)
+        execute format('create index if not exists %I on %I (time, created_at)',
+                       'tomorrow_weather' || suffix || '_time_created_at_idx', 'tomorrow_weather' || suffix);
+        -- Last 7 days of precipitation trends
+        execute format('create index if not exists %I on %I (date, created_at)',
+                       'precipitation_trends' || suffix || '_date_created_at_idx', 'precipitation_trends' || suffix);
+    end loop;
+end
+$$;
+
+-- Tunnel snapshot (latest rows), today's wettest tunnels and the alert sensor's new rows
+create index if not exists tunnel_data_created_at_idx on tunnel_data (created_at desc);
+-- Latest rows of one tunnel
+create index if not exists tunnel_data_location_name_created_at_idx on tunnel_data (location_name, created_at desc);
+
+-- Forecast versioning: issuances of a location since a time, deltas of a location's hours
+create index if not exists forecast_issuance_location_issued_at_idx on forecast_issuance (location, issued_at);
+create index if not exists forecast_delta_location_time_issued_at_idx on forecast_delta (location, time, issued_at);
@@ -0,0 +1,14 @@
+-- Daily weather history per location, filled by backfill.py (history_backfill_pipeline)
+
+create table if not exists daily_weather_history (
+    id bigint generated by default as identity primary key,
+    location text not null,
+    date date not null,
+    precipitation real,
+    avg_temperature real,
+    min_temperature real,
+    max_temperature real,
+    avg_humidity real,
+    created_at timestamptz not null default now(),
+    unique (location, date)
+);
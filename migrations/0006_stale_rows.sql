@@ -0,0 +1,22 @@
+-- Rows built from a last known good response (served by http_client when an upstream
+-- failed) are marked stale, with the time the response was originally fetched.
+-- tunnel_alerts ignores stale tunnel rows.
+
+do $$
+declare
+    suffix text;
+begin
+    foreach suffix in array array['', '_baltic'] loop
+        execute format('alter table %I add column if not exists stale boolean not null default false, '
+                       'add column if not exists fetched_at timestamptz', 'forecast_weather' || suffix);
+        execute format('alter table %I add column if not exists stale boolean not null default false, '
+                       'add column if not exists fetched_at timestamptz', 'tomorrow_weather' || suffix);
+        execute format('alter table %I add column if not exists stale boolean not null default false, '
+                       'add column if not exists fetched_at timestamptz', 'precipitation_trends' || suffix);
+    end loop;
+end
+$$;
+
+alter table tunnel_data
+    add column if not exists stale boolean not null default false,
+    add column if not exists fetched_at timestamptz;
@@ -0,0 +1,32 @@
+-- Forecasts are hedged across providers (providers.py): record which provider issued
+-- each forecast, diff issuances per provider and verify them per provider.
+-- Every issuance stored before hedging came from WeatherAPI.
+
+alter table forecast_issuance add column if not exists provider text;
+update forecast_issuance set provider = 'weatherapi' where provider is null;
+alter table forecast_issuance alter column provider set not null;
+
+alter table forecast_delta add column if not exists provider text;
+update forecast_delta set provider = 'weatherapi' where provider is null;
+alter table forecast_delta alter column provider set not null;
+
+-- Latest issuance of a location by one provider, the base its next issuance is diffed against
+create index if not exists forecast_issuance_location_provider_issued_at_idx on forecast_issuance (location, provider, issued_at);
+
+-- Provider of each hour's latest values
+alter table forecast_weather add column if not exists provider text;
+alter table forecast_weather_baltic add column if not exists provider text;
+
+alter table forecast_verification_scores add column if not exists provider text;
+update forecast_verification_scores set provider = 'weatherapi' where provider is null;
+alter table forecast_verification_scores
+    alter column provider set not null,
+    drop constraint if exists forecast_verification_scores_location_target_date_lead_days_key,
+    add constraint forecast_verification_scores_location_provider_key unique (location, provider, target_date, lead_days);
+
+alter table forecast_verification add column if not exists provider text;
+update forecast_verification set provider = 'weatherapi' where provider is null;
+alter table forecast_verification
+    alter column provider set not null,
+    drop constraint if exists forecast_verification_location_lead_days_key,
+    add constraint forecast_verification_location_provider_lead_days_key unique (location, provider, lead_days);
@@ -0,0 +1,26 @@
+-- Latest reading per tunnel (tunnel_latest.py), upserted by store_tunnel_data on
+-- location_name. The tunnel map and the alert sensor's first tick read it whole.
+
+create table if not exists tunnel_latest (
+    id bigint generated by default as identity primary key,
+    location_name text not null,
+    year integer,
+    latitude double precision,
+    longitude double precision,
+    precipitation_description text,
+    precipitation_intensity real,
+    stale boolean not null default false,
+    fetched_at timestamptz,
+    created_at timestamptz not null,
+    unique (location_name)
+);
+
+-- Walks tunnel_data_location_name_created_at_idx (0004) once
+insert into tunnel_latest (location_name, year, latitude, longitude, precipitation_description,
+                           precipitation_intensity, stale, fetched_at, created_at)
+select distinct on (location_name)
+    location_name, year, latitude, longitude, precipitation_description,
+    precipitation_intensity, stale, fetched_at, created_at
+from tunnel_data
+order by location_name, created_at desc
+on conflict (location_name) do nothing;
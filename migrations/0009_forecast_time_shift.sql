@@ -0,0 +1,57 @@
+-- Until process_forecast_data switched to time_epoch it read WeatherAPI's local clock
+-- time as UTC, so every forecast hour it wrote is later than the real Amsterdam clock
+-- time by the city's UTC offset. Rows written since are right. Correct the rows, deltas
+-- and issuances from before the switch, dated per location by forecast_time_fixed_at (0001):
+--   forecast_weather(_baltic): created_at before it
+--   forecast_issuance / forecast_delta: issued_at before it
+-- Every row is either shifted or not, so this is applied once and the function dropped.
+-- Tested only on scratch databases seeded by tests/test_migrations.py (Postgres 16), not
+-- yet on a copy of the production data: run it against one before applying it to Supabase.
+
+do $$
+declare
+    city record;
+    fixed_at timestamptz;
+    shifted text;
+begin
+    for city in
+        select * from (values
+            ('Eindhoven', 'forecast_weather', 'Europe/Amsterdam'),
+            ('Riga', 'forecast_weather_baltic', 'Europe/Riga')
+        ) as cities (location, latest_table, tz)
+    loop
+        -- Before any issuance is corrected: corrected ones would date the switch too early
+        fixed_at := forecast_time_fixed_at(city.location);
+        -- Shifted Amsterdam clock time -> the city's clock time -> real Amsterdam clock time
+        shifted := format(
+            '(((%%1$I at time zone %L) at time zone %L) at time zone %L) at time zone %L',
+            'Europe/Amsterdam', 'UTC', city.tz, 'Europe/Amsterdam'
+        );
+
+        execute format(
+            'update forecast_issuance set first_time = %s, last_time = %s where location = %L and issued_at < %L',
+            format(shifted, 'first_time'), format(shifted, 'last_time'), city.location, fixed_at
+        );
+        execute format(
+            'update forecast_delta set time = %s where location = %L and issued_at < %L',
+            format(shifted, 'time'), city.location, fixed_at
+        );
+
+        -- A corrected hour can land on one a later forecast already wrote: the newest row
+        -- of each hour is kept, so the unique key is rebuilt around the update
+        execute format('drop index if exists %I', city.latest_table || '_time_key');
+        execute format(
+            'update %I set time = %s where created_at < %L',
+            city.latest_table, format(shifted, 'time'), fixed_at
+        );
+        execute format(
+            'delete from %1$I as older using %1$I as newer
+             where older.time = newer.time and (older.created_at, older.id) < (newer.created_at, newer.id)',
+            city.latest_table
+        );
+        execute format('create unique index %I on %I (time)', city.latest_table || '_time_key', city.latest_table);
+    end loop;
+end
+$$;
+
+drop function if exists forecast_time_fixed_at(text);
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import copy
+import random
+import shutil
+import argparse
+import statistics
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Fixtures the default cassettes are built from
+FORECAST_FIXTURE = os.path.join(ROOT, "weather_data.json")
+TUNNEL_FIXTURE = os.path.join(ROOT, "tunnel_data.json")
+# Cities the pipelines fetch, with the timezone their payloads carry
+FIXTURE_LOCATIONS = {"Eindhoven": "Europe/Amsterdam", "Riga": "Europe/Riga"}
+TUNNELS_URL = "https://data.eindhoven.nl/api/explore/v2.1/catalog/datasets/tunnelvisie-punten/records?limit=71"
+
+# Run config for jobs that cannot run without one
+JOB_CONFIGS = {
+    "history_backfill_pipeline": {"ops": {"backfill_history": {"config": {
+        "locations": list(FIXTURE_LOCATIONS), "start_date": "2024-12-01", "end_date": "2024-12-10",
+    }}}},
+    "tunnel_alert_pipeline": {"ops": {"send_tunnel_alert": {"config": {"transitions": [{
+        "location_name": "Aqua urbana", "previous": "No rain", "current": "Heavy rain",
+        "precipitation_intensity": 12.0, "observed_at": "2024-12-10T14:00:00+01:00",
+    }]}}}},
+}
+# Jobs that read what the ingestion jobs wrote run last
+RUN_LAST = [
+    "email_pipeline", "tunnel_alert_pipeline", "forecast_verification_pipeline", "retention_pipeline", "replica_sync_pipeline",
+    "instance_maintenance_pipeline",
+]
+
+# ------------------
+# Environment
+# ------------------
+
+def configure(workdir, cassette_path):
+    """Points every module at local stand-ins; must run before the pipeline modules are imported."""
+    os.environ.update({
+        "STORAGE_BACKEND": "local",
+        "HTTP_MODE": "replay",
+        "MAIL_MODE": "outbox",
+        "CASSETTE_PATH": cassette_path,
+        "REPLICA_PATH": os.path.join(workdir, "weather.db"),
+        "ARCHIVE_PATH": os.path.join(workdir, "archive"),
+        "RATE_LIMIT_PATH": os.path.join(workdir, "rate_limits.db"),
+        "BACKFILL_CHECKPOINT_PATH": os.path.join(workdir, "backfill.db"),
+        "OP_CHECKPOINT_PATH": os.path.join(workdir, "op_checkpoints.db"),
+        "OUTBOX_PATH": os.path.join(workdir, "outbox"),
+        "PROVIDER_STATS_PATH": os.path.join(workdir, "providers.db"),
+        "CIRCUIT_PATH": os.path.join(workdir, "circuits.db"),
+        "LAST_GOOD_PATH": os.path.join(workdir, "last_good"),
+        "TRACE_PATH": os.path.join(workdir, "traces.jsonl"),
+    })
+    # Replayed calls cost nothing; keep the limiter in the path without throttling
+    os.environ.setdefault("WEATHERAPI_CALLS_PER_MINUTE", "1000000")
+    os.environ.setdefault("WEATHERAPI_BURST", "1000")
+
+def nowcast(location_name):
+    """A deterministic Buienradar-style nowcast ("value|HH:MM" every 5 minutes) per tunnel."""
+    rng = random.Random(location_name)
+    peak = rng.choice([0, 0, 0, 77, 109, 125, 140])
+    return "\n".join(
+        f"{max(0, peak - abs(i - 12) * 6):03d}|{12 + i * 5 // 60:02d}:{i * 5 % 60:02d}" for i in range(24)
+    )
+
+def shift_forecast(payload, first_date):
+    """Returns a copy of a forecast.json payload moved so its first forecast day is first_date."""
+    payload = copy.deepcopy(payload)
+    forecast_days = payload["forecast"]["forecastday"]
+    delta = (first_date - date.fromisoformat(forecast_days[0]["date"])).days
+
+    for day in forecast_days:
+        day["date"] = str(date.fromisoformat(day["date"]) + timedelta(days=delta))
+        if "date_epoch" in day:
+            day["date_epoch"] += delta * 86400
+        for hour in day["hour"]:
+            hour["time_epoch"] += delta * 86400
+            hour["time"] = day["date"] + hour["time"][10:]
+    localtime = payload["location"]["localtime"]
+    payload["location"]["localtime"] = str(date.fromisoformat(localtime[:10]) + timedelta(days=delta)) + localtime[10:]
+    return payload
+
+def open_meteo_forecast(payload):
+    """The Open-Meteo hourly response (timeformat=unixtime) carrying a forecast.json payload's hours."""
+    hours = [hour for day in payload["forecast"]["forecastday"] for hour in day["hour"]]
+    return {
+        "timezone": payload["location"]["tz_id"],
+        "hourly": {
+            "time": [hour["time_epoch"] for hour in hours],
+            "temperature_2m": [hour["temp_c"] for hour in hours],
+            "apparent_temperature": [hour["feelslike_c"] for hour in hours],
+            "relative_humidity_2m": [hour["humidity"] for hour in hours],
+            "precipitation": [hour["precip_mm"] for hour in hours],
+            "wind_speed_10m": [hour["wind_kph"] for hour in hours],
+        },
+    }
+
+def seed_cassettes(path, today=None):
+    """Builds cassettes for every upstream request from the fixtures in the repository.
+
+    Forecast and history calls replay weather_data.json (history for any date through
+    the loose dt match), as do the Open-Meteo and KNMI forecasts, the tunnel list replays tunnel_data.json and every tunnel gets
+    a synthetic nowcast. With `today` the forecast is moved to start on that date, so
+    the dashboards have current data to show. Real recordings (HTTP_MODE=record) in the
+    same directory win.
+    """
+    from http_client import save_cassette, cassette_file
+    from weatherapi import forecast_url, history_url, FORECAST_DAYS
+    from providers import PROVIDERS
+
+    with open(FORECAST_FIXTURE) as f:
+        forecast = json.load(f)
+    if today is not None:
+        forecast = shift_forecast(forecast, today)
+    with open(TUNNEL_FIXTURE) as f:
+        tunnels = json.load(f)
+
+    def save(url, body, content_type="application/json"):
+        if not os.path.exists(cassette_file("GET", url, path)):
+            save_cassette("GET", url, 200, {"Content-Type": content_type}, body.encode(), path)
+
+    for location, tz_id in FIXTURE_LOCATIONS.items():
+        payload = {**forecast, "location": {**forecast["location"], "name": location, "tz_id": tz_id}}
+        save(forecast_url("", location, FORECAST_DAYS), json.dumps(payload))
+        for provider in (PROVIDERS["open_meteo"], PROVIDERS["knmi"]):
+            save(provider.url(location, FORECAST_DAYS), json.dumps(open_meteo_forecast(payload)))
+        history = {**payload, "forecast": {"forecastday": payload["forecast"]["forecastday"][:1]}}
+        save(history_url("", location, payload["forecast"]["forecastday"][0]["date"]), json.dumps(history))
+
+    save(TUNNELS_URL, json.dumps({"total_count": len(tunnels), "results": tunnels}))
+    for tunnel in tunnels:
+        url = f"https://gps.buienradar.nl/getrr.php?lat={float(tunnel['lat'])}&lon={float(tunnel['lon'])}"
+        save(url, nowcast(tunnel["locatienaam"]), "text/plain")
+
+# ------------------
+# Runs
+# ------------------
+
+def run_jobs(names=None):
+    """Runs every job of the combined repository in process; returns (job, success, seconds)."""
+    from repositories import combined_pipeline_repository
+
+    jobs = combined_pipeline_repository.get_all_jobs()
+    jobs = sorted(
+        (job for job in jobs if not names or job.name in names),
+        key=lambda job: RUN_LAST.index(job.name) + 1 if job.name in RUN_LAST else 0
+    )
+
+    results = []
+    for job in jobs:
+        start = time.monotonic()
+        result = job.execute_in_process(run_config=JOB_CONFIGS.get(job.name, {}), raise_on_error=False)
+        results.append((job.name, result.success, time.monotonic() - start))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every pipeline job offline against replayed upstreams and a local database.")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "state", "offline"), help="Local database, archive and outbox (wiped first)")
+    parser.add_argument("--cassettes", default=os.path.join(ROOT, "cassettes"), help="Recorded responses")
+    parser.add_argument("--jobs", nargs="*", help="Only these jobs")
+    parser.add_argument("--repeat", type=int, default=1, help="Run the jobs this many times (timings are summarised)")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.workdir, ignore_errors=True)
+    configure(args.workdir, args.cassettes)
+    seed_cassettes(args.cassettes)
+
+    timings, failed = {}, set()
+    for _ in range(args.repeat):
+        for name, success, seconds in run_jobs(args.jobs):
+            timings.setdefault(name, []).append(seconds)
+            if not success:
+                failed.add(name)
+
+    for name, seconds in timings.items():
+        print(f"{'FAIL' if name in failed else 'ok  '} {name:<45} median {statistics.median(seconds):6.2f}s  max {max(seconds):6.2f}s")
+    sys.exit(1 if failed else 0)
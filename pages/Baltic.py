@@ -1,34 +1,37 @@
-from supabase import create_client
 import os
 import streamlit as st
 from dotenv import load_dotenv
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from datetime import date
+from datetime import date, timedelta
+from rollups import WEATHER_ROLLUP_TABLE, FORECAST_ROLLUP_TABLE
+from dashboard_data import get_storage, load_table_frame, load_rollup_frame
 
 # Load environment variables
 load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# Initialize Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_storage()
 
-# Fetch data from Supabase
-def fetch_table_data(table_name):
-    response = supabase.table(table_name).select("*").execute()
-    if hasattr(response, 'error'):
-        st.error(f"Error fetching data from {table_name}: {response.error.message}")
+# Fetch data from storage (filtered by the backend, parsed and typed once, shared across reruns and sessions)
+def fetch_table_data(table_name, filters=()):
+    try:
+        return load_table_frame(storage, table_name, filters)
+    except Exception as e:
+        st.error(f"Error fetching data from {table_name}: {e}")
         return None
-    return pd.DataFrame(response.data)
 
 # Fetch all required data
-weather_data = fetch_table_data("weather_data_baltic")
-forecast_weather = fetch_table_data("forecast_weather_baltic")
-today_weather_trends = fetch_table_data("today_weather_trends_baltic")
-historical_precipitation = fetch_table_data("precipitation_trends_baltic")
-tomorrow_weather = fetch_table_data("tomorrow_weather_baltic")
+# Daily rollups maintained by the ingestion jobs
+weather_data = load_rollup_frame(storage, WEATHER_ROLLUP_TABLE, "Riga", date.today())
+forecast_rollup = load_rollup_frame(storage, FORECAST_ROLLUP_TABLE, "Riga", date.today())
+today_start = str(date.today())
+week_start = str(date.today() - timedelta(days=8))
+forecast_weather = fetch_table_data("forecast_weather_baltic", (("gte", "time", today_start),))
+today_weather_trends = fetch_table_data("today_weather_trends_baltic", (("gte", "time", today_start),))
+historical_precipitation = fetch_table_data("precipitation_trends_baltic", (("gte", "date", week_start),))
+tomorrow_weather = fetch_table_data("tomorrow_weather_baltic", (("gte", "time", today_start),))
 
 # Display Dashboard
 st.title("Baltic Weather Dashboard")
@@ -37,11 +40,11 @@ st.title("Baltic Weather Dashboard")
 if not weather_data.empty:
     # Filter for today's data
     today_date = str(date.today())
-    today_data = weather_data[weather_data["date"] == today_date]
+    today_data = weather_data[(weather_data["date"] == today_date) & weather_data["avg_temp"].notna()]
 
     if not today_data.empty:
-        # Sort by 'created_at' and pick the latest record
-        today_data = today_data.sort_values(by="created_at", ascending=False).iloc[0]
+        # The rollup holds the latest summary for the day
+        today_data = today_data.iloc[0]
 
         st.subheader(f"Today's Weather ({today_data['date']})")
         col1, col2, col3 = st.columns(3)  # Three columns layout
@@ -86,9 +89,6 @@ if not weather_data.empty:
 if not today_weather_trends.empty:
     st.subheader("Weather Trends")
 
-    # Convert 'time' column to datetime
-    today_weather_trends["time"] = pd.to_datetime(today_weather_trends["time"])
-
     # Filter data for today's date
     today_date = date.today()
     today_trend = today_weather_trends[today_weather_trends["time"].dt.date == today_date]
@@ -180,13 +180,11 @@ with col1:
 
     # Filter for today's date
     today_date = date.today()
-    today_trend = today_weather_trends[
-        pd.to_datetime(today_weather_trends["time"]).dt.date == today_date
-    ]
+    today_trend = today_weather_trends[today_weather_trends["time"].dt.date == today_date]
 
     if not today_trend.empty:
         # Extract times and rainfall data
-        times_today = pd.to_datetime(today_trend["time"]).dt.strftime('%H:%M')
+        times_today = today_trend["time"].dt.strftime('%H:%M')
         rainfall_today = today_trend["rainfall"]
 
         # Create Rainfall Trend Chart for Today
@@ -216,20 +214,11 @@ with col1:
 with col2:
     st.subheader("Forecasted Rainfall Trends for Upcoming Days")
 
-    # Convert 'time' column to datetime
-    forecast_weather["time"] = pd.to_datetime(forecast_weather["time"])
-
-    # Filter for upcoming dates (including today)
-    upcoming_forecast = forecast_weather[forecast_weather["time"].dt.date >= today_date]
-
-    if not upcoming_forecast.empty:
-        # Aggregate rainfall by date
-        upcoming_forecast["date"] = upcoming_forecast["time"].dt.date
-        forecasted_rainfall = upcoming_forecast.groupby("date")["precipitation"].sum().reset_index()
-
+    # Daily rainfall for upcoming dates (including today), precomputed at ingest time
+    if not forecast_rollup.empty:
         # Extract forecasted dates and rainfall
-        forecasted_dates = forecasted_rainfall["date"]
-        forecasted_rainfall_values = forecasted_rainfall["precipitation"]
+        forecasted_dates = forecast_rollup["date"]
+        forecasted_rainfall_values = forecast_rollup["total_precipitation"]
 
         # Create Forecasted Rainfall Chart
         forecast_rain_chart = go.Figure()
@@ -262,8 +251,7 @@ if "forecast_weather" in locals() and not forecast_weather.empty:
     # Step 1: Calculate tomorrow's date
     tomorrow_date = pd.Timestamp.now().date() + pd.Timedelta(days=1)
 
-    # Step 2: Ensure 'time' column is datetime and filter for tomorrow
-    forecast_weather["time"] = pd.to_datetime(forecast_weather["time"], errors="coerce")
+    # Step 2: Filter for tomorrow
     tomorrow_data = forecast_weather[forecast_weather["time"].dt.date == tomorrow_date]
 
     if not tomorrow_data.empty:
@@ -293,18 +281,15 @@ if "historical_precipitation" in locals() and not historical_precipitation.empty
     st.subheader("Precipitation Trends Over the Last 7 Days")
 
     try:
-        # Step 1: Ensure 'date' column is a datetime column
-        historical_precipitation["date"] = pd.to_datetime(historical_precipitation["date"], errors="coerce")
-
-        # Step 2: Calculate today and determine the last valid date in the table
+        # Step 1: Calculate today and determine the last valid date in the table
         today = pd.Timestamp.now().date()
         max_date = historical_precipitation["date"].max().date()
 
-        # Step 3: Dynamically calculate the range (up to 7 complete days)
+        # Step 2: Dynamically calculate the range (up to 7 complete days)
         end_date = min(max_date, today - pd.Timedelta(days=1))  # Use the most recent complete day
         start_date = max(end_date - pd.Timedelta(days=6), historical_precipitation["date"].min().date())  # Adjust for available data
 
-        # Step 4: Generate full date range and merge with existing data
+        # Step 3: Generate full date range and merge with existing data
         date_range = pd.date_range(start=start_date, end=end_date)
         full_data = pd.DataFrame({"date": date_range})
         merged_data = full_data.merge(
@@ -312,11 +297,11 @@ if "historical_precipitation" in locals() and not historical_precipitation.empty
             on="date", how="left"
         ).fillna({"precipitation": 0})  # Fill missing precipitation values with 0
 
-        # Step 5: Extract data for the chart
+        # Step 4: Extract data for the chart
         dates = merged_data["date"].dt.strftime('%Y-%m-%d')
         daily_precipitation = merged_data["precipitation"]
 
-        # Step 6: Create the chart
+        # Step 5: Create the chart
         historical_chart = go.Figure()
         historical_chart.add_trace(go.Scatter(
             x=dates, y=daily_precipitation,
@@ -328,7 +313,7 @@ if "historical_precipitation" in locals() and not historical_precipitation.empty
         historical_chart.add_hline(y=5, line_dash="dash", annotation_text="Moderate Rain", line_color="orange")
         historical_chart.add_hline(y=10, line_dash="dash", annotation_text="Heavy Rain", line_color="red")
 
-        # Step 7: Update chart layout
+        # Step 6: Update chart layout
         historical_chart.update_layout(
             title=f"Precipitation Trends ({start_date} to {end_date})",
             xaxis_title="Date",
@@ -337,7 +322,7 @@ if "historical_precipitation" in locals() and not historical_precipitation.empty
             xaxis=dict(type='category')  # Ensure dates appear cleanly on x-axis
         )
 
-        # Step 8: Display the chart
+        # Step 7: Display the chart
         st.plotly_chart(historical_chart, use_container_width=True)
     except Exception as e:
         st.error(f"Error processing precipitation trends data: {e}")
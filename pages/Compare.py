@@ -0,0 +1,108 @@
+import streamlit as st
+from dotenv import load_dotenv
+import pandas as pd
+import plotly.graph_objects as go
+from datetime import datetime, timedelta
+import pytz
+from weather_hourly import fetch_locations
+from dashboard_data import get_storage, load_city_frames, TABLE_CACHE_TTL
+
+# Load environment variables
+load_dotenv()
+
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_storage()
+
+# Days of history shown before today (the forecast after it is always included)
+DAYS_BACK = {"Today": 0, "Last 3 days": 3, "Last 7 days": 7, "Last 30 days": 30}
+# Chart label -> weather_hourly column
+METRICS = {
+    "Temperature (°C)": "temperature",
+    "Feels Like (°C)": "feels_like",
+    "Humidity (%)": "humidity",
+    "Precipitation (mm)": "precipitation",
+    "Wind Speed (km/h)": "wind_speed",
+}
+
+@st.cache_data(ttl=TABLE_CACHE_TTL, show_spinner=False)
+def available_locations():
+    return fetch_locations(storage)
+
+# Display Dashboard
+st.title("City Comparison")
+
+try:
+    locations = available_locations()
+except Exception as e:
+    st.error(f"Error fetching locations: {e}")
+    st.stop()
+
+if not locations:
+    st.warning("No cities with hourly weather available!")
+    st.stop()
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    selected = st.multiselect("Cities", locations, default=locations)
+with col2:
+    label = st.selectbox("Metric", list(METRICS))
+with col3:
+    period = st.selectbox("Period", list(DAYS_BACK))
+
+if not selected:
+    st.info("Select at least one city.")
+    st.stop()
+
+# Every city starts at its own local midnight of this date, so its first day is whole;
+# a date keeps the cache key stable for the whole day
+start_date = (datetime.now(pytz.timezone("Europe/Amsterdam")) - timedelta(days=DAYS_BACK[period])).date().isoformat()
+
+try:
+    frames = load_city_frames(storage, tuple(selected), start_date)
+except Exception as e:
+    st.error(f"Error fetching hourly weather: {e}")
+    st.stop()
+
+# Hourly chart, one trace per city
+column = METRICS[label]
+hourly_chart = go.Figure()
+for location, (hourly, _) in frames.items():
+    hourly_chart.add_trace(go.Scattergl(x=hourly["time"], y=hourly[column], mode="lines", name=location))
+hourly_chart.add_vline(x=datetime.now(pytz.utc), line_dash="dash", line_color="gray")
+hourly_chart.update_layout(
+    title=f"Hourly {label}", xaxis_title="Time", yaxis_title=label, template="plotly_white"
+)
+st.plotly_chart(hourly_chart, use_container_width=True)
+
+# Daily aggregates per city
+daily = pd.concat(
+    [daily.assign(location=location) for location, (_, daily) in frames.items()], ignore_index=True
+)
+if daily.empty:
+    st.warning("No hourly weather for the selected cities in this period!")
+    st.stop()
+
+st.subheader("Daily Precipitation")
+precipitation_chart = go.Figure()
+for location, city_daily in daily.groupby("location", sort=False):
+    precipitation_chart.add_trace(go.Bar(x=city_daily["date"], y=city_daily["total_precipitation"], name=location))
+precipitation_chart.update_layout(
+    barmode="group", xaxis_title="Date", yaxis_title="Precipitation (mm)", template="plotly_white"
+)
+st.plotly_chart(precipitation_chart, use_container_width=True)
+
+st.subheader("Daily Summary")
+st.dataframe(
+    daily.rename(columns={
+        "location": "City",
+        "date": "Date",
+        "min_temperature": "Min Temp (°C)",
+        "avg_temperature": "Avg Temp (°C)",
+        "max_temperature": "Max Temp (°C)",
+        "avg_humidity": "Avg Humidity (%)",
+        "total_precipitation": "Precipitation (mm)",
+    })[["City", "Date", "Min Temp (°C)", "Avg Temp (°C)", "Max Temp (°C)", "Avg Humidity (%)", "Precipitation (mm)"]]
+    .round(1),
+    hide_index=True,
+    use_container_width=True
+)
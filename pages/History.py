@@ -0,0 +1,88 @@
+import streamlit as st
+from dotenv import load_dotenv
+import plotly.graph_objects as go
+from datetime import date, timedelta
+from retention import read_history
+from dashboard_data import apply_schema
+from downsampling import downsample
+
+# Load environment variables
+load_dotenv()
+
+# Hourly history per location (hot table plus Parquet archive)
+HISTORY_TABLES = {"Eindhoven": "today_weather_trends", "Riga": "today_weather_trends_baltic"}
+# Chart label -> (column, downsampling method); min/max keeps every rainfall peak
+METRICS = {
+    "Temperature (°C)": ("temperature", "lttb"),
+    "Feels Like (°C)": ("feels_like", "lttb"),
+    "Humidity (%)": ("humidity", "lttb"),
+    "Rainfall (mm)": ("rainfall", "minmax"),
+}
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def load_history(table_name, start_date, end_date):
+    """Loads one row per hour for a date range, typed once and shared read-only."""
+    rows = apply_schema(read_history(table_name, str(start_date), str(end_date)), table_name)
+    if rows.empty:
+        return rows
+    # Every pipeline run stored a full copy of the day; keep the last stored value per hour
+    return rows.sort_values("id").drop_duplicates(subset=["time"], keep="last").sort_values("time")
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_downsampled(table_name, start_date, end_date, column, method):
+    """Returns at most MAX_POINTS rows of one metric plus the number of raw rows."""
+    rows = load_history(table_name, start_date, end_date)
+    return downsample(rows[["time", column]], "time", column, method), len(rows)
+
+def history_chart(points, column, label, title):
+    chart = go.Figure()
+    chart.add_trace(go.Scattergl(
+        x=points["time"], y=points[column], mode="lines", name=label, line=dict(color="blue")
+    ))
+    chart.update_layout(title=title, xaxis_title="Time", yaxis_title=label, template="plotly_white")
+    return chart
+
+# Display Dashboard
+st.title("Weather History Explorer")
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    location = st.selectbox("Location", list(HISTORY_TABLES))
+with col2:
+    label = st.selectbox("Metric", list(METRICS))
+with col3:
+    date_range = st.date_input("Date range", value=(date.today() - timedelta(days=365), date.today()))
+
+if len(date_range) != 2:
+    st.info("Select a start and end date.")
+    st.stop()
+
+table_name = HISTORY_TABLES[location]
+column, method = METRICS[label]
+start_date, end_date = date_range
+
+try:
+    # Overview: the whole range reduced to a fixed number of points
+    overview, total_rows = load_downsampled(table_name, start_date, end_date, column, method)
+    if overview.empty:
+        st.warning(f"No history available for {location} in this range!")
+        st.stop()
+
+    st.plotly_chart(
+        history_chart(overview, column, label, f"{label} in {location} ({start_date} to {end_date})"),
+        use_container_width=True
+    )
+    st.caption(f"Showing {len(overview)} of {total_rows} hourly values.")
+
+    # Zoom: only the selected window is fetched again, at finer resolution
+    if end_date > start_date:
+        window = st.slider("Zoom window", min_value=start_date, max_value=end_date, value=(start_date, end_date))
+        if window != (start_date, end_date):
+            detail, window_rows = load_downsampled(table_name, window[0], window[1], column, method)
+            st.plotly_chart(
+                history_chart(detail, column, label, f"{label} in {location} ({window[0]} to {window[1]})"),
+                use_container_width=True
+            )
+            st.caption(f"Showing {len(detail)} of {window_rows} hourly values.")
+except Exception as e:
+    st.error(f"Error loading weather history: {e}")
@@ -0,0 +1,280 @@
+import os
+import time
+import sqlite3
+import logging
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import msgspec
+import pytz
+import http_client
+from dotenv import load_dotenv
+from rate_limiter import acquire, WEATHERAPI, LIVE
+from tracing import span
+from weatherapi import (
+    decode_payload, forecast_url, Hour, Day, ForecastDay, Forecast, Location, WeatherPayload, FORECAST_DAYS
+)
+
+# Load environment variables
+load_dotenv()
+api_key = os.getenv('api_key')
+
+# Forecast providers in order of preference: the first is asked first, the others are
+# hedges fired when it is slow or fails
+WEATHER_PROVIDERS = os.getenv("WEATHER_PROVIDERS", "weatherapi,open_meteo,knmi").split(",")
+OPEN_METEO_BASE_URL = os.getenv("OPEN_METEO_BASE_URL", "https://api.open-meteo.com/v1")
+KNMI_BASE_URL = os.getenv("KNMI_BASE_URL", OPEN_METEO_BASE_URL)
+
+# Latencies of successful fetches per provider, shared by every run
+PROVIDER_STATS_PATH = os.getenv("PROVIDER_STATS_PATH", "state/providers.db")
+# A hedge fires once a provider takes longer than this percentile of its recent latencies
+HEDGE_PERCENTILE = 0.9
+# Latencies the percentile is taken over, the fewest it needs, and the delay used before that
+LATENCY_WINDOW = 100
+MIN_SAMPLES = 20
+DEFAULT_HEDGE_DELAY = float(os.getenv("DEFAULT_HEDGE_DELAY", "2.0"))
+
+# Coordinates and timezones for providers that take a position rather than a place name
+COORDINATES = {
+    "Eindhoven": (51.4416, 5.4697, "Europe/Amsterdam"),
+    "Riga": (56.9496, 24.1052, "Europe/Riga"),
+}
+
+class NoValidForecast(Exception):
+    """Raised when no provider returned a usable forecast."""
+
+# ------------------
+# Providers
+# ------------------
+
+class WeatherApiProvider:
+    """WeatherAPI's forecast.json, which is already in the shape the pipelines use."""
+
+    name = "weatherapi"
+
+    def supports(self, location):
+        return True
+
+    def fetch(self, location, days):
+        acquire(WEATHERAPI, LIVE)
+        response = http_client.get(forecast_url(api_key, location, days))
+        response.raise_for_status()
+        weather_data = decode_payload(response.content)
+        if is_valid(weather_data, days):
+            http_client.remember(forecast_url(api_key, location, days), response)
+        return weather_data
+
+    def last_known_good(self, location, days):
+        """The last valid forecast for the location, marked stale, or None."""
+        response = http_client.last_known_good(forecast_url(api_key, location, days))
+        if response is None:
+            return None
+        return msgspec.structs.replace(
+            decode_payload(response.content), provider=self.name, fetched_at=http_client.fetched_at(response), stale=True
+        )
+
+# Hourly variables requested from Open-Meteo, in WeatherAPI units (°C, %, mm, km/h); the
+# daily values are derived from them like WeatherAPI's
+OPEN_METEO_HOURLY = ("temperature_2m", "apparent_temperature", "relative_humidity_2m", "precipitation", "wind_speed_10m")
+
+class OpenMeteoHourly(msgspec.Struct, frozen=True, gc=False):
+    time: list[int]
+    temperature_2m: list[float | None]
+    apparent_temperature: list[float | None]
+    relative_humidity_2m: list[float | None]
+    precipitation: list[float | None]
+    wind_speed_10m: list[float | None]
+
+class OpenMeteoPayload(msgspec.Struct, frozen=True, gc=False):
+    timezone: str
+    hourly: OpenMeteoHourly
+
+open_meteo_decoder = msgspec.json.Decoder(OpenMeteoPayload)
+
+class OpenMeteoProvider:
+    """Open-Meteo's forecast API (best model per location), normalised to a WeatherPayload."""
+
+    name = "open_meteo"
+    base_url = OPEN_METEO_BASE_URL
+    endpoint = "forecast"
+
+    def supports(self, location):
+        return location in COORDINATES
+
+    def url(self, location, days):
+        latitude, longitude, tz_id = COORDINATES[location]
+        return (
+            f"{self.base_url}/{self.endpoint}?latitude={latitude}&longitude={longitude}"
+            f"&hourly={','.join(OPEN_METEO_HOURLY)}"
+            f"&timezone={tz_id}&forecast_days={days}&timeformat=unixtime"
+        )
+
+    def fetch(self, location, days):
+        response = http_client.get(self.url(location, days))
+        response.raise_for_status()
+        with span(f"decode {self.name} payload", phase="decode", bytes=len(response.content)):
+            payload = open_meteo_decoder.decode(response.content)
+        return normalize_hourly(location, payload)
+
+class KnmiProvider(OpenMeteoProvider):
+    """KNMI's HARMONIE model (Netherlands and Europe) served through Open-Meteo's KNMI endpoint."""
+
+    name = "knmi"
+    base_url = KNMI_BASE_URL
+    endpoint = "knmi"
+
+PROVIDERS = {provider.name: provider for provider in (WeatherApiProvider(), OpenMeteoProvider(), KnmiProvider())}
+
+def normalize_hourly(location, payload):
+    """Groups an Open-Meteo hourly series into WeatherAPI forecast days.
+
+    Days missing any hour or value (beyond the model's horizon) are left out, so a
+    short forecast is caught by the validity check instead of reaching the pipelines.
+    """
+    tz = pytz.timezone(payload.timezone)
+    hourly = payload.hourly
+    hours_by_date = {}
+    for i, epoch in enumerate(hourly.time):
+        values = (
+            hourly.temperature_2m[i], hourly.apparent_temperature[i], hourly.relative_humidity_2m[i],
+            hourly.precipitation[i], hourly.wind_speed_10m[i]
+        )
+        local_time = datetime.fromtimestamp(epoch, tz).strftime("%Y-%m-%d %H:%M")
+        hours_by_date.setdefault(local_time[:10], []).append(
+            None if None in values else Hour(epoch, local_time, values[0], values[1], values[2], values[3], values[4])
+        )
+
+    forecast_days = []
+    for date, hours in hours_by_date.items():
+        if None in hours or len(hours) < 23:  # 23 or 25 hours on DST changes
+            continue
+        temperatures = [hour.temp_c for hour in hours]
+        forecast_days.append(ForecastDay(date, Day(
+            avgtemp_c=round(sum(temperatures) / len(hours), 1),
+            totalprecip_mm=round(sum(hour.precip_mm for hour in hours), 2),
+            mintemp_c=min(temperatures),
+            maxtemp_c=max(temperatures),
+            avghumidity=round(sum(hour.humidity for hour in hours) / len(hours)),
+        ), hours))
+
+    localtime = datetime.now(tz).strftime("%Y-%m-%d %H:%M")
+    return WeatherPayload(Location(location, payload.timezone, localtime), Forecast(forecast_days))
+
+def is_valid(weather_data, days):
+    """A forecast the pipelines can use: starting today, `days` full days long."""
+    forecast_days = weather_data.forecast.forecastday
+    return (
+        len(forecast_days) >= days
+        and forecast_days[0].date == weather_data.location.localtime[:10]
+        and all(day.hour for day in forecast_days)
+    )
+
+# ------------------
+# Latency
+# ------------------
+
+@contextmanager
+def connect(path=PROVIDER_STATS_PATH):
+    """Yields a connection to the latency database that commits on success."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS latencies (provider TEXT, seconds REAL, fetched_at REAL)")
+            yield connection
+    finally:
+        connection.close()
+
+def record_latency(provider_name, seconds, path=PROVIDER_STATS_PATH):
+    with connect(path) as connection:
+        connection.execute(
+            "INSERT INTO latencies (provider, seconds, fetched_at) VALUES (?, ?, ?)", (provider_name, seconds, time.time())
+        )
+
+def hedge_delay(provider_name, path=PROVIDER_STATS_PATH):
+    """Seconds to wait for a provider before hedging: the p90 of its last LATENCY_WINDOW fetches."""
+    with connect(path) as connection:
+        rows = connection.execute(
+            "SELECT seconds FROM latencies WHERE provider = ? ORDER BY fetched_at DESC LIMIT ?",
+            (provider_name, LATENCY_WINDOW)
+        ).fetchall()
+    if len(rows) < MIN_SAMPLES:
+        return DEFAULT_HEDGE_DELAY
+    latencies = sorted(seconds for seconds, in rows)
+    return latencies[min(int(len(latencies) * HEDGE_PERCENTILE), len(latencies) - 1)]
+
+def prune_latencies(older_than, path=PROVIDER_STATS_PATH):
+    """Deletes latencies recorded before a Unix time."""
+    with connect(path) as connection:
+        connection.execute("DELETE FROM latencies WHERE fetched_at < ?", (older_than,))
+
+# ------------------
+# Hedged fetch
+# ------------------
+
+def timed_fetch(provider, location, days, stats_path):
+    """Fetches from one provider; records its latency when the forecast is valid."""
+    with span(f"provider {provider.name}", provider=provider.name, location=location):
+        start = time.monotonic()
+        weather_data = provider.fetch(location, days)
+        if not is_valid(weather_data, days):
+            raise NoValidForecast(f"{provider.name} returned {len(weather_data.forecast.forecastday)} usable days for {location}, {days} needed")
+        record_latency(provider.name, time.monotonic() - start, stats_path)
+        return weather_data
+
+def fetch_forecast(location, days=FORECAST_DAYS, providers=None, stats_path=PROVIDER_STATS_PATH):
+    """Fetches a forecast as a WeatherPayload, hedging across providers.
+
+    The first provider is asked first. When it has not answered within its p90 latency,
+    or fails, the next provider is asked as well, and so on; the first valid forecast
+    wins. Slower requests are left to finish in the background (their latencies still
+    count). When every provider fails, the last valid WeatherAPI forecast is used,
+    marked stale (unless it is older than LAST_GOOD_MAX_AGE). Returns the weather data
+    with the provider that answered and its fetch time set.
+    """
+    candidates = [PROVIDERS[name] for name in (providers or WEATHER_PROVIDERS) if PROVIDERS[name].supports(location)]
+    if not candidates:
+        raise NoValidForecast(f"None of the providers {providers or WEATHER_PROVIDERS} supports {location}; add its coordinates to COORDINATES or enable weatherapi")
+    executor = ThreadPoolExecutor(max_workers=len(candidates))
+    pending, errors = {}, []
+
+    def launch(provider):
+        # Copied per request so the provider spans and phases belong to the calling op
+        context = contextvars.copy_context()
+        future = executor.submit(context.run, timed_fetch, provider, location, days, stats_path)
+        pending[future] = provider
+
+    try:
+        launch(candidates[0])
+        next_index = 1
+        while pending:
+            hedge_after = hedge_delay(candidates[next_index - 1].name, stats_path) if next_index < len(candidates) else None
+            done, _ = wait(pending, timeout=hedge_after, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    weather_data = future.result()
+                except Exception as e:
+                    logging.warning(f"Forecast from {provider.name} for {location} failed: {e}")
+                    errors.append(e)
+                    continue
+                if next_index > 1:
+                    logging.info(f"Hedged forecast for {location}: {provider.name} answered first of {next_index} providers")
+                return msgspec.structs.replace(weather_data, provider=provider.name, fetched_at=datetime.now(pytz.utc).isoformat())
+
+            # The last provider asked is slow, or every finished request failed: ask the next one too
+            if next_index < len(candidates):
+                launch(candidates[next_index])
+                next_index += 1
+    finally:
+        executor.shutdown(wait=False)
+
+    # Every provider failed: the last forecast WeatherAPI gave beats none
+    weather_data = PROVIDERS["weatherapi"].last_known_good(location, days)
+    if weather_data is not None:
+        logging.warning(f"No provider returned a forecast for {location}, using the last known good one: {errors}")
+        return weather_data
+    raise NoValidForecast(f"No provider returned a valid forecast for {location}: {errors}")
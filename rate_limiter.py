@@ -0,0 +1,171 @@
+import os
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# SQLite file shared by every process (Dagster runs, the CLI) that calls an upstream
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH", "state/rate_limits.db")
+
+# Token buckets per upstream: (tokens added per second, bucket capacity)
+WEATHERAPI = "weatherapi"
+BUCKETS = {
+    WEATHERAPI: (float(os.getenv("WEATHERAPI_CALLS_PER_MINUTE", "60")) / 60, float(os.getenv("WEATHERAPI_BURST", "10"))),
+}
+
+# Priorities, highest first. A caller waits while a caller of higher priority is waiting,
+# and lower priorities leave part of the bucket to the higher ones.
+LIVE = 0
+BACKFILL = 1
+RESERVED_FRACTION = {LIVE: 0.0, BACKFILL: 0.25}
+
+# Waiters that have not checked in for this many seconds (crashed runs) are ignored
+WAITER_EXPIRY = 10
+# Longest single sleep while waiting, so priority changes are picked up quickly
+MAX_SLEEP = 1.0
+
+class RateLimitTimeout(Exception):
+    """Raised when a token could not be acquired within the timeout."""
+
+# ------------------
+# Storage
+# ------------------
+
+@contextmanager
+def connect(path=RATE_LIMIT_PATH):
+    """Yields a connection inside an immediate (write-locked) transaction."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.close()
+
+def ensure_schema(connection):
+    connection.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, updated_at REAL)")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS waiters (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, priority INTEGER, seen_at REAL)"
+    )
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS acquisitions (name TEXT, priority INTEGER, acquired_at REAL, waited REAL, throttled INTEGER)"
+    )
+
+def refill(connection, name, now):
+    """Returns the bucket's tokens after adding what accrued since its last update."""
+    rate, capacity = BUCKETS[name]
+    row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+    tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+    connection.execute(
+        "INSERT INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+        (name, tokens, now)
+    )
+    return tokens
+
+# ------------------
+# Acquire
+# ------------------
+
+def try_acquire(connection, name, priority, tokens, waiter_id, now):
+    """Takes `tokens` if allowed. Returns (acquired, seconds to wait, waiter id)."""
+    rate, capacity = BUCKETS[name]
+    available = refill(connection, name, now) - RESERVED_FRACTION[priority] * capacity
+
+    # Callers of higher priority that are still waiting go first
+    ahead = connection.execute(
+        "SELECT COUNT(*) FROM waiters WHERE name = ? AND priority < ? AND seen_at > ?",
+        (name, priority, now - WAITER_EXPIRY)
+    ).fetchone()[0]
+
+    if not ahead and available >= tokens:
+        connection.execute("UPDATE buckets SET tokens = tokens - ? WHERE name = ?", (tokens, name))
+        if waiter_id is not None:
+            connection.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+        return True, 0.0, waiter_id
+
+    if waiter_id is None:
+        waiter_id = connection.execute(
+            "INSERT INTO waiters (name, priority, seen_at) VALUES (?, ?, ?)", (name, priority, now)
+        ).lastrowid
+    else:
+        connection.execute("UPDATE waiters SET seen_at = ? WHERE id = ?", (now, waiter_id))
+    return False, max(tokens - available, 0) / rate, waiter_id
+
+def acquire(name=WEATHERAPI, priority=LIVE, tokens=1, timeout=None, path=RATE_LIMIT_PATH):
+    """Blocks until `tokens` are available in the shared bucket `name`; returns the seconds waited.
+
+    Raises RateLimitTimeout when `timeout` seconds pass first.
+    """
+    start = time.monotonic()
+    waiter_id = None
+
+    while True:
+        now = time.time()
+        with connect(path) as connection:
+            ensure_schema(connection)
+            acquired, wait, waiter_id = try_acquire(connection, name, priority, tokens, waiter_id, now)
+            if acquired:
+                waited = time.monotonic() - start
+                connection.execute(
+                    "INSERT INTO acquisitions (name, priority, acquired_at, waited, throttled) VALUES (?, ?, ?, ?, ?)",
+                    (name, priority, now, waited, int(waiter_id is not None))
+                )
+                if waiter_id is not None:
+                    logging.info(f"Waited {waited:.2f}s for the {name} rate limit (priority {priority})")
+                return waited
+
+        if timeout is not None and time.monotonic() - start + wait > timeout:
+            with connect(path) as connection:
+                connection.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+            raise RateLimitTimeout(f"No {name} token within {timeout}s (priority {priority})")
+
+        time.sleep(min(max(wait, 0.05), MAX_SLEEP))
+
+# ------------------
+# Metrics
+# ------------------
+
+def rate_limit_metrics(since=None, path=RATE_LIMIT_PATH):
+    """Summarises acquisitions per bucket and priority since a Unix time (default: last 24 hours).
+
+    Returns calls, throttled calls (that had to wait) and wait time percentiles in seconds.
+    """
+    since = since if since is not None else time.time() - 24 * 3600
+    with connect(path) as connection:
+        ensure_schema(connection)
+        rows = pd.read_sql_query(
+            "SELECT name, priority, waited, throttled FROM acquisitions WHERE acquired_at >= ?",
+            connection, params=(since,)
+        )
+    if rows.empty:
+        return pd.DataFrame(columns=["name", "priority", "calls", "throttled", "wait_p50", "wait_p95", "wait_max"])
+
+    return rows.groupby(["name", "priority"], as_index=False).agg(
+        calls=("waited", "size"),
+        throttled=("throttled", "sum"),
+        wait_p50=("waited", lambda w: w.quantile(0.5)),
+        wait_p95=("waited", lambda w: w.quantile(0.95)),
+        wait_max=("waited", "max"),
+    )
+
+def prune_metrics(older_than, path=RATE_LIMIT_PATH):
+    """Deletes acquisitions recorded before a Unix time."""
+    with connect(path) as connection:
+        ensure_schema(connection)
+        connection.execute("DELETE FROM acquisitions WHERE acquired_at < ?", (older_than,))
+
+if __name__ == "__main__":
+    print(rate_limit_metrics().to_string(index=False))
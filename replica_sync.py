@@ -0,0 +1,159 @@
+from dagster import job, op, ScheduleDefinition
+import logging
+from storage import get_backend, quote, REPLICA_PATH, STORAGE_BACKEND, LocalBackend
+from concurrency import pipeline_executor
+from rollups import WEATHER_ROLLUP_TABLE, FORECAST_ROLLUP_TABLE, ROLLUP_KEY
+from weather_hourly import HOURLY_TABLE, HOURLY_KEY
+from supabase_reader import PAGE_SIZE
+from tunnel_latest import TUNNEL_LATEST_TABLE, TUNNEL_LATEST_KEY
+from forecast_versions import ISSUANCE_TABLE, DELTA_TABLE
+from forecast_verification import SCORES_TABLE, SUMMARY_TABLE
+from backfill import HISTORY_TABLE, HISTORY_KEY
+from retention import HOT_TABLES
+
+# Append-only tables, copied incrementally by id. Rows retention removed from Supabase
+# (everything below its lowest id) are removed from the replica too.
+REPLICATED_TABLES = [
+    "weather_data", "today_weather_trends", "tomorrow_weather",
+    "precipitation_trends", "tunnel_data",
+    "weather_data_baltic", "today_weather_trends_baltic",
+    "tomorrow_weather_baltic", "precipitation_trends_baltic",
+    ISSUANCE_TABLE, DELTA_TABLE,
+]
+# Upserted tables, copied by updated_at and matched on their unique key
+ROLLUP_TABLES = {
+    WEATHER_ROLLUP_TABLE: ROLLUP_KEY,
+    FORECAST_ROLLUP_TABLE: ROLLUP_KEY,
+    HOURLY_TABLE: HOURLY_KEY,
+    SUMMARY_TABLE: "location,provider,lead_days",
+}
+# Latest-state tables (the forecast per hour, the reading per tunnel, the history per
+# day): an updated row keeps its id, so they are copied by created_at (rewritten with
+# every change) instead
+LATEST_TABLES = {
+    "forecast_weather": "time", "forecast_weather_baltic": "time",
+    TUNNEL_LATEST_TABLE: TUNNEL_LATEST_KEY,
+    HISTORY_TABLE: HISTORY_KEY,
+}
+# Upserted tables without a change column, one row per day: copied whole and matched
+# on their unique key. The daily aggregates retention writes, and the verification scores.
+SMALL_TABLES = {
+    **{f"{table_name}_daily": ",".join(["location", "date", *spec["keys"]]) for table_name, spec in HOT_TABLES.items()},
+    SCORES_TABLE: "location,provider,target_date,lead_days",
+}
+
+# ------------------
+# Sync
+# ------------------
+
+def sync_append_only_table(source, replica, table_name):
+    """Copies rows with an id above the replica's highest id, one page at a time.
+
+    Then drops the replica rows below the source's lowest id: retention deleted them there.
+    """
+    last_id = replica.max_value(table_name, "id") or 0
+    copied = 0
+
+    while True:
+        rows = source.select(table_name, filters=[("gt", "id", last_id)], order_by="id", limit=PAGE_SIZE)
+        if not rows:
+            break
+        replica.upsert(table_name, rows, on_conflict="id")
+        copied += len(rows)
+        last_id = rows[-1]["id"]
+        if len(rows) < PAGE_SIZE:
+            break
+
+    drop_pruned_rows(source, replica, table_name)
+    return copied
+
+def drop_pruned_rows(source, replica, table_name, column="id"):
+    """Deletes the replica rows whose `column` is below the source's lowest value of it.
+
+    Retention deletes the oldest rows of the hot tables from Supabase (after archiving
+    them), so the replica would otherwise keep them next to the archive forever.
+    """
+    first = source.select(table_name, columns=column, order_by=column, limit=1)
+    # An empty source table has had every row removed
+    replica.delete(table_name, [("lt", column, first[0][column])] if first else [])
+
+def drop_duplicate_keys(replica, table_name, key):
+    """Keeps the newest replica row per key, so the key's unique index can be built.
+
+    Replicas synced before forecast_weather was upserted hold every appended copy of an
+    hour; this only does work until the index exists.
+    """
+    index = f"{table_name}_{'_'.join(key.split(','))}_key"
+    with replica.connect() as connection:
+        exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,)).fetchone()
+        if exists or key.split(",")[0] not in replica.table_columns(connection, table_name):
+            return
+        connection.execute(
+            f"DELETE FROM {quote(table_name)} WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM {quote(table_name)} GROUP BY {', '.join(map(quote, key.split(',')))})"
+        )
+
+def sync_rollup_table(source, replica, table_name, key=ROLLUP_KEY, changed_column="updated_at"):
+    """Copies rows changed since the replica's latest change and matches them on `key`.
+
+    Without a `changed_column` the whole table is copied.
+    """
+    last_update = replica.max_value(table_name, changed_column) if changed_column else None
+    filters = [("gte", changed_column, last_update)] if last_update else []
+    # Paged read: a run of the hourly table alone can update more rows than one response holds
+    frame = source.read_frame(table_name, filters=filters)
+    # Supabase ids do not matter here; rows are matched on their key
+    frame = frame.drop(columns=["id"], errors="ignore")
+    rows = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    replica.upsert(table_name, rows, on_conflict=key)
+    return len(rows)
+
+# ------------------
+# Operations
+# ------------------
+
+@op
+def sync_local_replica():
+    """Brings the local SQLite replica up to date with the Supabase tables."""
+    if STORAGE_BACKEND == "local":
+        # Offline: the replica is the only database
+        logging.info("STORAGE_BACKEND=local, no Supabase to sync from")
+        return
+
+    source = get_backend("supabase")
+    replica = LocalBackend(REPLICA_PATH)
+
+    for table_name in REPLICATED_TABLES:
+        copied = sync_append_only_table(source, replica, table_name)
+        logging.info(f"Synced {copied} new rows of {table_name} to {REPLICA_PATH}")
+
+    for table_name, key in ROLLUP_TABLES.items():
+        copied = sync_rollup_table(source, replica, table_name, key)
+        logging.info(f"Synced {copied} updated rows of {table_name} to {REPLICA_PATH}")
+
+    for table_name, key in LATEST_TABLES.items():
+        drop_duplicate_keys(replica, table_name, key)
+        copied = sync_rollup_table(source, replica, table_name, key, changed_column="created_at")
+        if table_name in HOT_TABLES:
+            # Retention compacts the forecast tables by hour as well
+            drop_pruned_rows(source, replica, table_name, HOT_TABLES[table_name]["time_column"])
+        logging.info(f"Synced {copied} updated rows of {table_name} to {REPLICA_PATH}")
+
+    for table_name, key in SMALL_TABLES.items():
+        copied = sync_rollup_table(source, replica, table_name, key, changed_column=None)
+        logging.info(f"Synced {copied} rows of {table_name} to {REPLICA_PATH}")
+
+# ------------------
+# Jobs
+# ------------------
+
+@job(executor_def=pipeline_executor)
+def replica_sync_pipeline():
+    """Pipeline to refresh the local read replica from Supabase."""
+    sync_local_replica()
+
+replica_sync_schedule = ScheduleDefinition(
+    job=replica_sync_pipeline,
+    cron_schedule="*/15 * * * *",
+    execution_timezone="Europe/Amsterdam",
+)
@@ -2,6 +2,13 @@ from dagster import repository
 from database_data_pipeline import today_weather_trends_pipeline, forecast_weather_pipeline, tomorrow_weather_pipeline, historical_precipitation_pipeline, tunnel_pipeline
 from riga_pipeline import riga_today_weather_trends_pipeline, riga_forecast_weather_pipeline, riga_tomorrow_weather_pipeline,riga_historical_precipitation_pipeline
 from email_pipeline import email_pipeline
+from tunnel_alerts import tunnel_alert_pipeline, tunnel_flood_alert_sensor
+from replica_sync import replica_sync_pipeline, replica_sync_schedule
+from retention import retention_pipeline, retention_schedule
+from forecast_verification import forecast_verification_pipeline, forecast_verification_schedule
+from forecast_stream import extended_forecast_pipeline
+from backfill import history_backfill_pipeline
+from instance_maintenance import instance_maintenance_pipeline, instance_maintenance_schedule
 
 @repository
 def combined_pipeline_repository():
@@ -21,4 +28,30 @@ def combined_pipeline_repository():
 
         # Add pipelines from email_pipeline
         email_pipeline,
+
+        # Add tunnel rain alerting
+        tunnel_alert_pipeline,
+        tunnel_flood_alert_sensor,
+
+        # Add the local read replica sync
+        replica_sync_pipeline,
+        replica_sync_schedule,
+
+        # Add hot table retention and archival
+        retention_pipeline,
+        retention_schedule,
+
+        # Add forecast verification
+        forecast_verification_pipeline,
+        forecast_verification_schedule,
+
+        # Add streaming long-horizon forecasts
+        extended_forecast_pipeline,
+
+        # Add bulk history backfills
+        history_backfill_pipeline,
+
+        # Add Dagster instance retention
+        instance_maintenance_pipeline,
+        instance_maintenance_schedule,
     ]
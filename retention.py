@@ -0,0 +1,216 @@
+from dagster import job, op, Field, ScheduleDefinition
+import os
+import logging
+from datetime import datetime, time, timedelta
+import pandas as pd
+import pytz
+from storage import get_backend
+from concurrency import pipeline_executor, SUPABASE_WRITE_POOL
+
+# Hourly rows older than this many days leave the hot tables
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+# Root of the Parquet archive, partitioned as <table>/location=<name>/month=<YYYY-MM>/,
+# with one <YYYY-MM-DD>.parquet file per local day
+ARCHIVE_PATH = os.getenv("ARCHIVE_PATH", "archive")
+
+local_tz = pytz.timezone("Europe/Amsterdam")
+
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_backend()
+
+# How each hot table is compacted: the column holding the row's time (local clock time,
+# or a UTC instant when "timestamptz"), extra grouping keys, columns summed per day and
+# columns summarised by mean/min/max. Every run appends a full copy, so rows are first
+# deduplicated on (keys, time).
+HOURLY_WEATHER = {
+    "time_column": "time",
+    "keys": [],
+    "sum": ["precipitation"],
+    "stats": ["temperature", "feels_like", "humidity", "wind_speed"],
+}
+HOT_TABLES = {
+    "today_weather_trends": {
+        "location": "Eindhoven",
+        "time_column": "time",
+        "keys": [],
+        "sum": ["rainfall"],
+        "stats": ["temperature", "feels_like", "humidity"],
+    },
+    "forecast_weather": {"location": "Eindhoven", **HOURLY_WEATHER},
+    "tomorrow_weather": {"location": "Eindhoven", **HOURLY_WEATHER},
+    "tunnel_data": {
+        "location": "Eindhoven",
+        "time_column": "created_at",
+        "timestamptz": True,
+        "keys": ["location_name"],
+        "sum": [],
+        "stats": ["precipitation_intensity"],
+    },
+    "today_weather_trends_baltic": {
+        "location": "Riga",
+        "time_column": "time",
+        "keys": [],
+        "sum": ["rainfall"],
+        "stats": ["temperature", "feels_like", "humidity"],
+    },
+    "forecast_weather_baltic": {"location": "Riga", **HOURLY_WEATHER},
+    "tomorrow_weather_baltic": {"location": "Riga", **HOURLY_WEATHER},
+}
+
+# ------------------
+# Local days
+# ------------------
+
+def local_dates(rows, spec):
+    """The local day ("YYYY-MM-DD") of each row's time."""
+    times = rows[spec["time_column"]]
+    if spec.get("timestamptz"):
+        return pd.to_datetime(times, utc=True, format="ISO8601").dt.tz_convert(local_tz).dt.strftime("%Y-%m-%d")
+    return times.astype(str).str[:10]
+
+def day_start(spec, day):
+    """The filter value for the start of a local day ("YYYY-MM-DD") in the spec's time column.
+
+    Local clock times compare with the date itself; instants need local midnight with
+    its offset, or a day would be cut at UTC midnight.
+    """
+    if spec.get("timestamptz"):
+        return local_tz.localize(datetime.combine(datetime.strptime(day, "%Y-%m-%d").date(), time.min)).isoformat()
+    return day
+
+# ------------------
+# Compaction
+# ------------------
+
+def downsample_daily(rows, spec):
+    """Aggregates hourly rows into one row per local day (and per extra key)."""
+    time_column = spec["time_column"]
+    rows = (
+        rows.sort_values("id")
+        .drop_duplicates(subset=[*spec["keys"], time_column], keep="last")
+        .assign(date=local_dates(rows, spec))
+    )
+
+    aggregations = {}
+    for column in spec["sum"]:
+        aggregations[f"total_{column}"] = (column, "sum")
+    for column in spec["stats"]:
+        aggregations[f"avg_{column}"] = (column, "mean")
+        aggregations[f"min_{column}"] = (column, "min")
+        aggregations[f"max_{column}"] = (column, "max")
+    aggregations["samples"] = (time_column, "count")
+
+    numeric = {column: pd.to_numeric(rows[column], errors="coerce") for column in spec["sum"] + spec["stats"]}
+    daily = rows.assign(**numeric).groupby(["date", *spec["keys"]], as_index=False).agg(**aggregations)
+    return daily.assign(location=spec["location"])
+
+def archive_rows(table_name, rows, spec, archive_path=ARCHIVE_PATH):
+    """Writes raw rows to Parquet, one file per local day in its location/month partition.
+
+    A day's file is rewritten whole with the rows it already held (deduplicated on
+    id), so re-running after an interrupted compaction, or archiving late rows of a
+    day, never duplicates rows in the archive.
+    """
+    dates = local_dates(rows, spec)
+    written = []
+
+    for day, part in rows.groupby(dates):
+        directory = os.path.join(archive_path, table_name, f"location={spec['location']}", f"month={day[:7]}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{day}.parquet")
+        if os.path.exists(path):
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True).drop_duplicates(subset=["id"], keep="last")
+        # Written next to the file and renamed over it, so a crash never leaves half a day
+        part.sort_values("id").to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        written.append(path)
+
+    return written
+
+def compact_table(table_name, spec, retention_days=RETENTION_DAYS, archive_path=ARCHIVE_PATH):
+    """Archives, downsamples and prunes the rows of one hot table older than the retention window.
+
+    The cutoff is a local midnight, so a day is always compacted whole and its daily
+    aggregate is never replaced by one of part of the day.
+    """
+    cutoff = day_start(spec, (datetime.now(local_tz) - timedelta(days=retention_days)).strftime("%Y-%m-%d"))
+    time_column = spec["time_column"]
+
+    old_rows = storage.read_frame(table_name, filters=[("lt", time_column, cutoff)])
+    if old_rows.empty:
+        return 0
+
+    archive_rows(table_name, old_rows, spec, archive_path)
+
+    daily = downsample_daily(old_rows, spec)
+    daily = daily.astype(object).where(daily.notna(), None)
+    storage.upsert(
+        f"{table_name}_daily", daily.to_dict("records"),
+        on_conflict=",".join(["location", "date", *spec["keys"]])
+    )
+
+    # Only delete what was archived; rows inserted meanwhile wait for the next run
+    storage.delete(table_name, [("lt", time_column, cutoff), ("lte", "id", int(old_rows["id"].max()))])
+    return len(old_rows)
+
+# ------------------
+# Archive reads
+# ------------------
+
+def read_archive(table_name, location=None, start_month=None, end_month=None, archive_path=ARCHIVE_PATH):
+    """Reads archived raw rows, pruning partitions by location and month ("YYYY-MM")."""
+    path = os.path.join(archive_path, table_name)
+    if not os.path.isdir(path):
+        return pd.DataFrame()
+
+    filters = []
+    if location is not None:
+        filters.append(("location", "=", location))
+    if start_month is not None:
+        filters.append(("month", ">=", start_month))
+    if end_month is not None:
+        filters.append(("month", "<=", end_month))
+    return pd.read_parquet(path, filters=filters or None)
+
+def read_history(table_name, start_date, end_date=None, archive_path=ARCHIVE_PATH):
+    """Reads raw rows between two dates ("YYYY-MM-DD") from the archive and the hot table."""
+    spec = HOT_TABLES[table_name]
+    time_column = spec["time_column"]
+    end_date = end_date or datetime.now(local_tz).strftime("%Y-%m-%d")
+
+    archived = read_archive(table_name, spec["location"], start_date[:7], end_date[:7], archive_path)
+    if not archived.empty:
+        dates = local_dates(archived, spec)
+        archived = archived[(dates >= start_date) & (dates <= end_date)].drop(columns=["location", "month"])
+
+    day_after_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    filters = [("gte", time_column, day_start(spec, start_date)), ("lt", time_column, day_start(spec, day_after_end))]
+    hot = storage.read_frame(table_name, filters=filters)
+    return pd.concat([archived, hot], ignore_index=True)
+
+# ------------------
+# Operations
+# ------------------
+
+@op(pool=SUPABASE_WRITE_POOL, config_schema={"retention_days": Field(int, default_value=RETENTION_DAYS)})
+def compact_hot_tables(context):
+    """Moves hourly rows past the retention window to Parquet and daily aggregate tables."""
+    retention_days = context.op_config["retention_days"]
+    for table_name, spec in HOT_TABLES.items():
+        compacted = compact_table(table_name, spec, retention_days)
+        logging.info(f"Compacted {compacted} rows of {table_name} older than {retention_days} days")
+
+# ------------------
+# Jobs
+# ------------------
+
+@job(executor_def=pipeline_executor)
+def retention_pipeline():
+    """Pipeline to archive and prune old rows from the hourly weather tables."""
+    compact_hot_tables()
+
+retention_schedule = ScheduleDefinition(
+    job=retention_pipeline,
+    cron_schedule="0 3 * * *",
+    execution_timezone="Europe/Amsterdam",
+)
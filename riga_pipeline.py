@@ -1,20 +1,31 @@
-from dagster import job, op, repository
+from dagster import job, repository, In, Nothing, Field
 import os
-import requests
+import http_client
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from supabase import create_client
+from storage import get_backend
 import pytz
 import logging
+from forecast_versions import store_forecast_issuance
+from rollups import (
+    daily_trend_rollup, daily_forecast_rollup, weather_summary_rollup, upsert_rollup,
+    WEATHER_ROLLUP_TABLE, FORECAST_ROLLUP_TABLE
+)
+from weather_hourly import hourly_rows, upsert_hourly
+from weatherapi import decode_payload, forecast_day, FORECAST_DAYS
+from providers import fetch_forecast
+from rate_limiter import acquire, WEATHERAPI, BACKFILL
+from concurrency import pipeline_executor, WEATHERAPI_POOL, SUPABASE_WRITE_POOL
+from checkpoints import op_checkpoints, UPSTREAM_RETRY_POLICY
+from tracing import traced_op
 
 
 # Load environment variables
 load_dotenv()
 api_key = os.getenv('api_key')
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_backend()
 
 location = 'Riga'
 local_tz = pytz.timezone("Europe/Amsterdam")  # Amsterdam timezone
@@ -24,38 +35,32 @@ local_tz = pytz.timezone("Europe/Amsterdam")  # Amsterdam timezone
 # ------------------
 
 # Weather operations
-@op(name="riga_fetch_weather_data")
-def fetch_weather_data():
-    """Fetches weather data from the WeatherAPI."""
-    url = f"http://api.weatherapi.com/v1/forecast.json?key={api_key}&q={location}&days=2"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
-
-@op(name="riga_store_weather_data")
+@traced_op(name="riga_fetch_weather_data", config_schema={"days": Field(int, default_value=FORECAST_DAYS)}, pool=WEATHERAPI_POOL)
+def fetch_weather_data(context):
+    """Fetches weather data for the configured number of forecast days, hedged across providers."""
+    return fetch_forecast(location, context.op_config["days"])
+
+@traced_op(name="riga_store_weather_data", pool=SUPABASE_WRITE_POOL)
 def store_weather_data(weather_data):
-    """Inserts processed weather data into Supabase."""
+    """Inserts processed weather data into storage."""
     try:
         local_tz = pytz.timezone("Europe/Amsterdam")
-        today_data = weather_data["forecast"]["forecastday"][0]["day"]
+        today_data = weather_data.forecast.forecastday[0]
 
         # Extract necessary fields
-        avg_temp = today_data["avgtemp_c"]
-        total_rainfall = today_data["totalprecip_mm"]
-        avg_feels_like = sum(hour["feelslike_c"] for hour in weather_data["forecast"]["forecastday"][0]["hour"]) / len(weather_data["forecast"]["forecastday"][0]["hour"])
-        peak_rainfall_time = max(
-            weather_data["forecast"]["forecastday"][0]["hour"],
-            key=lambda h: h["precip_mm"]
-        )["time"]
+        avg_temp = today_data.day.avgtemp_c
+        total_rainfall = today_data.day.totalprecip_mm
+        avg_feels_like = sum(hour.feelslike_c for hour in today_data.hour) / len(today_data.hour)
+        peak_rainfall_time = max(today_data.hour, key=lambda h: h.precip_mm).time
 
         # Weather alert processing
-        alert = weather_data.get("alerts", {}).get("alert", [])
-        weather_alert = alert[0]["headline"] if alert else "No alerts"
+        alert = weather_data.alerts.alert
+        weather_alert = alert[0].headline if alert else "No alerts"
 
         # Prepare data for insertion
         processed_data = {
-            "date": weather_data["location"]["localtime"].split(" ")[0],
-            "location": weather_data["location"]["name"],
+            "date": weather_data.location.localtime.split(" ")[0],
+            "location": weather_data.location.name,
             "avg_temp": avg_temp,
             "avg_feels_like": avg_feels_like,
             "total_rainfall": total_rainfall,
@@ -65,14 +70,11 @@ def store_weather_data(weather_data):
             "created_at": datetime.now(local_tz).isoformat()
         }
 
-        # Insert into Supabase
-        response = supabase.table("weather_data_baltic").insert(processed_data).execute()
+        # Insert into storage (errors are raised by the backend)
+        storage.insert("weather_data_baltic", processed_data)
+        logging.info("Successfully inserted weather data into storage")
 
-        # Check if an error occurred during insertion
-        if hasattr(response, 'error'): 
-            raise ValueError(f"Failed to save weather data: {response.error.message}")
-        else:
-            logging.info("Successfully inserted weather data into Supabase")
+        return processed_data
 
     except Exception as e:
         logging.error(f"Error storing weather data: {e}")
@@ -97,10 +99,10 @@ def store_weather_data(weather_data):
 #     return trends
 
 
-@op(name="riga_process_weather_trends")
+@traced_op(name="riga_process_weather_trends")
 def process_weather_trends(weather_data):
     """Processes hourly trends for today's weather."""
-    today = weather_data["forecast"]["forecastday"][0]["hour"]
+    today = weather_data.forecast.forecastday[0].hour
 
     # Debug log
     for hour in today:
@@ -108,11 +110,11 @@ def process_weather_trends(weather_data):
 
     trends = [
         {
-            "time": hour["time"],
-            "temperature": hour["temp_c"],
-            "feels_like": hour["feelslike_c"],
-            "humidity": hour["humidity"],
-            "rainfall": hour["precip_mm"],
+            "time": hour.time,
+            "temperature": hour.temp_c,
+            "feels_like": hour.feelslike_c,
+            "humidity": hour.humidity,
+            "rainfall": hour.precip_mm,
             "created_at": datetime.now(local_tz).isoformat(),
         }
         for hour in today
@@ -120,106 +122,147 @@ def process_weather_trends(weather_data):
     return trends
 
 
-@op(name="riga_store_today_weather_trends")
+@traced_op(name="riga_store_today_weather_trends", pool=SUPABASE_WRITE_POOL)
 def store_today_weather_trends(trends):
-    """Inserts hourly weather trends for today into Supabase."""
-    supabase.table("today_weather_trends_baltic").insert(trends).execute()
+    """Inserts hourly weather trends for today into storage."""
+    storage.insert("today_weather_trends_baltic", trends)
+
+@traced_op(name="riga_rollup_today_weather_trends", ins={"trends": In(), "stored": In(Nothing)}, pool=SUPABASE_WRITE_POOL)
+def rollup_today_weather_trends(trends):
+    """Updates today's hourly trend extremes in the daily weather rollup."""
+    upsert_rollup(storage, WEATHER_ROLLUP_TABLE, daily_trend_rollup(trends, location))
+
+@traced_op(name="riga_rollup_weather_summary", pool=SUPABASE_WRITE_POOL)
+def rollup_weather_summary(summary):
+    """Copies the latest stored weather summary into the daily weather rollup."""
+    upsert_rollup(storage, WEATHER_ROLLUP_TABLE, [weather_summary_rollup(summary, location)])
 
-@op(name="riga_process_forecast_data")
+@traced_op(name="riga_process_forecast_data")
 def process_forecast_data(weather_data):
     """Processes hourly and daily forecasted data for upcoming days."""
     forecast = []
 
     # Iterate through forecast days
-    for day in weather_data["forecast"]["forecastday"]:
+    for day in weather_data.forecast.forecastday:
         # Calculate total daily rainfall
-        total_rainfall = day["day"]["totalprecip_mm"]
+        total_rainfall = day.day.totalprecip_mm
 
-        for hour in day["hour"]:
-            # Convert the hourly time to Amsterdam timezone
-            time_utc = datetime.strptime(hour["time"], "%Y-%m-%d %H:%M")
-            time_local = pytz.utc.localize(time_utc).astimezone(local_tz).strftime("%Y-%m-%d %H:%M:%S")
+        for hour in day.hour:
+            # Convert the hour's Unix timestamp to Amsterdam time
+            time_local = datetime.fromtimestamp(hour.time_epoch, local_tz).strftime("%Y-%m-%d %H:%M:%S")
 
             forecast.append({
-                "date": day["date"],
+                "date": day.date,
                 "time": time_local,
-                "temperature": hour["temp_c"],
-                "feels_like": hour["feelslike_c"],
-                "precipitation": hour["precip_mm"],
-                "humidity": hour["humidity"],
-                "wind_speed": hour["wind_kph"],
+                "temperature": hour.temp_c,
+                "feels_like": hour.feelslike_c,
+                "precipitation": hour.precip_mm,
+                "humidity": hour.humidity,
+                "wind_speed": hour.wind_kph,
                 "total_rainfall": total_rainfall,  # Include total daily rainfall
-                "created_at": datetime.now(local_tz).strftime("%Y-%m-%d %H:%M:%S"),
+                "provider": weather_data.provider,
+                "stale": weather_data.stale,
+                "fetched_at": weather_data.fetched_at,
+                "created_at": datetime.now(local_tz).isoformat(),
             })
 
     return forecast
 
 
-@op(name="riga_store_forecast_weather")
+@traced_op(name="riga_store_forecast_weather", pool=SUPABASE_WRITE_POOL)
 def store_forecast_weather(forecast):
-    """Inserts hourly forecasted data into Supabase."""
+    """Records the forecast as a new issuance and updates the latest hourly forecast."""
     try:
-        # Insert forecast data into the forecast_weather table
-        supabase.table("forecast_weather_baltic").insert(forecast).execute()
-        logging.info("Successfully inserted forecast weather data into Supabase")
+        # Store only the hours/fields that changed; forecast_weather_baltic keeps the latest values
+        issuance = store_forecast_issuance(storage, location, "forecast_weather_baltic", forecast)
+        logging.info(f"Successfully stored forecast issuance {issuance['issuance_id']}")
     except Exception as e:
         logging.error(f"Error inserting forecast weather data: {e}")
         raise
 
-@op(name="riga_process_tomorrow_weather")
+@traced_op(name="riga_rollup_forecast_weather", ins={"forecast": In(), "stored": In(Nothing)}, pool=SUPABASE_WRITE_POOL)
+def rollup_forecast_weather(forecast):
+    """Replaces the daily forecast rollup with the totals of the latest forecast."""
+    upsert_rollup(storage, FORECAST_ROLLUP_TABLE, daily_forecast_rollup(forecast, location))
+
+@traced_op(name="riga_store_weather_hourly", pool=SUPABASE_WRITE_POOL)
+def store_weather_hourly(weather_data):
+    """Writes every fetched hour into the unified weather_hourly table."""
+    upsert_hourly(storage, hourly_rows(weather_data, location))
+
+@traced_op(name="riga_process_tomorrow_weather")
 def process_tomorrow_weather(weather_data):
     """Processes tomorrow's hourly weather forecast."""
-    tomorrow = weather_data["forecast"]["forecastday"][1]["hour"]
+    tomorrow = forecast_day(weather_data, 1)
+    if tomorrow is None:
+        logging.warning("The forecast does not cover tomorrow; fetch at least 2 days")
+        return []
+
     forecast = [
         {
-            "time": hour["time"],
-            "temperature": hour["temp_c"],
-            "feels_like": hour["feelslike_c"],
-            "precipitation": hour["precip_mm"],
-            "humidity": hour["humidity"],
-            "wind_speed": hour["wind_kph"],
+            "time": hour.time,
+            "temperature": hour.temp_c,
+            "feels_like": hour.feelslike_c,
+            "precipitation": hour.precip_mm,
+            "humidity": hour.humidity,
+            "wind_speed": hour.wind_kph,
+            "stale": weather_data.stale,
+            "fetched_at": weather_data.fetched_at,
             "created_at": datetime.now(local_tz).isoformat(),  # Add timestamp
         }
-        for hour in tomorrow
+        for hour in tomorrow.hour
     ]
     return forecast
 
-@op(name="riga_store_tomorrow_weather")
+@traced_op(name="riga_store_tomorrow_weather", pool=SUPABASE_WRITE_POOL)
 def store_tomorrow_weather(forecast):
-    """Inserts tomorrow's hourly weather data into Supabase."""
-    supabase.table("tomorrow_weather_baltic").insert(forecast).execute()
+    """Inserts tomorrow's hourly weather data into storage."""
+    if forecast:
+        storage.insert("tomorrow_weather_baltic", forecast)
 
-@op(name="riga_fetch_historical_precipitation")
-def fetch_historical_precipitation():
-    """Fetches historical precipitation data with Amsterdam timezone."""
+@traced_op(name="riga_fetch_historical_precipitation", pool=WEATHERAPI_POOL, retry_policy=UPSTREAM_RETRY_POLICY)
+def fetch_historical_precipitation(context):
+    """Fetches historical precipitation data with Amsterdam timezone; days fetched by a failed attempt are not fetched again."""
     local_tz = pytz.timezone('Europe/Amsterdam')  # Define Amsterdam timezone
+    checkpoints = op_checkpoints(context)
+    completed = checkpoints.completed()
     dates = []
     precipitation = []
     
     for i in range(7):  # Past 7 days
         # Calculate the date in Amsterdam time
         date_amsterdam = (datetime.now(tz=local_tz) - timedelta(days=i)).strftime('%Y-%m-%d')
-        history_url = f"http://api.weatherapi.com/v1/history.json?key={api_key}&q={location}&dt={date_amsterdam}"
-        response = requests.get(history_url)
-        response.raise_for_status()
-        history_data = response.json()
+        if date_amsterdam not in completed:
+            history_url = f"http://api.weatherapi.com/v1/history.json?key={api_key}&q={location}&dt={date_amsterdam}"
+            acquire(WEATHERAPI, BACKFILL)
+            response = http_client.get(history_url, fallback=True)
+            response.raise_for_status()
+            history_data = decode_payload(response.content)
+            completed[date_amsterdam] = {
+                "precipitation": history_data.forecast.forecastday[0].day.totalprecip_mm,
+                # A last known good response stands in for the day when WeatherAPI failed
+                "stale": http_client.is_stale(response),
+                "fetched_at": http_client.fetched_at(response),
+            }
+            checkpoints.save(date_amsterdam, completed[date_amsterdam])
         
         # Append data
         dates.append(date_amsterdam)
-        precipitation.append(history_data["forecast"]["forecastday"][0]["day"]["totalprecip_mm"])
+        precipitation.append(completed[date_amsterdam])
     
+    checkpoints.clear()
     # Add 'created_at' with Amsterdam timezone
     return [{
         "date": date,
-        "precipitation": precip,
+        **day,
         "type": "historical",
         "created_at": datetime.now(local_tz).isoformat()  # Timestamp in Amsterdam timezone
-    } for date, precip in zip(dates, precipitation)]
+    } for date, day in zip(dates, precipitation)]
 
-@op(name="riga_store_precipitation_trends")
+@traced_op(name="riga_store_precipitation_trends", pool=SUPABASE_WRITE_POOL)
 def store_precipitation_trends(trends):
-    """Inserts precipitation trends into Supabase."""
-    supabase.table("precipitation_trends_baltic").insert(trends).execute()
+    """Inserts precipitation trends into storage."""
+    storage.insert("precipitation_trends_baltic", trends)
 
 # Tunnel data operations
 
@@ -227,29 +270,33 @@ def store_precipitation_trends(trends):
 # Jobs
 # ------------------
 
-@job
+@job(executor_def=pipeline_executor)
 def riga_today_weather_trends_pipeline():
     """Pipeline to process and store today's weather trends."""
     weather_data = fetch_weather_data()
     trends = process_weather_trends(weather_data)
-    store_weather_data(weather_data)
-    store_today_weather_trends(trends)
+    summary = store_weather_data(weather_data)
+    stored_trends = store_today_weather_trends(trends)
+    rollup_weather_summary(summary)
+    rollup_today_weather_trends(trends, stored_trends)
 
-@job
+@job(executor_def=pipeline_executor)
 def riga_forecast_weather_pipeline():
     """Pipeline to process and store forecasted rainfall trends."""
     weather_data = fetch_weather_data()
     forecast = process_forecast_data(weather_data)
-    store_forecast_weather(forecast)
+    stored_forecast = store_forecast_weather(forecast)
+    rollup_forecast_weather(forecast, stored_forecast)
+    store_weather_hourly(weather_data)
 
-@job
+@job(executor_def=pipeline_executor)
 def riga_tomorrow_weather_pipeline():
     """Pipeline to process and store tomorrow's hourly weather forecast."""
     weather_data = fetch_weather_data()
     tomorrow_data = process_tomorrow_weather(weather_data)
     store_tomorrow_weather(tomorrow_data)
 
-@job
+@job(executor_def=pipeline_executor)
 def riga_historical_precipitation_pipeline():
     trends = fetch_historical_precipitation()
     store_precipitation_trends(trends)
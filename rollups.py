@@ -0,0 +1,92 @@
+from datetime import datetime
+import pytz
+
+local_tz = pytz.timezone("Europe/Amsterdam")
+
+# Per location per day rollups, unique on (location, date):
+#   daily_weather_rollup  - today's summary (weather_data) plus hourly trend extremes
+#   daily_forecast_rollup - totals and extremes of the latest forecast issuance
+WEATHER_ROLLUP_TABLE = "daily_weather_rollup"
+FORECAST_ROLLUP_TABLE = "daily_forecast_rollup"
+ROLLUP_KEY = "location,date"
+
+# ------------------
+# Aggregation
+# ------------------
+
+def aggregate_by_day(rows, location, value_columns, day_column="time"):
+    """Groups hourly rows by the date part of their `day_column` and aggregates each day.
+
+    Returns one row per day with the total of `value_columns["total"]` and the min/max
+    of every column in `value_columns["extremes"]`.
+    """
+    days = {}
+    for row in rows:
+        day = days.setdefault(row[day_column][:10], [])
+        day.append(row)
+
+    updated_at = datetime.now(local_tz).isoformat()
+    rollup = []
+    for day, hours in sorted(days.items()):
+        total_column, total_name = value_columns["total"]
+        aggregated = {
+            "location": location,
+            "date": day,
+            total_name: sum(hour[total_column] or 0 for hour in hours),
+            "updated_at": updated_at,
+        }
+        for column, name in value_columns["extremes"]:
+            values = [hour[column] for hour in hours if hour[column] is not None]
+            aggregated[f"min_{name}"] = min(values) if values else None
+            aggregated[f"max_{name}"] = max(values) if values else None
+        rollup.append(aggregated)
+
+    return rollup
+
+def daily_trend_rollup(trends, location):
+    """Rolls process_weather_trends rows up into daily rainfall and extremes."""
+    return aggregate_by_day(trends, location, {
+        "total": ("rainfall", "trend_rainfall"),
+        "extremes": [("temperature", "temperature"), ("humidity", "humidity")],
+    })
+
+def daily_forecast_rollup(forecast, location):
+    """Rolls process_forecast_data or weather_hourly rows up into daily precipitation and extremes.
+
+    Hours are grouped by "date", the provider's local forecast day. Their time is Amsterdam
+    clock time (UTC in weather_hourly), whose date puts Riga's midnight in the day before.
+    """
+    return aggregate_by_day(forecast, location, {
+        "total": ("precipitation", "total_precipitation"),
+        "extremes": [("temperature", "temperature"), ("humidity", "humidity")],
+    }, day_column="date")
+
+def weather_summary_rollup(summary, location):
+    """Maps a stored weather_data row onto its daily_weather_rollup columns."""
+    return {
+        "location": location,
+        "date": summary["date"],
+        "avg_temp": summary["avg_temp"],
+        "avg_feels_like": summary["avg_feels_like"],
+        "total_rainfall": summary["total_rainfall"],
+        "peak_rainfall_time": summary["peak_rainfall_time"],
+        "suggestion": summary["suggestion"],
+        "weather_alert": summary["weather_alert"],
+        "updated_at": summary["created_at"],
+    }
+
+# ------------------
+# Storage
+# ------------------
+
+def upsert_rollup(storage, table_name, rows):
+    """Inserts or updates rollup rows; only the columns present in `rows` are overwritten."""
+    if rows:
+        storage.upsert(table_name, rows, on_conflict=ROLLUP_KEY)
+
+def fetch_rollup(storage, table_name, location, start_date, end_date=None):
+    """Fetches the rollup rows of one location from `start_date` onwards, oldest first."""
+    filters = [("eq", "location", location), ("gte", "date", str(start_date))]
+    if end_date is not None:
+        filters.append(("lte", "date", str(end_date)))
+    return storage.select(table_name, filters=filters, order_by="date")
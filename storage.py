@@ -0,0 +1,227 @@
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+import pandas as pd
+from dotenv import load_dotenv
+from supabase import create_client
+from supabase_reader import apply_filters, fetch_table_frame
+from tracing import traced_storage
+
+# Load environment variables
+load_dotenv()
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# "supabase" talks to the hosted database, "local" only to the embedded SQLite replica
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+REPLICA_PATH = os.getenv("REPLICA_PATH", "replica/weather.db")
+
+# Filter operators understood by both backends, with their SQL spelling
+SQL_OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+# ------------------
+# Supabase
+# ------------------
+
+class SupabaseBackend:
+    """Stores rows in the hosted Supabase (PostgREST) tables."""
+
+    def __init__(self, client):
+        self.client = client
+
+    @traced_storage
+    def insert(self, table_name, rows):
+        """Inserts one row or a list of rows."""
+        self.client.table(table_name).insert(rows).execute()
+
+    @traced_storage
+    def upsert(self, table_name, rows, on_conflict):
+        """Inserts rows or updates the provided columns of rows matching `on_conflict`."""
+        self.client.table(table_name).upsert(rows, on_conflict=on_conflict).execute()
+
+    @traced_storage
+    def select(self, table_name, columns="*", filters=(), order_by=None, desc=False, limit=None):
+        """Returns the matching rows as a list of dicts."""
+        query = apply_filters(self.client.table(table_name).select(columns), filters)
+        if order_by:
+            query = query.order(order_by, desc=desc)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data
+
+    @traced_storage
+    def read_frame(self, table_name, filters=()):
+        """Reads all matching rows, page by page, as a DataFrame."""
+        return fetch_table_frame(self.client, table_name, filters=filters)
+
+    @traced_storage
+    def delete(self, table_name, filters):
+        """Deletes the rows matching `filters`."""
+        apply_filters(self.client.table(table_name).delete(), filters).execute()
+
+# ------------------
+# Local replica
+# ------------------
+
+def quote(identifier):
+    """Quotes a table or column name for SQLite."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+def where_clause(filters):
+    """Turns (operator, column, value) filters into a SQL WHERE clause and its parameters."""
+    conditions, params = [], []
+    for operator, column, value in filters:
+        if operator == "in":
+            conditions.append(f"{quote(column)} IN ({', '.join('?' * len(value))})")
+            params.extend(value)
+        else:
+            conditions.append(f"{quote(column)} {SQL_OPERATORS[operator]} ?")
+            params.append(value)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+class LocalBackend:
+    """Stores rows in an embedded SQLite database with the same table names as Supabase.
+
+    Tables and columns are created on first write, so the replica needs no separate
+    schema. Every call opens its own connection, which keeps it safe to share between
+    Dagster ops and Streamlit sessions.
+    """
+
+    def __init__(self, path=REPLICA_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def connect(self):
+        """Yields a connection that commits on success and is always closed."""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def table_columns(self, connection, table_name):
+        rows = connection.execute(f"PRAGMA table_info({quote(table_name)})").fetchall()
+        return {row[1] for row in rows}
+
+    def ensure_table(self, connection, table_name, columns):
+        """Creates the table and adds any missing columns."""
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {quote(table_name)} (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+        existing = self.table_columns(connection, table_name)
+        for column in columns:
+            if column not in existing:
+                connection.execute(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(column)}")
+
+    def prepare(self, rows):
+        rows = [rows] if isinstance(rows, dict) else list(rows)
+        columns = sorted({column for row in rows for column in row})
+        values = [
+            [json.dumps(value) if isinstance(value, (dict, list)) else value for value in (row.get(c) for c in columns)]
+            for row in rows
+        ]
+        return columns, values
+
+    @traced_storage
+    def insert(self, table_name, rows):
+        """Inserts one row or a list of rows."""
+        columns, values = self.prepare(rows)
+        if not values:
+            return
+        with self.connect() as connection:
+            self.ensure_table(connection, table_name, columns)
+            connection.executemany(
+                f"INSERT INTO {quote(table_name)} ({', '.join(map(quote, columns))}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                values
+            )
+
+    @traced_storage
+    def upsert(self, table_name, rows, on_conflict):
+        """Inserts rows or updates the provided columns of rows matching `on_conflict`."""
+        columns, values = self.prepare(rows)
+        if not values:
+            return
+        keys = on_conflict.split(",")
+        updates = ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in columns if c not in keys)
+        with self.connect() as connection:
+            self.ensure_table(connection, table_name, columns)
+            if keys != ["id"]:
+                connection.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {quote(table_name + '_' + '_'.join(keys) + '_key')} "
+                    f"ON {quote(table_name)} ({', '.join(map(quote, keys))})"
+                )
+            connection.executemany(
+                f"INSERT INTO {quote(table_name)} ({', '.join(map(quote, columns))}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT ({', '.join(map(quote, keys))}) "
+                + (f"DO UPDATE SET {updates}" if updates else "DO NOTHING"),
+                values
+            )
+
+    def query(self, sql, params=()):
+        """Runs SQL against the replica and returns the result as a DataFrame."""
+        with self.connect() as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def table_exists(self, table_name):
+        with self.connect() as connection:
+            row = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+            ).fetchone()
+        return row is not None
+
+    def select_sql(self, table_name, columns="*", filters=(), order_by=None, desc=False, limit=None):
+        if columns != "*":
+            columns = ", ".join(quote(c.strip()) for c in columns.split(","))
+        where, params = where_clause(filters)
+        sql = f"SELECT {columns} FROM {quote(table_name)}{where}"
+        if order_by:
+            sql += f" ORDER BY {quote(order_by)}" + (" DESC" if desc else "")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return sql, params
+
+    @traced_storage
+    def select(self, table_name, columns="*", filters=(), order_by=None, desc=False, limit=None):
+        """Returns the matching rows as a list of dicts."""
+        if not self.table_exists(table_name):
+            return []
+        with self.connect() as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute(*self.select_sql(table_name, columns, filters, order_by, desc, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    @traced_storage
+    def read_frame(self, table_name, filters=()):
+        """Reads all matching rows as a DataFrame."""
+        if not self.table_exists(table_name):
+            return pd.DataFrame()
+        return self.query(*self.select_sql(table_name, filters=filters, order_by="id"))
+
+    @traced_storage
+    def delete(self, table_name, filters):
+        """Deletes the rows matching `filters`."""
+        if not self.table_exists(table_name):
+            return
+        where, params = where_clause(filters)
+        with self.connect() as connection:
+            connection.execute(f"DELETE FROM {quote(table_name)}{where}", params)
+
+    def max_value(self, table_name, column):
+        """Returns the largest value of `column`, or None for a missing or empty table."""
+        if not self.table_exists(table_name):
+            return None
+        with self.connect() as connection:
+            if column not in self.table_columns(connection, table_name):
+                return None
+            return connection.execute(f"SELECT MAX({quote(column)}) FROM {quote(table_name)}").fetchone()[0]
+
+def get_backend(kind=STORAGE_BACKEND):
+    """Returns the storage backend selected by STORAGE_BACKEND ("supabase" or "local")."""
+    if kind == "local":
+        return LocalBackend(REPLICA_PATH)
+    return SupabaseBackend(create_client(SUPABASE_URL, SUPABASE_KEY))
@@ -0,0 +1,91 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+# Rows per request; at most the PostgREST max-rows setting (1000 on Supabase)
+PAGE_SIZE = 1000
+# Key ranges read concurrently
+MAX_WORKERS = 4
+# Ranges per worker, so one dense range does not leave the other workers idle
+RANGES_PER_WORKER = 4
+
+def apply_filters(query, filters):
+    """Applies (operator, column, value) filters such as ("gte", "date", "2024-12-10") to a query."""
+    for operator, column, value in filters:
+        query = getattr(query, "in_" if operator == "in" else operator)(column, value)
+    return query
+
+def fetch_page(supabase, table_name, after=None, page_size=PAGE_SIZE, columns="*", key="id", filters=()):
+    """Fetches the next `page_size` matching rows with `key` above `after` (a keyset page), ordered by `key`."""
+    query = apply_filters(supabase.table(table_name).select(columns), filters)
+    if after is not None:
+        query = query.gt(key, after)
+    return query.order(key).limit(page_size).execute().data
+
+def key_bounds(supabase, table_name, key="id", filters=()):
+    """Returns the lowest and highest `key` of the matching rows, or None when there are none."""
+    def first(desc):
+        query = apply_filters(supabase.table(table_name).select(key), filters)
+        return query.order(key, desc=desc).limit(1).execute().data
+
+    low, high = first(desc=False), first(desc=True)
+    if not low or not high:
+        return None
+    return low[0][key], high[0][key]
+
+def key_ranges(low, high, step):
+    """Splits the integer keys low..high into disjoint [start, end) ranges of `step` keys, in order."""
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+def fetch_range(supabase, table_name, start, end, page_size=PAGE_SIZE, columns="*", key="id", filters=()):
+    """Reads the matching rows with `key` in [start, end) page by page into per-column lists."""
+    filters = [*filters, ("gte", key, start), ("lt", key, end)]
+    values = {}
+    last = None
+    while True:
+        rows = fetch_page(supabase, table_name, last, page_size, columns, key, filters)
+        if not rows:
+            break
+        # PostgREST returns the same columns for every row
+        for column in rows[0]:
+            values.setdefault(column, []).extend(row[column] for row in rows)
+        last = rows[-1][key]
+        # The range's last key arrived: no need to ask for an empty page
+        if last >= end - 1:
+            break
+    return values
+
+def fetch_table_frame(supabase, table_name, columns="*", key="id", filters=(), page_size=PAGE_SIZE,
+                      max_workers=MAX_WORKERS):
+    """Reads a whole Supabase table (or its rows matching `filters`) into one DataFrame.
+
+    A single select is silently truncated at the PostgREST max-rows limit. This reads the
+    lowest and highest `key` (a unique, indexed integer column; `columns` must include
+    it), splits that span into disjoint key ranges and reads the ranges concurrently;
+    rows inserted above the highest key meanwhile are left for the next read. Within a
+    range it pages on the key (`key` > the last one seen), so every page is an index
+    range scan however deep into the table it is, and rows inserted or deleted meanwhile
+    never shift a page. A range is read until its last key or its first empty page, so
+    a server limit below page_size only costs extra pages. Each page's rows are moved
+    into per-column lists as they arrive; the ranges' lists are joined in key order and
+    the frame is built once at the end.
+    """
+    bounds = key_bounds(supabase, table_name, key, filters)
+    if bounds is None:
+        return pd.DataFrame()
+
+    low, high = bounds
+    # Whole pages of keys per range, so a dense range ends on a full page
+    pages = math.ceil((high - low + 1) / page_size)
+    step = math.ceil(pages / min(pages, max_workers * RANGES_PER_WORKER)) * page_size
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        parts = list(pool.map(
+            lambda bounds: fetch_range(supabase, table_name, *bounds, page_size, columns, key, filters),
+            key_ranges(low, high, step)
+        ))
+
+    values = {}
+    for part in parts:
+        for column, column_values in part.items():
+            values.setdefault(column, []).extend(column_values)
+    return pd.DataFrame(values)
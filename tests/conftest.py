@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The pipeline modules pick their storage and upstreams at import time: point them at
+# a throwaway local database and replayed responses before any test imports them
+import offline
+offline.configure(tempfile.mkdtemp(prefix="tests-"), os.path.join(ROOT, "cassettes"))
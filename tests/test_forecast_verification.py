@@ -0,0 +1,50 @@
+import uuid
+import pandas as pd
+import pytest
+from forecast_verification import LOCATION_TIMEZONES, forecast_daily_totals
+
+RIGA = LOCATION_TIMEZONES["Riga"]
+
+@pytest.fixture
+def riga_forecast():
+    """Returns a builder for one WeatherAPI issuance for Riga, stored like store_forecast_issuance does.
+
+    `days` are Riga days; every hour forecasts 0.1 mm except each Riga midnight, which
+    forecasts the day of the month in mm. Times are stored as Amsterdam clock time, so the
+    hour repeated when DST ends is stored once.
+    """
+    def build(days, issued_at):
+        start = pd.Timestamp(days[0]).tz_localize(RIGA)
+        end = (pd.Timestamp(days[-1]) + pd.Timedelta(days=1)).tz_localize(RIGA)
+        hours = pd.date_range(start, end, freq="h", inclusive="left")
+        times = hours.tz_convert("Europe/Amsterdam").tz_localize(None).strftime("%Y-%m-%dT%H:%M:%S")
+        precipitation = [float(hour.day) if hour.hour == 0 else 0.1 for hour in hours]
+        issuance_id = str(uuid.uuid4())
+        deltas = pd.DataFrame({
+            "provider": "weatherapi", "time": times, "issued_at": issued_at, "precipitation": precipitation,
+        }).drop_duplicates(subset=["time"])
+        issuances = pd.DataFrame([{
+            "issuance_id": issuance_id, "provider": "weatherapi", "issued_at": issued_at,
+            "first_time": deltas["time"].iloc[0], "last_time": deltas["time"].iloc[-1],
+        }])
+        return issuances, deltas
+    return build
+
+def test_riga_midnight_counts_for_its_own_day(riga_forecast):
+    # 00:30 in Riga is still the previous day in Amsterdam
+    issuances, deltas = riga_forecast(["2026-10-19", "2026-10-20"], "2026-10-18T23:30:00+02:00")
+
+    daily = forecast_daily_totals(issuances, deltas, RIGA).set_index("target_date")
+
+    assert [str(day) for day in daily.index] == ["2026-10-19", "2026-10-20"]
+    assert daily["forecast"].round(2).tolist() == [19 + 23 * 0.1, 20 + 23 * 0.1]
+    assert daily["hours"].tolist() == [24, 24]
+    assert daily["lead_days"].tolist() == [0, 1]
+
+def test_riga_day_when_dst_ends_is_complete(riga_forecast):
+    issuances, deltas = riga_forecast(["2026-10-25"], "2026-10-24T12:00:00+02:00")
+
+    daily = forecast_daily_totals(issuances, deltas, RIGA)
+
+    assert [str(day) for day in daily["target_date"]] == ["2026-10-25"]
+    assert daily["hours"].tolist() == [24]
@@ -0,0 +1,55 @@
+import pandas as pd
+from storage import LocalBackend
+from forecast_versions import VERSIONED_FIELDS, list_issuances, reconstruct_forecast, store_forecast_issuance
+
+LOCATION = "Eindhoven"
+
+def forecast(start, hours, fetched_at, changes=None):
+    """One process_forecast_data run of `hours` hours from `start`; `changes` overrides fields per hour."""
+    rows = []
+    for time in pd.date_range(start, periods=hours, freq="h"):
+        row = {
+            "date": time.strftime("%Y-%m-%d"),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "temperature": 10.0 + time.hour / 10,
+            "feels_like": 8.0,
+            "precipitation": 0.0,
+            "humidity": 80,
+            "wind_speed": 12.0,
+            "total_rainfall": 0.0,
+            "provider": "weatherapi",
+            "fetched_at": fetched_at,
+        }
+        row.update((changes or {}).get(row["time"], {}))
+        rows.append(row)
+    return rows
+
+def as_frame(rows):
+    """The versioned fields per hour, keyed on the parsed time so text and timestamps compare."""
+    frame = pd.DataFrame(rows)[["time", *VERSIONED_FIELDS]]
+    frame["time"] = pd.to_datetime(frame["time"])
+    return frame.set_index("time").sort_index().astype(object)
+
+def test_reconstruction_matches_every_issuance(tmp_path):
+    storage = LocalBackend(str(tmp_path / "replica.db"))
+    issued = [
+        forecast("2026-10-19 00:00", 48, "2026-10-19T00:05:00+02:00"),
+        # Six hours later: the first hours drop out, new ones appear and some values change
+        forecast("2026-10-19 06:00", 48, "2026-10-19T06:05:00+02:00", {
+            "2026-10-19 12:00:00": {"precipitation": 1.5, "humidity": 95},
+            "2026-10-20 18:00:00": {"temperature": 3.0},
+        }),
+        # Back to the first values for those hours, and a shorter run
+        forecast("2026-10-19 12:00", 30, "2026-10-19T12:05:00+02:00"),
+        # Unchanged apart from its window
+        forecast("2026-10-19 13:00", 29, "2026-10-19T13:05:00+02:00"),
+    ]
+    for rows in issued:
+        store_forecast_issuance(storage, LOCATION, "forecast_weather", rows)
+
+    issuances = list_issuances(storage, LOCATION)
+    assert len(issuances) == len(issued)
+    for issuance, rows in zip(issuances, issued):
+        pd.testing.assert_frame_equal(as_frame(reconstruct_forecast(storage, issuance)), as_frame(rows))
+    # The last issuance changed nothing, so it stored no deltas
+    assert storage.select("forecast_delta", filters=[("eq", "issuance_id", issuances[-1]["issuance_id"])]) == []
@@ -0,0 +1,167 @@
+import os
+import uuid
+from datetime import datetime
+import pytest
+import pytz
+
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2.extensions import make_dsn
+from migrate import MIGRATIONS_PATH, list_migrations, migrate
+from check_query_plans import check_query_plans
+
+# A Postgres server the tests may create and drop databases on (scratch only)
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+AMSTERDAM = pytz.timezone("Europe/Amsterdam")
+CITIES = {
+    "Eindhoven": ("forecast_weather", pytz.timezone("Europe/Amsterdam")),
+    "Riga": ("forecast_weather_baltic", pytz.timezone("Europe/Riga")),
+}
+
+@pytest.fixture
+def database_url():
+    """URL of a new, empty database, dropped afterwards."""
+    name = f"migrations_{uuid.uuid4().hex[:8]}"
+    admin = psycopg2.connect(TEST_DATABASE_URL)
+    admin.autocommit = True
+    admin.cursor().execute(f"create database {name}")
+    try:
+        yield make_dsn(TEST_DATABASE_URL, dbname=name)
+    finally:
+        admin.cursor().execute(f"drop database {name} with (force)")
+        admin.close()
+
+def rows(database_url, sql):
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection, connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+def test_migrations_apply_once(database_url):
+    assert migrate(database_url) == [version for version, _ in list_migrations()]
+    assert migrate(database_url) == []
+
+def test_hot_queries_use_their_indexes(database_url):
+    migrate(database_url)
+
+    problems = check_query_plans(database_url, seed=True)
+    assert problems == {name: [] for name in problems}
+
+def legacy_database(database_url, tmp_path):
+    """Builds the text-typed tables the pipelines wrote before migrations (0000 only)."""
+    baseline = tmp_path / "0000_base_tables.sql"
+    baseline.write_text(open(os.path.join(MIGRATIONS_PATH, baseline.name)).read())
+    migrate(database_url, str(tmp_path))
+
+def test_text_columns_become_typed(database_url, tmp_path):
+    legacy_database(database_url, tmp_path)
+    # One row per table, in the formats the store_* ops wrote
+    created_at = "2026-10-19T14:05:00.123456+02:00"
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection, connection.cursor() as cursor:
+            for suffix in ("", "_baltic"):
+                cursor.execute(
+                    f"insert into weather_data{suffix} (date, peak_rainfall_time, created_at) values (%s, %s, %s)",
+                    ("2026-10-19", "2026-10-19 14:00", created_at)
+                )
+                for table in ("today_weather_trends", "tomorrow_weather"):
+                    cursor.execute(f"insert into {table}{suffix} (time, created_at) values (%s, %s)",
+                                   ("2026-10-19 14:00", created_at))
+                cursor.execute(f"insert into precipitation_trends{suffix} (date, created_at) values (%s, %s)",
+                               ("2026-10-19", created_at))
+            cursor.execute("insert into tunnel_data (location_name, created_at) values (%s, %s)", ("Aqua urbana", created_at))
+    finally:
+        connection.close()
+    migrate(database_url)
+
+    instant = "timestamptz '2026-10-19 12:05:00.123456+00'"
+    for suffix in ("", "_baltic"):
+        assert rows(database_url, f"select date = '2026-10-19', peak_rainfall_time = '2026-10-19 14:00', created_at = {instant} "
+                                  f"from weather_data{suffix}") == [(True, True, True)]
+        for table in ("today_weather_trends", "tomorrow_weather"):
+            assert rows(database_url, f"select time = '2026-10-19 14:00', created_at = {instant} from {table}{suffix}") == [(True, True)]
+        assert rows(database_url, f"select date = '2026-10-19', created_at = {instant} from precipitation_trends{suffix}") == [(True, True)]
+    assert rows(database_url, f"select created_at = {instant} from tunnel_data") == [(True,)]
+    assert rows(
+        database_url,
+        "select table_name, column_name, data_type from information_schema.columns "
+        "where table_schema = 'public' and column_name in ('date', 'time', 'created_at', 'peak_rainfall_time') "
+        "and data_type = 'text'"
+    ) == []
+
+# ------------------
+# Forecast times
+# ------------------
+
+def write_forecast(cursor, location, days, issued_at, shifted):
+    """Stores one forecast run the way process_forecast_data and store_forecast_issuance did.
+
+    Each hour's temperature is day * 100 + the city's clock hour, so a row's real time can be
+    read off its values. Shifted runs read the city's clock time as UTC, as before time_epoch.
+    """
+    table, tz = CITIES[location]
+    hours = []
+    for day in days:
+        for hour in range(24):
+            clock = datetime(2026, 10, day, hour)
+            moment = pytz.utc.localize(clock) if shifted else tz.localize(clock)
+            hours.append((f"2026-10-{day:02d}", moment.astimezone(AMSTERDAM).replace(tzinfo=None), day * 100 + hour))
+
+    issuance_id = str(uuid.uuid4())
+    cursor.execute(
+        "insert into forecast_issuance (issuance_id, location, issued_at, first_time, last_time, hours) "
+        "values (%s, %s, %s, %s, %s, %s)",
+        (issuance_id, location, issued_at, hours[0][1], hours[-1][1], len(hours))
+    )
+    # Amsterdam clock time without offset before the fix, ISO with offset after it
+    created_at = issued_at.strftime("%Y-%m-%d %H:%M:%S") if shifted else issued_at.isoformat()
+    for date, time, temperature in hours:
+        cursor.execute(
+            "insert into forecast_delta (issuance_id, location, issued_at, time, date, temperature) "
+            "values (%s, %s, %s, %s, %s, %s)",
+            (issuance_id, location, issued_at, time, date, temperature)
+        )
+        # The latest table is upserted on time
+        cursor.execute(f"delete from {table} where time = %s", (str(time),))
+        cursor.execute(
+            f"insert into {table} (date, time, temperature, created_at) values (%s, %s, %s, %s)",
+            (date, str(time), temperature, created_at)
+        )
+
+def test_forecast_times_are_corrected_by_creation_time(database_url, tmp_path):
+    # Forecast issuances from before and after process_forecast_data switched to time_epoch
+    legacy_database(database_url, tmp_path)
+
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection, connection.cursor() as cursor:
+            cursor.execute(open(os.path.join(MIGRATIONS_PATH, "0002_pipeline_tables.sql")).read())
+            for location in CITIES:
+                write_forecast(cursor, location, [16, 17], AMSTERDAM.localize(datetime(2026, 10, 16, 6)), shifted=True)
+                write_forecast(cursor, location, [17, 18], AMSTERDAM.localize(datetime(2026, 10, 17, 6)), shifted=True)
+                write_forecast(cursor, location, [18, 19], AMSTERDAM.localize(datetime(2026, 10, 18, 6)), shifted=False)
+                write_forecast(cursor, location, [19, 20], AMSTERDAM.localize(datetime(2026, 10, 19, 6)), shifted=False)
+    finally:
+        connection.close()
+    migrate(database_url)
+
+    for location, (table, tz) in CITIES.items():
+        # The hour each row's values belong to, in the city's clock time
+        real_hour = "make_timestamp(2026, 10, (temperature / 100)::int, temperature::int % 100, 0, 0)"
+        city_clock = f"time at time zone 'Europe/Amsterdam' at time zone '{tz.zone}'"
+
+        assert rows(database_url, f"select time from {table} where {city_clock} <> {real_hour}") == []
+        assert rows(database_url, f"select time from forecast_delta where location = '{location}' and {city_clock} <> {real_hour}") == []
+        assert rows(database_url, f"select time from weather_hourly where location = '{location}' and time at time zone '{tz.zone}' <> {real_hour}") == []
+        assert rows(
+            database_url,
+            f"select first_time from forecast_issuance where location = '{location}' "
+            f"and (first_time at time zone 'Europe/Amsterdam' at time zone '{tz.zone}')::time <> '00:00'"
+        ) == []
+        # Five days of hours, less the last shifted ones a fixed run had overwritten
+        assert rows(database_url, f"select count(*) = count(distinct time), count(*) > 110 from {table}") == [(True, True)]
@@ -0,0 +1,127 @@
+import os
+import json
+import pytest
+from database_data_pipeline import parse_nowcast_intensity, describe_precipitation
+import tunnel_alerts
+from tunnel_alerts import evaluate_tunnel_states, fetch_tunnel_observations
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "buienradar")
+TUNNEL = "Aqua urbana"
+
+def nowcast_intensity(name):
+    """Peak intensity (mm/h) of a getrr.php nowcast fixture."""
+    with open(os.path.join(FIXTURES, f"{name}.txt"), newline="") as f:
+        return parse_nowcast_intensity(f.read())
+
+def observations(*names, stale=()):
+    """One tunnel_data row per nowcast fixture, a minute apart, oldest first."""
+    return [
+        {
+            "id": i + 1,
+            "location_name": TUNNEL,
+            "precipitation_intensity": nowcast_intensity(name),
+            "stale": i in stale,
+            "created_at": f"2026-10-19T14:{i:02d}:00+02:00",
+        }
+        for i, name in enumerate(names)
+    ]
+
+def state(band, candidate=None, count=0):
+    return {TUNNEL: {"state": band, "candidate": candidate, "count": count}}
+
+@pytest.mark.parametrize("name, band", [
+    ("dry", "No rain"), ("light", "Light rain"), ("moderate", "Moderate rain"), ("heavy", "Heavy rain"),
+])
+def test_fixture_bands(name, band):
+    assert describe_precipitation(nowcast_intensity(name)) == band
+
+def test_rising_edge_commits_after_debounce():
+    states, transitions = evaluate_tunnel_states(observations("dry", "heavy", "heavy"), {}, debounce=2)
+
+    assert transitions == [{
+        "location_name": TUNNEL,
+        "previous": "No rain",
+        "current": "Heavy rain",
+        "precipitation_intensity": nowcast_intensity("heavy"),
+        "observed_at": "2026-10-19T14:02:00+02:00",
+    }]
+    assert states == state("Heavy rain")
+
+def test_single_observation_is_held_as_candidate():
+    states, transitions = evaluate_tunnel_states(observations("heavy"), {}, debounce=2)
+
+    assert transitions == []
+    assert states == state("No rain", "Heavy rain", 1)
+
+def test_debounce_hold_drops_interrupted_change():
+    # Heavy once, back to dry, heavy once again: never two in a row, so nothing commits
+    states, transitions = evaluate_tunnel_states(observations("heavy", "dry", "heavy"), {}, debounce=2)
+
+    assert transitions == []
+    assert states == state("No rain", "Heavy rain", 1)
+
+def test_debounce_restarts_when_candidate_band_changes():
+    states, transitions = evaluate_tunnel_states(observations("moderate", "heavy"), {}, debounce=2)
+
+    assert transitions == []
+    assert states == state("No rain", "Heavy rain", 1)
+
+def test_clear_after_debounce():
+    states, transitions = evaluate_tunnel_states(observations("dry", "dry"), state("Heavy rain"), debounce=2)
+
+    assert [(t["previous"], t["current"]) for t in transitions] == [("Heavy rain", "No rain")]
+    assert states == state("No rain")
+
+def test_stale_observations_neither_confirm_nor_reset():
+    rows = observations("heavy", "dry", "heavy", stale={1})
+    states, transitions = evaluate_tunnel_states(rows, {}, debounce=2)
+
+    assert [(t["previous"], t["current"]) for t in transitions] == [("No rain", "Heavy rain")]
+    assert states == state("Heavy rain")
+
+def test_input_states_are_not_modified():
+    before = state("No rain", "Heavy rain", 1)
+    evaluate_tunnel_states(observations("heavy"), before, debounce=2)
+
+    assert before == state("No rain", "Heavy rain", 1)
+
+def test_cursor_round_trip_matches_single_evaluation():
+    rows = observations("dry", "heavy", "heavy", "moderate", "dry", "dry", "light")
+    expected_states, expected_transitions = evaluate_tunnel_states(rows, {}, debounce=2)
+
+    # The sensor stores the states as JSON in its cursor between ticks
+    cursor = json.dumps({"last_id": None, "tunnels": {}})
+    transitions = []
+    for tick in (rows[:2], rows[2:5], rows[5:]):
+        saved = json.loads(cursor)
+        states, new = evaluate_tunnel_states(tick, saved["tunnels"], debounce=2)
+        transitions += new
+        cursor = json.dumps({"last_id": tick[-1]["id"], "tunnels": states})
+
+    assert len(expected_transitions) == 2
+    assert json.loads(cursor) == {"last_id": rows[-1]["id"], "tunnels": expected_states}
+    assert transitions == expected_transitions
+
+def test_paging_reads_every_row_once(monkeypatch):
+    # Across the DST change (the +01:00 text sorts before the +02:00 hour it follows) and
+    # with runs of equal created_at values longer than a page
+    monkeypatch.setattr(tunnel_alerts, "MAX_OBSERVATIONS_PER_TICK", 2)
+    storage = tunnel_alerts.storage
+    storage.delete("tunnel_data", [])
+    created_at = ["2026-10-25T02:30:00+02:00"] * 3 + ["2026-10-25T02:10:00+01:00"] * 3
+    storage.insert("tunnel_data", [
+        {"location_name": TUNNEL, "precipitation_intensity": 0.0, "stale": False, "created_at": value}
+        for value in created_at
+    ])
+    ids = [row["id"] for row in storage.select("tunnel_data", "id", order_by="id")]
+
+    seen = []
+    last_id = ids[0] - 1
+    while True:
+        rows, last_id = fetch_tunnel_observations(last_id)
+        if not rows:
+            break
+        seen += [row["id"] for row in rows]
+
+    assert seen == ids
+    assert last_id == ids[-1]
@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from collections import defaultdict
+from dotenv import load_dotenv
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+
+# Load environment variables
+load_dotenv()
+
+# "file" appends every finished span to TRACE_PATH as one OpenTelemetry JSON object per
+# line; "off" exports nothing (op timings still become Dagster metadata)
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "file")
+TRACE_PATH = os.getenv("TRACE_PATH", "state/traces.jsonl")
+# Old trace files kept by rotate_traces (TRACE_PATH.1 is the most recent)
+TRACE_ROTATIONS = int(os.getenv("TRACE_ROTATIONS", "4"))
+SERVICE_NAME = "rainmaker-pipelines"
+
+# Phases an op's time is split into; whatever is not spent in one of them is "transform"
+PHASES = ("http", "decode", "storage", "email")
+
+# ------------------
+# Export
+# ------------------
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one OpenTelemetry JSON span per line."""
+
+    def __init__(self, path=TRACE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, spans):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self.lock, open(self.path, "a") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+def rotate_traces(path=TRACE_PATH, rotations=TRACE_ROTATIONS):
+    """Moves the trace file to path.1, path.1 to path.2 and so on, overwriting path.<rotations>.
+
+    Exporters open path by name for every export, so the next span starts a new file.
+    """
+    if not os.path.exists(path):
+        return
+    for number in range(rotations - 1, 0, -1):
+        if os.path.exists(f"{path}.{number}"):
+            os.replace(f"{path}.{number}", f"{path}.{number + 1}")
+    os.replace(path, f"{path}.1")
+
+def create_tracer(export=TRACE_EXPORT, path=TRACE_PATH):
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    if export == "file":
+        provider.add_span_processor(SimpleSpanProcessor(JsonLinesSpanExporter(path)))
+    return provider.get_tracer(__name__)
+
+tracer = create_tracer()
+
+# ------------------
+# Spans
+# ------------------
+
+class OpPhases:
+    """Time, calls, rows and bytes per phase of one op run."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.rows = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.stale = 0
+
+    def add(self, phase, seconds, rows, size):
+        self.seconds[phase] += seconds
+        self.calls[phase] += 1
+        self.rows[phase] += rows or 0
+        self.bytes[phase] += size or 0
+
+    def metadata(self, seconds, result):
+        """Dagster output metadata: totals per phase plus the op's remaining (transform) time."""
+        metadata = {"duration_ms": round(seconds * 1e3, 2)}
+        for phase in PHASES:
+            if self.calls[phase]:
+                metadata[f"{phase}_ms"] = round(self.seconds[phase] * 1e3, 2)
+                metadata[f"{phase}_calls"] = self.calls[phase]
+            if self.rows[phase]:
+                metadata[f"{phase}_rows"] = self.rows[phase]
+            if self.bytes[phase]:
+                metadata[f"{phase}_bytes"] = self.bytes[phase]
+        if self.stale:
+            metadata["stale_responses"] = self.stale
+        metadata["transform_ms"] = round(max(seconds - sum(self.seconds.values()), 0) * 1e3, 2)
+        if isinstance(result, (list, tuple, dict)):
+            metadata["output_rows"] = len(result)
+        return metadata
+
+# The phases of the op running in this thread, if any
+current_phases = ContextVar("current_phases", default=None)
+
+class SpanRecord:
+    """Handle yielded by span() to attach row counts, sizes and other attributes."""
+
+    def __init__(self, otel_span):
+        self.otel_span = otel_span
+        self.rows = None
+        self.bytes = None
+
+    def set(self, rows=None, bytes=None, **attributes):
+        if rows is not None:
+            self.rows = rows
+            attributes["rows"] = rows
+        if bytes is not None:
+            self.bytes = bytes
+            attributes["bytes"] = bytes
+        self.otel_span.set_attributes({key: value for key, value in attributes.items() if value is not None})
+
+@contextmanager
+def span(name, phase=None, **attributes):
+    """Traces a block as an OpenTelemetry span; with `phase` its time also counts towards the op's metadata."""
+    start = time.perf_counter()
+    with tracer.start_as_current_span(name) as otel_span:
+        record = SpanRecord(otel_span)
+        record.set(phase=phase, **attributes)
+        try:
+            yield record
+        finally:
+            phases = current_phases.get()
+            if phases is not None and phase:
+                phases.add(phase, time.perf_counter() - start, record.rows, record.bytes)
+
+def mark_stale():
+    """Counts a cached response served in place of a failed upstream call towards the op's metadata."""
+    phases = current_phases.get()
+    if phases is not None:
+        phases.stale += 1
+
+# Storage methods whose second argument holds the rows written
+WRITE_METHODS = ("insert", "upsert")
+
+def count_rows(rows):
+    return 1 if isinstance(rows, dict) else len(rows) if rows is not None else 0
+
+def traced_storage(method):
+    """Traces a storage backend method called as method(table_name, ...) in the storage phase.
+
+    Writes count the rows sent, reads the rows returned.
+    """
+    @functools.wraps(method)
+    def wrapper(self, table_name, *args, **kwargs):
+        with span(f"storage.{method.__name__}", phase="storage", table=table_name) as record:
+            result = method(self, table_name, *args, **kwargs)
+            if method.__name__ in WRITE_METHODS:
+                record.set(rows=count_rows(args[0] if args else kwargs.get("rows")))
+            else:
+                record.set(rows=count_rows(result))
+            return result
+    return wrapper
+
+# ------------------
+# Ops
+# ------------------
+
+def traced_op(fn=None, **op_kwargs):
+    """Drop-in replacement for dagster's @op that traces each run of the op.
+
+    The op runs inside an "op <name>" span; spans in the http, decode, storage and
+    email phases become its children. Their totals, the remaining transform time and
+    the number of output rows are attached to the op's output as Dagster metadata.
+    """
+    # Imported here so modules that only trace (storage, http_client) do not load Dagster
+    from dagster import op, Output
+
+    def decorate(fn):
+        name = op_kwargs.get("name", fn.__name__)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            phases = OpPhases()
+            token = current_phases.set(phases)
+            start = time.perf_counter()
+            try:
+                with span(f"op {name}", op=name):
+                    result = fn(*args, **kwargs)
+            finally:
+                current_phases.reset(token)
+            return Output(result, metadata=phases.metadata(time.perf_counter() - start, result))
+
+        return op(**op_kwargs)(wrapper)
+
+    return decorate(fn) if fn is not None else decorate
+
+# ------------------
+# Report
+# ------------------
+
+def summarize(path=TRACE_PATH):
+    """Returns {span name: [durations in ms]} from an exported trace file."""
+    durations = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            exported = json.loads(line)
+            start = datetime.fromisoformat(exported["start_time"].rstrip("Z"))
+            end = datetime.fromisoformat(exported["end_time"].rstrip("Z"))
+            durations[exported["name"]].append((end - start).total_seconds() * 1e3)
+    return durations
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else TRACE_PATH
+    print(f"{'span':<60} {'count':>6} {'mean ms':>9} {'max ms':>9}")
+    for name, values in sorted(summarize(path).items()):
+        print(f"{name:<60} {len(values):>6} {sum(values) / len(values):>9.2f} {max(values):>9.2f}")
@@ -0,0 +1,157 @@
+from dagster import job, op, sensor, RunRequest, SkipReason, Array, Permissive
+import os
+import json
+import logging
+from dotenv import load_dotenv
+from storage import get_backend
+from mailer import send_email
+from concurrency import pipeline_executor
+from database_data_pipeline import describe_precipitation
+from tunnel_latest import fetch_latest_tunnels
+
+# Load environment variables
+load_dotenv()
+
+# Supabase, or the local replica when STORAGE_BACKEND=local
+storage = get_backend()
+
+# A tunnel only changes state after the new band was seen this many times in a row
+DEBOUNCE_OBSERVATIONS = int(os.getenv("TUNNEL_ALERT_DEBOUNCE", "2"))
+# Upper bound on rows read per sensor tick; the cursor picks up the rest next tick
+MAX_OBSERVATIONS_PER_TICK = 1000
+
+# ------------------
+# State evaluation
+# ------------------
+
+def evaluate_tunnel_states(observations, states, debounce=DEBOUNCE_OBSERVATIONS):
+    """Folds tunnel observations (oldest first) into the per-tunnel alert states.
+
+    Each state holds the committed band plus a pending candidate band and how many
+    consecutive observations have confirmed it. Stale observations (a last known good
+    nowcast stored while Buienradar was failing) are skipped, so an outage neither
+    confirms nor resets a pending change. Returns the updated states and the committed
+    transitions; the input states are not modified.
+    """
+    states = {name: dict(state) for name, state in states.items()}
+    transitions = []
+
+    for observation in observations:
+        if observation.get("stale"):
+            continue
+        name = observation["location_name"]
+        intensity = observation["precipitation_intensity"] or 0
+        band = describe_precipitation(intensity)
+        state = states.setdefault(name, {"state": "No rain", "candidate": None, "count": 0})
+
+        if band == state["state"]:
+            # Back in the committed band, drop any pending change
+            state["candidate"] = None
+            state["count"] = 0
+            continue
+
+        if band == state["candidate"]:
+            state["count"] += 1
+        else:
+            state["candidate"] = band
+            state["count"] = 1
+
+        if state["count"] >= debounce:
+            transitions.append({
+                "location_name": name,
+                "previous": state["state"],
+                "current": band,
+                "precipitation_intensity": intensity,
+                "observed_at": observation["created_at"],
+            })
+            state["state"] = band
+            state["candidate"] = None
+            state["count"] = 0
+
+    return states, transitions
+
+def fetch_tunnel_observations(last_id):
+    """Fetches the tunnel rows stored after tunnel_data id `last_id`, oldest first.
+
+    Pages on the increasing id rather than created_at: text timestamps with a UTC offset
+    do not sort in time order across a DST change, and a page cut inside a run of equal
+    created_at values would skip the rest of it. Returns the rows and the id to continue from.
+    """
+    columns = "location_name,precipitation_intensity,stale,created_at"
+
+    if last_id is None:
+        # First tick: start from the latest row of every tunnel instead of the whole history
+        rows = sorted(fetch_latest_tunnels(storage, columns), key=lambda row: row["created_at"])
+        newest = storage.select("tunnel_data", "id", order_by="id", desc=True, limit=1)
+        return rows, newest[0]["id"] if newest else 0
+
+    rows = storage.select(
+        "tunnel_data",
+        f"id,{columns}",
+        filters=[("gt", "id", last_id)],
+        order_by="id",
+        limit=MAX_OBSERVATIONS_PER_TICK,
+    )
+    return rows, rows[-1]["id"] if rows else last_id
+
+# ------------------
+# Operations
+# ------------------
+
+@op(config_schema={"transitions": Array(Permissive())})
+def send_tunnel_alert(context):
+    """Emails the tunnel rain band transitions detected by the sensor."""
+    transitions = context.op_config["transitions"]
+    lines = "\n".join(
+        f"- {t['location_name']}: {t['previous']} -> {t['current']} "
+        f"({t['precipitation_intensity']:.2f} mm/h at {t['observed_at']})"
+        for t in transitions
+    )
+    summary = f"""
+    Tunnel rain alert:
+
+    {lines}
+    """
+
+    try:
+        send_email("Eindhoven Tunnel Rain Alert", summary)
+        logging.info(f"Sent tunnel alert for {len(transitions)} transition(s)")
+    except Exception as e:
+        raise Exception(f"Failed to send tunnel alert: {e}")
+
+# ------------------
+# Jobs
+# ------------------
+
+@job(executor_def=pipeline_executor)
+def tunnel_alert_pipeline():
+    """Pipeline to notify about tunnel rain band changes."""
+    send_tunnel_alert()
+
+# ------------------
+# Sensors
+# ------------------
+
+@sensor(job=tunnel_alert_pipeline, minimum_interval_seconds=60)
+def tunnel_flood_alert_sensor(context):
+    """Evaluates new tunnel rows against the rain bands and alerts on state changes."""
+    cursor = json.loads(context.cursor) if context.cursor else {"last_id": None, "tunnels": {}}
+
+    # Cursors from before paging on id hold no last_id: they start over from the latest rows
+    observations, last_id = fetch_tunnel_observations(cursor.get("last_id"))
+    if not observations:
+        context.update_cursor(json.dumps({"last_id": last_id, "tunnels": cursor["tunnels"]}))
+        yield SkipReason("No new tunnel data since the last tick.")
+        return
+
+    states, transitions = evaluate_tunnel_states(observations, cursor["tunnels"])
+    context.update_cursor(json.dumps({"last_id": last_id, "tunnels": states}))
+
+    if not transitions:
+        yield SkipReason(f"Evaluated {len(observations)} tunnel rows, no state changes.")
+        return
+
+    yield RunRequest(
+        run_key=f"tunnel_alert_{last_id}",
+        run_config={"ops": {"send_tunnel_alert": {"config": {"transitions": transitions}}}},
+    )
@@ -0,0 +1,17 @@
+# One row per tunnel with its latest reading, unique on location_name. store_tunnel_data
+# upserts every processed tunnel here next to appending it to tunnel_data, so the map and
+# the alert sensor's first tick read 71 rows instead of searching tunnel_data's history
+# for the newest row of each tunnel.
+TUNNEL_LATEST_TABLE = "tunnel_latest"
+TUNNEL_LATEST_KEY = "location_name"
+
+# Columns the tunnel map draws
+MAP_COLUMNS = "location_name,latitude,longitude,precipitation_intensity,precipitation_description,created_at"
+
+def upsert_latest_tunnels(storage, rows):
+    """Replaces the latest reading of every tunnel in `rows`."""
+    storage.upsert(TUNNEL_LATEST_TABLE, rows, on_conflict=TUNNEL_LATEST_KEY)
+
+def fetch_latest_tunnels(storage, columns=MAP_COLUMNS):
+    """Returns the latest reading of every tunnel, ordered by name."""
+    return storage.select(TUNNEL_LATEST_TABLE, columns=columns, order_by=TUNNEL_LATEST_KEY)
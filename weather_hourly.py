@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import pytz
+
+local_tz = pytz.timezone("Europe/Amsterdam")
+
+# One row per location per hour for every city, unique on (location, time):
+#   time            - the hour as a UTC timestamp (from WeatherAPI's time_epoch)
+#   date            - the city's local date of that hour
+#   temperature, feels_like, humidity, precipitation, wind_speed
+#   updated_at      - when the values were last written
+# The latest fetch of an hour wins, so forecasts are overwritten as the hour comes closer.
+HOURLY_TABLE = "weather_hourly"
+HOURLY_KEY = "location,time"
+
+# ------------------
+# Rows
+# ------------------
+
+def day_rows(day, location, updated_at):
+    """Flattens the hours of one decoded ForecastDay into weather_hourly rows."""
+    return [
+        {
+            "location": location,
+            "time": datetime.fromtimestamp(hour.time_epoch, pytz.utc).isoformat(),
+            "date": day.date,
+            "temperature": hour.temp_c,
+            "feels_like": hour.feelslike_c,
+            "humidity": hour.humidity,
+            "precipitation": hour.precip_mm,
+            "wind_speed": hour.wind_kph,
+            "updated_at": updated_at,
+        }
+        for hour in day.hour
+    ]
+
+def hourly_rows(weather_data, location):
+    """Flattens every hour of a decoded WeatherAPI payload into weather_hourly rows."""
+    updated_at = datetime.now(local_tz).isoformat()
+    return [row for day in weather_data.forecast.forecastday for row in day_rows(day, location, updated_at)]
+
+def current_hour():
+    """Returns the start of the current hour in the format of weather_hourly.time."""
+    return datetime.now(pytz.utc).replace(minute=0, second=0, microsecond=0).isoformat()
+
+# ------------------
+# Storage
+# ------------------
+
+def upsert_hourly(storage, rows):
+    """Inserts or replaces hourly rows on (location, time)."""
+    if rows:
+        storage.upsert(HOURLY_TABLE, rows, on_conflict=HOURLY_KEY)
+
+def fetch_locations(storage):
+    """Lists the locations with a row for the current hour, i.e. every city being fetched."""
+    rows = storage.select(HOURLY_TABLE, columns="location", filters=[("eq", "time", current_hour())])
+    return sorted({row["location"] for row in rows})
+
+def fetch_hourly(storage, locations, start_date):
+    """Reads the hourly rows of any number of locations from each city's local midnight of `start_date` onwards.
+
+    `start_date` is an ISO date. The date filter cuts every city at its own midnight; the
+    time bound, a day earlier to cover any UTC offset, keeps the read on (location, time).
+    """
+    day_before = datetime.fromisoformat(start_date) - timedelta(days=1)
+    filters = [
+        ("in", "location", list(locations)),
+        ("gte", "time", pytz.utc.localize(day_before).isoformat()),
+        ("gte", "date", start_date),
+    ]
+    return storage.read_frame(HOURLY_TABLE, filters=filters)
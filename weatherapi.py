@@ -0,0 +1,83 @@
+import os
+from datetime import datetime, timedelta
+import msgspec
+from tracing import span
+
+# Days of forecast requested from WeatherAPI (1-14, depending on the plan)
+FORECAST_DAYS = int(os.getenv("FORECAST_DAYS", "2"))
+# Overridable so the pipelines can be pointed at a stub server
+WEATHERAPI_BASE_URL = os.getenv("WEATHERAPI_BASE_URL", "http://api.weatherapi.com/v1")
+
+# Typed views of the WeatherAPI forecast.json / history.json payloads. Only the fields
+# the pipelines use are declared; msgspec skips every other field while decoding, so
+# the ~35 fields per hour never become Python objects.
+
+class Hour(msgspec.Struct, frozen=True, gc=False):
+    time_epoch: int  # Start of the hour as a Unix timestamp
+    time: str  # Start of the hour in the location's local clock time ("%Y-%m-%d %H:%M")
+    temp_c: float
+    feelslike_c: float
+    humidity: float
+    precip_mm: float
+    wind_kph: float
+
+class Day(msgspec.Struct, frozen=True, gc=False):
+    avgtemp_c: float
+    totalprecip_mm: float
+    mintemp_c: float | None = None
+    maxtemp_c: float | None = None
+    avghumidity: float | None = None
+
+class ForecastDay(msgspec.Struct, frozen=True, gc=False):
+    date: str
+    day: Day
+    hour: list[Hour]
+
+class Forecast(msgspec.Struct, frozen=True, gc=False):
+    forecastday: list[ForecastDay]
+
+class Location(msgspec.Struct, frozen=True, gc=False):
+    name: str
+    tz_id: str
+    localtime: str
+
+class Alert(msgspec.Struct, frozen=True, gc=False):
+    headline: str
+
+class Alerts(msgspec.Struct, frozen=True, gc=False):
+    alert: list[Alert] = []
+
+class WeatherPayload(msgspec.Struct, frozen=True, gc=False):
+    location: Location
+    forecast: Forecast
+    alerts: Alerts = msgspec.field(default_factory=Alerts)
+    # Not part of the response; set by providers.fetch_forecast: the provider that issued
+    # the forecast, when it was fetched (ISO, UTC), and whether it is a last known good
+    # one served after a failure
+    provider: str | None = None
+    fetched_at: str | None = None
+    stale: bool = False
+
+# Decoders are reusable and thread-safe
+payload_decoder = msgspec.json.Decoder(WeatherPayload)
+
+def decode_payload(content):
+    """Decodes a forecast.json or history.json response body (bytes or str)."""
+    with span("decode WeatherAPI payload", phase="decode", bytes=len(content)):
+        return payload_decoder.decode(content)
+
+def convert_day(day):
+    """Converts one already parsed forecastday object (a dict) into a ForecastDay."""
+    return msgspec.convert(day, ForecastDay)
+
+def forecast_url(api_key, location, days=FORECAST_DAYS):
+    return f"{WEATHERAPI_BASE_URL}/forecast.json?key={api_key}&q={location}&days={days}"
+
+def history_url(api_key, location, date):
+    return f"{WEATHERAPI_BASE_URL}/history.json?key={api_key}&q={location}&dt={date}"
+
+def forecast_day(weather_data, offset):
+    """Returns the forecast day `offset` days after the location's current date, or None."""
+    today = datetime.strptime(weather_data.location.localtime[:10], "%Y-%m-%d").date()
+    date = str(today + timedelta(days=offset))
+    return next((day for day in weather_data.forecast.forecastday if day.date == date), None)